@@ -0,0 +1,129 @@
+"""Priority queue of pending purchase requests for approvers.
+
+Pending requests are kept in a binary heap ordered by urgency, then age:
+urgent requests first, and the oldest first within each urgency level.
+Adding a request is a heap push. When a request leaves the queue
+(approved, rejected or re-added), its heap entry is only marked stale and
+is dropped once it reaches the top. So submissions and status changes cost
+O(log n), and the top k requests come out in O(k log n) without looking
+at the rest of the queue.
+"""
+import heapq
+import threading
+from record_store import parse_timestamp
+
+PENDING = "Pending"
+# Heap rank per urgency level; anything else queues with "Normal"
+URGENCY_RANK = {"Urgent": 0, "Normal": 1}
+
+# Fields kept per queued request so the queue can be shown without another lookup
+DISPLAY_FIELDS = (
+    "PO Number", "Timestamp", "Requester", "Email", "Item URL", "Quantity",
+    "Category", "Urgency", "Description"
+)
+
+class ApprovalQueue:
+    """Pending requests by urgency then age, updated one request at a time."""
+
+    def __init__(self):
+        # Heap entries are [rank, timestamp, PO Number, live]
+        self._heap = []
+        self._entries = {}
+        self._docs = {}
+        self._stale = 0
+        # One queue is shared by every session's thread
+        self._lock = threading.RLock()
+
+    def __getstate__(self):
+        # Queues are pickled into the cross-process cache; locks are not picklable
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.RLock()
+
+    @classmethod
+    def from_records(cls, records):
+        queue = cls()
+        for record in records:
+            if record.get("Status", "") == PENDING and record.get("PO Number", ""):
+                queue._entries[record["PO Number"]] = queue._entry(record)
+                queue._docs[record["PO Number"]] = {field: record.get(field, "") for field in DISPLAY_FIELDS}
+        # One O(n) heapify instead of n pushes
+        queue._heap = list(queue._entries.values())
+        heapq.heapify(queue._heap)
+        return queue
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, po_number):
+        return po_number in self._entries
+
+    @staticmethod
+    def _entry(record):
+        # Rows without a timestamp count as the oldest rather than drop out of sight
+        rank = URGENCY_RANK.get(record.get("Urgency", ""), URGENCY_RANK["Normal"])
+        return [rank, parse_timestamp(record.get("Timestamp", "")), record["PO Number"], True]
+
+    def add(self, record):
+        """Queue a request if it is pending; re-adding a PO number replaces its entry."""
+        po_number = record.get("PO Number", "")
+        if not po_number:
+            return
+        with self._lock:
+            self.remove(po_number)
+            if record.get("Status", "") != PENDING:
+                return
+            entry = self._entry(record)
+            self._entries[po_number] = entry
+            self._docs[po_number] = {field: record.get(field, "") for field in DISPLAY_FIELDS}
+            heapq.heappush(self._heap, entry)
+
+    def remove(self, po_number):
+        with self._lock:
+            entry = self._entries.pop(po_number, None)
+            if entry is None:
+                return
+            entry[3] = False
+            self._docs.pop(po_number, None)
+            self._stale += 1
+            # Rebuild once stale entries outnumber live ones, so the heap
+            # stays within twice the queue's size
+            if self._stale > len(self._entries):
+                self._heap = [entry for entry in self._heap if entry[3]]
+                heapq.heapify(self._heap)
+                self._stale = 0
+
+    def update_status(self, po_number, status, record=None):
+        """Apply a status change; `record` is needed to queue a request again."""
+        with self._lock:
+            if status != PENDING:
+                self.remove(po_number)
+            elif po_number not in self._entries and record is not None:
+                self.add(dict(record, Status=PENDING))
+
+    def top(self, k=20):
+        """The k requests to approve first, most pressing first."""
+        with self._lock:
+            popped = []
+            while self._heap and len(popped) < k:
+                entry = heapq.heappop(self._heap)
+                if entry[3]:
+                    popped.append(entry)
+                else:
+                    self._stale -= 1
+            for entry in popped:
+                heapq.heappush(self._heap, entry)
+            return [dict(self._docs[entry[2]]) for entry in popped]
+
+    def counts(self):
+        """Number of queued requests per urgency level."""
+        with self._lock:
+            docs = list(self._docs.values())
+        counts = {}
+        for doc in docs:
+            counts[doc["Urgency"]] = counts.get(doc["Urgency"], 0) + 1
+        return counts
@@ -0,0 +1,109 @@
+"""Cold storage for archived purchase requests.
+
+Closed or old requests are moved out of the hot Google Sheet (and the local
+CSV store) into zstd-compressed Parquet files, one per archived shard.
+Readers in google_sheets and data_utils only open these files when a query
+reaches past the hot window.
+
+Usage:
+    python archive.py [--hot-days 90] [--max-days 365] [--dry-run] [--drive] [--compact-local]
+"""
+import argparse
+import os
+from pathlib import Path
+
+# Absolute, so catalog entries don't depend on the working directory of the
+# process that archived a shard
+ARCHIVE_DIR = Path(os.environ.get("PO_ARCHIVE_DIR") or Path(__file__).parent / "archive").resolve()
+PARQUET_MIMETYPE = "application/vnd.apache.parquet"
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise ImportError("Archiving requires pyarrow (pip install pyarrow)")
+    return pyarrow
+
+def archive_path(name):
+    """Local Parquet file for an archived shard or compaction batch."""
+    slug = "".join(c if c.isalnum() or c in "-_" else "-" for c in name.strip()).strip("-").lower()
+    return ARCHIVE_DIR / f"{slug}.parquet"
+
+def resolve_archive(path):
+    """Absolute path of an archive file named in the catalog.
+
+    Relative paths, as stored by older versions, are looked up in ARCHIVE_DIR.
+    """
+    path = Path(path)
+    return path if path.is_absolute() else ARCHIVE_DIR / path.name
+
+def write_archive(records, path, columns):
+    """Write records (dicts) to a compressed Parquet file; returns the row count.
+
+    The file is written under a temporary name and renamed into place, so a
+    reader never sees a partial archive.
+    """
+    pa = _pyarrow()
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    table = pa.table({column: [str(record.get(column, "")) for record in records] for column in columns})
+    tmp_path = path.with_suffix(".parquet.tmp")
+    pa.parquet.write_table(table, str(tmp_path), compression="zstd")
+    os.replace(tmp_path, path)
+    return table.num_rows
+
+def count_archive(path):
+    """Number of rows stored in an archive file."""
+    return _pyarrow().parquet.ParquetFile(str(path)).metadata.num_rows
+
+def read_archive(path, columns=None):
+    """All records of an archive file as a list of dicts."""
+    return _pyarrow().parquet.read_table(str(path), columns=columns).to_pylist()
+
+def iter_archive(path, chunk_size):
+    """Yield the records of an archive file in lists of at most chunk_size."""
+    parquet_file = _pyarrow().parquet.ParquetFile(str(path))
+    for batch in parquet_file.iter_batches(batch_size=chunk_size):
+        yield batch.to_pylist()
+
+def main():
+    from google_sheets import archive_cold_shards, HOT_WINDOW_DAYS, MAX_HOT_DAYS
+
+    parser = argparse.ArgumentParser(description="Move closed and old purchase requests to cold storage.")
+    parser.add_argument("--hot-days", type=int, default=HOT_WINDOW_DAYS, help="archive closed shards that ended this many days ago")
+    parser.add_argument("--max-days", type=int, default=MAX_HOT_DAYS, help="archive any shard that ended this many days ago")
+    parser.add_argument("--dry-run", action="store_true", help="list shards that would be archived")
+    parser.add_argument("--drive", action="store_true", help="also copy new archives to Google Drive as the service account")
+    parser.add_argument("--compact-local", action="store_true", help="also move old rows out of the local CSV store")
+    args = parser.parse_args()
+
+    drive_service = None
+    if args.drive and not args.dry_run:
+        import streamlit as st
+        from drive_utils import GoogleDriveService
+
+        drive_service = GoogleDriveService.from_service_account(st.secrets["gcp_service_account"])
+
+    archived = archive_cold_shards(args.hot_days, args.max_days, drive_service=drive_service, dry_run=args.dry_run)
+    verb = "Would archive" if args.dry_run else "Archived"
+    print(f"{verb} {len(archived)} shards: {', '.join(archived) or '-'}")
+
+    if drive_service is not None:
+        from backup_uploader import get_backup_uploader
+
+        uploader = get_backup_uploader()
+        uploader.flush()
+        stats = uploader.stats()
+        print(f"Copied {stats['uploads']} archives to Drive, {stats['dropped']} failed")
+
+    if args.compact_local and not args.dry_run:
+        from datetime import date, timedelta
+        from data_utils import PurchaseData
+
+        rows = PurchaseData().compact(date.today() - timedelta(days=args.hot_days))
+        print(f"Moved {rows} rows out of the local CSV store")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+"""Debounced background backups of local files to Google Drive.
+
+Saving a file schedules its upload instead of sending it at once: a burst
+of saves of one file costs a single upload of its latest state, made on a
+background thread, and failed uploads are retried with backoff. One
+uploader is shared by every session of the process.
+
+The uploader only needs an object with a save_file(path, mimetype=...)
+method, such as drive_utils.GoogleDriveService, so it works without the
+app's config.
+"""
+import atexit
+import logging
+import threading
+import time
+from pathlib import Path
+import streamlit as st
+
+logger = logging.getLogger(__name__)
+
+# Seconds a backup waits for further saves before uploading
+BACKUP_DEBOUNCE_SECONDS = 30
+# Longest a saved change waits for its upload, however often saves arrive
+BACKUP_MAX_STALENESS_SECONDS = 300
+# Failed uploads are retried after a delay that doubles each time, starting
+# at the debounce period, and dropped after this many attempts
+BACKUP_MAX_ATTEMPTS = 5
+BACKUP_MAX_RETRY_SECONDS = 30 * 60
+
+class BackupUploader:
+    """Background Drive backup that coalesces bursts of saves.
+
+    request() returns at once. A file is uploaded once no further save of
+    it has arrived for `debounce` seconds, or once its oldest pending save
+    is `max_staleness` seconds old, and then only its latest state is sent.
+    A failed upload is retried with exponential backoff, and the file is
+    dropped with an error after `max_attempts` failures in a row.
+    """
+
+    def __init__(self, debounce=BACKUP_DEBOUNCE_SECONDS, max_staleness=BACKUP_MAX_STALENESS_SECONDS,
+                 max_attempts=BACKUP_MAX_ATTEMPTS, max_retry=BACKUP_MAX_RETRY_SECONDS):
+        self.debounce = debounce
+        self.max_staleness = max_staleness
+        self.max_attempts = max_attempts
+        self.max_retry = max_retry
+        self.requested = 0
+        self.uploads = 0
+        self.failures = 0
+        self.dropped = 0
+        # (path, owner) -> [drive service, mimetype, first pending save, latest save, failed attempts, retry at]
+        self._pending = {}
+        self._uploading = 0
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name="drive-backup", daemon=True)
+        self._thread.start()
+
+    def request(self, file_path, drive_service, owner, mimetype="text/csv"):
+        """Schedule an upload of file_path with an initialized GoogleDriveService.
+
+        owner names whose credentials drive_service uses. Saves are only
+        coalesced per (file_path, owner), so a file is always uploaded with
+        the credentials of a user who saved it.
+        """
+        now = time.monotonic()
+        with self._cond:
+            self.requested += 1
+            entry = self._pending.setdefault((file_path, owner), [drive_service, mimetype, now, now, 0, now])
+            entry[0] = drive_service
+            entry[3] = now
+            self._cond.notify()
+
+    def _due_at(self, entry):
+        # New saves don't cut a retry's backoff short
+        return max(min(entry[3] + self.debounce, entry[2] + self.max_staleness), entry[5])
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+                key = min(self._pending, key=lambda key: self._due_at(self._pending[key]))
+                wait = self._due_at(self._pending[key]) - time.monotonic()
+                if wait > 0:
+                    self._cond.wait(wait)
+                    continue
+                drive_service, mimetype, _, _, attempts, _ = self._pending.pop(key)
+                file_path = key[0]
+                self._uploading += 1
+
+            # Upload outside the lock so saves keep coalescing meanwhile
+            try:
+                ok = drive_service.save_file(Path(file_path), mimetype=mimetype)
+            except Exception as e:
+                logger.error(f"Drive backup error: {str(e)}")
+                ok = False
+            with self._cond:
+                self._uploading -= 1
+                if ok:
+                    self.uploads += 1
+                else:
+                    self.failures += 1
+                    attempts += 1
+                    if attempts >= self.max_attempts:
+                        self.dropped += 1
+                        logger.error(f"Drive backup failed {attempts} times, giving up: {file_path} ({self.stats()})")
+                    else:
+                        retry = min(self.debounce * 2 ** (attempts - 1), self.max_retry)
+                        logger.error(f"Drive backup failed, retrying in {retry:.0f}s: {file_path}")
+                        now = time.monotonic()
+                        # A save made during the upload keeps its own timestamps
+                        entry = self._pending.setdefault(key, [drive_service, mimetype, now, now, 0, now])
+                        entry[4] = attempts
+                        entry[5] = now + retry
+                self._cond.notify_all()
+
+    def flush(self, timeout=None):
+        """Upload everything pending now; returns False if it timed out."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            for entry in self._pending.values():
+                entry[2] = entry[3] = entry[5] = float("-inf")
+            self._cond.notify_all()
+            while self._pending or self._uploading:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def stats(self):
+        """Saves requested, uploads made and the share of saves that needed no upload."""
+        with self._cond:
+            attempts = self.uploads + self.failures
+            skipped = max(self.requested - attempts, 0)
+            return {
+                "requested": self.requested,
+                "uploads": self.uploads,
+                "failures": self.failures,
+                "dropped": self.dropped,
+                "pending": len(self._pending),
+                "skip_ratio": round(skipped / self.requested, 3) if self.requested else 0.0
+            }
+
+@st.cache_resource(show_spinner=False)
+def get_backup_uploader():
+    """Backup uploader shared by every session of this process."""
+    uploader = BackupUploader()
+    # Don't lose the last burst of saves when the server shuts down
+    atexit.register(uploader.flush, BACKUP_DEBOUNCE_SECONDS)
+    atexit.register(lambda: logger.info(f"Drive backup stats: {uploader.stats()}"))
+    return uploader
+
+def backup_panel():
+    """Sidebar metrics for the shared Drive backup uploader."""
+    stats = get_backup_uploader().stats()
+    with st.sidebar.expander("☁️ Drive backups"):
+        col1, col2 = st.columns(2)
+        col1.metric("Uploads", stats["uploads"], help=f"{stats['requested']} saves, {stats['skip_ratio']:.0%} coalesced")
+        col2.metric("Pending", stats["pending"])
+        col1.metric("Failed attempts", stats["failures"])
+        col2.metric("Dropped", stats["dropped"])
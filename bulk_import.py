@@ -0,0 +1,179 @@
+"""Bulk import of purchase requests from CSV or JSONL files.
+
+Usage:
+    python bulk_import.py requests.csv [--email buyer@ketos.co] [--dry-run] [--digest imported.html]
+
+Rows are validated all at once, given a contiguous block of PO numbers and
+appended to the purchase request sheet in chunks. Invalid rows are reported
+with their line number and skipped; valid rows are still imported.
+Valid rows that could not be written are listed too, and saved to
+<file>.unwritten.csv for a second run. With --digest, the imported rows
+are also written to one HTML digest for approvers.
+"""
+import argparse
+import secrets
+import time
+from datetime import datetime
+from pathlib import Path
+import pandas as pd
+from email_templates import render_digest
+from google_sheets import append_requests, COLUMNS, CATEGORIES, URGENCY_LEVELS, STATUSES, APPEND_CHUNK_SIZE
+
+REQUIRED_FIELDS = ["Requester", "Email", "Item URL", "Attention", "Description"]
+
+# Form input names accepted as aliases for the sheet headers
+ALIASES = {
+    "requester": "Requester",
+    "email": "Email",
+    "timestamp": "Timestamp",
+    "link": "Item URL",
+    "url": "Item URL",
+    "quantity": "Quantity",
+    "attention": "Attention",
+    "category": "Category",
+    "description": "Description",
+    "urgency": "Urgency",
+    "status": "Status"
+}
+
+def read_rows(path):
+    """Read a CSV or JSONL file into a DataFrame of strings."""
+    path = Path(path)
+    if path.suffix.lower() in (".jsonl", ".ndjson", ".json"):
+        df = pd.read_json(path, lines=True, dtype=False)
+    else:
+        df = pd.read_csv(path, dtype=str, keep_default_na=False)
+
+    df = df.rename(columns=lambda column: ALIASES.get(column.strip().lower(), column.strip()))
+    return df.astype(object).where(df.notna(), "").astype(str)
+
+def missing_fields(df, required_fields=REQUIRED_FIELDS):
+    """One "Missing required fields" message per row ('' if none are missing)."""
+    # Absent columns count as missing on every row
+    values = df.reindex(columns=required_fields).fillna("").astype(str)
+    missing = values.apply(lambda column: column.str.strip().eq(""))
+
+    missing_names = missing.dot(missing.columns + ", ").str.rstrip(", ")
+    return ("Missing required fields: " + missing_names).where(missing_names != "", "")
+
+def generate_po_numbers(count, now=None):
+    """Assign a block of PO numbers sharing one prefix.
+
+    The prefix is the timestamp plus a random batch id, so imports started
+    in the same second (or a request submitted meanwhile) never reuse a PO
+    number, which would overwrite rows in the row index and search index.
+    """
+    prefix = f"RD-PO-{(now or datetime.now()).strftime('%y%m%d-%H%M%S')}-{secrets.token_hex(3).upper()}"
+    return [f"{prefix}-{i:04d}" for i in range(1, count + 1)]
+
+def prepare_rows(df, default_email=None, now=None):
+    """Validate and normalize imported rows.
+
+    Returns (records, errors): records is a DataFrame of valid rows in sheet
+    column order with PO numbers assigned; errors is a Series of messages
+    indexed like the input for every rejected row.
+    """
+    now = now or datetime.now()
+    df = df.copy()
+
+    def column(name, default=""):
+        if name not in df:
+            return pd.Series(default, index=df.index)
+        return df[name].str.strip().where(df[name].str.strip() != "", default)
+
+    df["Requester"] = column("Requester")
+    df["Email"] = column("Email", default_email or "")
+    df["Item URL"] = column("Item URL")
+    df["Attention"] = column("Attention")
+    df["Description"] = column("Description")
+    df["Category"] = column("Category", "Other")
+    df["Urgency"] = column("Urgency", URGENCY_LEVELS[0])
+    df["Status"] = column("Status", STATUSES[0])
+
+    errors = missing_fields(df)
+
+    quantity = pd.to_numeric(column("Quantity", "1"), errors="coerce")
+    # Back-dated rows keep their timestamp; rows without one are stamped now
+    # Formats are inferred per row, so date-only rows parse next to full timestamps
+    timestamp = pd.to_datetime(column("Timestamp", now.strftime("%Y-%m-%d %H:%M:%S")), format="mixed", errors="coerce")
+
+    checks = [
+        (quantity.isna() | (quantity < 1) | (quantity % 1 != 0), "Invalid quantity"),
+        (timestamp.isna(), "Invalid timestamp"),
+        (~df["Category"].isin(CATEGORIES), "Unknown category"),
+        (~df["Urgency"].isin(URGENCY_LEVELS), "Unknown urgency"),
+        (~df["Status"].isin(STATUSES), "Unknown status")
+    ]
+    for failed, message in checks:
+        errors = errors.mask(failed & (errors == ""), message)
+
+    valid = errors == ""
+    records = df[valid].copy()
+    records["Quantity"] = quantity[valid].astype(int)
+    records["Timestamp"] = timestamp[valid].dt.strftime("%Y-%m-%d %H:%M:%S")
+    records["PO Number"] = generate_po_numbers(len(records), now)
+
+    return records[COLUMNS], errors[~valid]
+
+def import_file(path, default_email=None, chunk_size=APPEND_CHUNK_SIZE, dry_run=False):
+    """Import one file and return a summary of what happened."""
+    started = time.perf_counter()
+    df = read_rows(path)
+    records, errors = prepare_rows(df, default_email)
+    validated = time.perf_counter()
+
+    unwritten = records.iloc[:0]
+    if not dry_run and len(records):
+        written = append_requests(records.to_dict("records"), chunk_size=chunk_size)
+        unwritten = records[~records["PO Number"].isin(written)]
+    finished = time.perf_counter()
+
+    return {
+        "rows": len(df),
+        "valid": len(records),
+        "written": len(records) - len(unwritten) if not dry_run else 0,
+        "records": records,
+        "unwritten": unwritten,
+        "errors": errors,
+        "validate_seconds": validated - started,
+        "write_seconds": finished - validated
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk import purchase requests from CSV or JSONL.")
+    parser.add_argument("path", help="CSV or JSONL file to import")
+    parser.add_argument("--email", help="requester email for rows without one")
+    parser.add_argument("--chunk-size", type=int, default=APPEND_CHUNK_SIZE, help="rows per append_rows call")
+    parser.add_argument("--dry-run", action="store_true", help="validate only, do not write to Sheets")
+    parser.add_argument("--digest", help="write an HTML digest of the imported rows to this file")
+    args = parser.parse_args()
+
+    summary = import_file(args.path, args.email, args.chunk_size, args.dry_run)
+
+    # Line numbers count the header (CSV) or start at 1 (JSONL)
+    offset = 1 if Path(args.path).suffix.lower() in (".jsonl", ".ndjson", ".json") else 2
+    for index, message in summary["errors"].items():
+        print(f"line {index + offset}: {message}")
+
+    unwritten = summary["unwritten"]
+    if len(unwritten):
+        for index in unwritten.index:
+            print(f"line {index + offset}: not written")
+        # Valid rows that failed to write, ready to import again on their own
+        retry_path = Path(args.path).with_suffix(".unwritten.csv")
+        unwritten.drop(columns="PO Number").to_csv(retry_path, index=False)
+        print(f"{len(unwritten)} valid rows not written; re-run with {retry_path}")
+
+    rows = summary["rows"]
+    print(f"{rows} rows read, {summary['valid']} valid, {len(summary['errors'])} rejected, {summary['written']} written")
+    if summary["validate_seconds"]:
+        print(f"validation: {rows / summary['validate_seconds']:.0f} rows/sec")
+    if summary["written"] and summary["write_seconds"]:
+        print(f"write: {summary['written'] / summary['write_seconds']:.0f} rows/sec")
+    if args.digest and len(summary["records"]):
+        title = f"Bulk import: {summary['valid']} purchase requests from {Path(args.path).name}"
+        Path(args.digest).write_text(render_digest(summary["records"].to_dict("records"), title))
+        print(f"digest: {args.digest}")
+
+if __name__ == "__main__":
+    main()
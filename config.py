@@ -3,10 +3,66 @@ from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import Flow
 from googleapiclient.discovery import build
 import json
-from google.auth.transport.requests import Request
+import logging
+import os
+from pathlib import Path
+from http_pool import auth_request, authorized_http
 
 SCOPES = ['https://www.googleapis.com/auth/drive.file', 'https://www.googleapis.com/auth/gmail.send']
 
+logger = logging.getLogger("po_system")
+
+class Config:
+    """Settings for the CSV/Drive request form (data_utils, drive_utils, ui_components).
+
+    OAuth client details come from the environment (see .env), so importing
+    this module never touches st.secrets.
+    """
+    APP_NAME = "Ketos PO System"
+    APP_ICON = "📦"
+    SCOPES = SCOPES
+    CLIENT_CONFIG = {
+        'web': {
+            'client_id': os.environ.get('GOOGLE_CLIENT_ID', ''),
+            'client_secret': os.environ.get('GOOGLE_CLIENT_SECRET', ''),
+            'auth_uri': 'https://accounts.google.com/o/oauth2/auth',
+            'token_uri': 'https://oauth2.googleapis.com/token',
+            'redirect_uris': [os.environ.get('GOOGLE_REDIRECT_URI', 'http://localhost:8501')]
+        }
+    }
+    DRIVE_FOLDER_ID = os.environ.get('PO_DRIVE_FOLDER_ID') or None
+    CSV_FILE = Path(os.environ.get('PO_CSV_FILE', 'purchase_requests.csv'))
+    DEFAULT_ADDRESS = os.environ.get("PO_DEFAULT_ADDRESS", "")
+    DEFAULT_DEPARTMENT = "R&D"
+    CLASSIFICATION_CODES = ["Lab Supplies", "Testing", "Parts & Tools", "Prototype", "Other"]
+    URGENCY_LEVELS = ["Normal", "Urgent"]
+
+CUSTOM_STYLES = """
+<style>
+    .instruction-box {
+        background-color: #f0f6ff;
+        border-left: 4px solid #1f77b4;
+        padding: 1rem;
+        margin-bottom: 1rem;
+        border-radius: 4px;
+    }
+    .form-section {
+        padding: 1rem 0;
+    }
+    .required-field {
+        color: #d62728;
+        font-weight: bold;
+    }
+    .email-preview {
+        background-color: #fafafa;
+        border: 1px solid #ddd;
+        padding: 1rem;
+        border-radius: 4px;
+        white-space: pre-wrap;
+    }
+</style>
+"""
+
 def get_google_creds():
     creds = None
     if 'google_client_secret' in st.secrets:
@@ -31,7 +87,7 @@ def get_google_creds():
         
         if not creds or not creds.valid:
             if creds and creds.expired and creds.refresh_token:
-                creds.refresh(Request())
+                creds.refresh(auth_request())
             else:
                 st.error("Google token is missing or invalid. Please reauthorize the application.")
                 auth_url, _ = flow.authorization_url(prompt='consent')
@@ -54,9 +110,9 @@ def get_google_creds():
 
 def get_drive_service():
     creds = get_google_creds()
-    return build('drive', 'v3', credentials=creds)
+    return build('drive', 'v3', http=authorized_http(creds))
 
 def get_gmail_service():
     creds = get_google_creds()
-    return build('gmail', 'v1', credentials=creds)
+    return build('gmail', 'v1', http=authorized_http(creds))
 
@@ -0,0 +1,141 @@
+"""Pre-aggregated request counts for dashboard drill-downs.
+
+CountCube keeps one count per distinct (month, category, urgency,
+requester, status) combination of a RecordStore's rows. A few thousand
+cells stand in for every row, so filters and breakdowns are answered from
+the cube without rescanning the store.
+
+refresh() is incremental: when the store only gained rows since the last
+refresh, just those rows are folded in. If earlier rows changed (a status
+update, or a reload that differs), the cube is rebuilt.
+"""
+import threading
+import time
+from collections import Counter
+from record_store import MISSING
+
+# Dimensions of the cube; "Month" comes from the store's timestamp column
+DIMENSIONS = ("Month", "Category", "Urgency", "Requester", "Status")
+
+class CountCube:
+    """Counts of rows per combination of DIMENSIONS."""
+
+    def __init__(self, columns=None):
+        # Stores may name a dimension's column differently
+        self.columns = {dimension: dimension for dimension in DIMENSIONS if dimension != "Month"}
+        self.columns.update(columns or {})
+        self.counts = Counter()
+        self.rows = 0
+        self._snapshot = {}
+        self._lock = threading.RLock()
+
+    def _fold(self, store, start):
+        timestamps = store.timestamps() if store.timestamp_column else None
+        decoders = []
+        for dimension in DIMENSIONS[1:]:
+            column = self.columns[dimension]
+            if column in store.columns:
+                decoders.append((store.codes(column), store.categories(column)))
+            else:
+                decoders.append(((0,) * len(store), [""]))
+
+        months = {}
+        for i in range(start, len(store)):
+            month = ""
+            if timestamps is not None and timestamps[i] != MISSING:
+                # gmtime per row would dominate; months only change by day
+                day = timestamps[i] // 86400
+                month = months.get(day)
+                if month is None:
+                    t = time.gmtime(timestamps[i])
+                    month = months[day] = f"{t.tm_year}-{t.tm_mon:02d}"
+            self.counts[(month,) + tuple(values[codes[i]] for codes, values in decoders)] += 1
+
+    def _prefix_unchanged(self, store):
+        # Same rows as last time, in the same order, with the same values?
+        if len(store) < self.rows:
+            return False
+        for name, (data, dictionary) in self._snapshot.items():
+            if name == "timestamps":
+                current = store.timestamps()
+            else:
+                current = store.codes(name)
+                if store.categories(name)[:len(dictionary)] != dictionary:
+                    return False
+            if current[:self.rows] != data:
+                return False
+        return True
+
+    def refresh(self, store):
+        """Bring the cube up to date with store; returns the number of rows folded in."""
+        with self._lock:
+            if self.rows and self._prefix_unchanged(store):
+                start = self.rows
+            else:
+                self.counts = Counter()
+                start = 0
+            self._fold(store, start)
+            self.rows = len(store)
+
+            snapshot = {}
+            if store.timestamp_column:
+                snapshot["timestamps"] = (store.timestamps()[:], None)
+            for dimension in DIMENSIONS[1:]:
+                column = self.columns[dimension]
+                if column in store.columns:
+                    snapshot[column] = (store.codes(column)[:], list(store.categories(column)))
+            self._snapshot = snapshot
+            return self.rows - start
+
+    def _cells(self, filters):
+        # filters: dimension -> value or collection of values; months may
+        # also be bounded with month_from / month_to (inclusive, "YYYY-MM")
+        month_from = filters.pop("month_from", None)
+        month_to = filters.pop("month_to", None)
+        positions = []
+        for dimension, wanted in filters.items():
+            if wanted is None:
+                continue
+            wanted = {wanted} if isinstance(wanted, str) else set(wanted)
+            positions.append((DIMENSIONS.index(dimension), wanted))
+        with self._lock:
+            cells = list(self.counts.items())
+        for key, count in cells:
+            if month_from and key[0] < month_from:
+                continue
+            if month_to and key[0] > month_to:
+                continue
+            if all(key[i] in wanted for i, wanted in positions):
+                yield key, count
+
+    def total(self, **filters):
+        """Number of rows matching the filters."""
+        return sum(count for _, count in self._cells(filters))
+
+    def breakdown(self, by, **filters):
+        """Counts per value of one dimension among rows matching the filters."""
+        index = DIMENSIONS.index(by)
+        counts = Counter()
+        for key, count in self._cells(filters):
+            counts[key[index]] += count
+        return dict(counts.most_common())
+
+    def pivot(self, rows, columns, **filters):
+        """Counts of rows × columns dimensions as a DataFrame."""
+        import pandas as pd
+
+        row_index, column_index = DIMENSIONS.index(rows), DIMENSIONS.index(columns)
+        counts = Counter()
+        for key, count in self._cells(filters):
+            counts[(key[row_index], key[column_index])] += count
+        if not counts:
+            return pd.DataFrame()
+        series = pd.Series(counts)
+        series.index.names = [rows, columns]
+        return series.unstack(fill_value=0).sort_index()
+
+    def values(self, dimension):
+        """Distinct values of a dimension, sorted."""
+        index = DIMENSIONS.index(dimension)
+        with self._lock:
+            return sorted({key[index] for key in self.counts})
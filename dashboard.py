@@ -1,29 +1,85 @@
 import streamlit as st
 import pandas as pd
 from google_sheets import get_google_sheets_client
+from record_store import RecordStore, PERIODS, period_start
+from count_cube import CountCube, DIMENSIONS
+from fragments import panel, panel_data, refresh_button, INTERVAL, MANUAL
+from shared_cache import get_shared_cache
 
-st.title("📊 Purchase Order Dashboard")
+# Seconds between automatic refreshes of the headline metrics
+METRICS_REFRESH_SECONDS = 300
+
+def fetch_summary_data():
+    """Fetch the purchase summary worksheet into a RecordStore."""
+    client = get_google_sheets_client()
+    sheet = client.open_by_key("YOUR_SHEET_ID").worksheet("purchase_summary")
+    data = sheet.get_all_records()
+    return RecordStore.from_records(data, timestamp_column="Request Date and Time")
+
+@st.cache_resource(ttl=60, show_spinner=False)
+def load_summary_data():
+    """Summary store shared by all sessions, fetched by one worker at a time."""
+    return get_shared_cache().get_or_refresh("dashboard_summary", fetch_summary_data, ttl=60)
+
+def selected_rows(store):
+    """Rows in the selected period via the store's timestamp index, or None for all."""
+    start = period_start(st.session_state.get("dashboard_period", PERIODS[0]))
+    return None if start is None else store.range(start)
+
+@panel(run_every=METRICS_REFRESH_SECONDS)
+def metrics_panel():
+    store = panel_data("dashboard_metrics", load_summary_data, policy=INTERVAL, interval=METRICS_REFRESH_SECONDS)
+    rows = selected_rows(store)
+
+    # Display Metrics
+    total_requests = len(store) if rows is None else len(rows)
+    pending_requests = store.value_counts("Urgency", rows).get("Urgent", 0)
 
-# Get Google Sheets Data
-client = get_google_sheets_client()
-sheet = client.open_by_key("YOUR_SHEET_ID").worksheet("purchase_summary")
-data = sheet.get_all_records()
-df = pd.DataFrame(data)
+    st.metric(label="Total Purchase Orders", value=total_requests)
+    st.metric(label="Urgent Requests", value=pending_requests)
 
-# Display Metrics
-total_requests = df.shape[0]
-pending_requests = df[df["Urgency"] == "Urgent"].shape[0]
+@st.cache_resource(show_spinner=False)
+def get_count_cube():
+    """Count cube over the summary data, shared by all sessions."""
+    return CountCube()
 
-st.metric(label="Total Purchase Orders", value=total_requests)
-st.metric(label="Urgent Requests", value=pending_requests)
+def load_count_cube():
+    """Fold summary rows added since the last refresh into the shared cube."""
+    cube = get_count_cube()
+    cube.refresh(load_summary_data())
+    return cube
 
-# Monthly Summary
-df["Request Date and Time"] = pd.to_datetime(df["Request Date and Time"])
-df["Month"] = df["Request Date and Time"].dt.strftime("%Y-%m")
+@panel()
+def charts_panel():
+    refresh_button("dashboard_charts")
+    cube = panel_data("dashboard_charts", load_count_cube, policy=MANUAL)
 
-monthly_summary = df.groupby("Month").size().reset_index(name="Requests")
-st.line_chart(monthly_summary.set_index("Month"))
+    # Filters and drill-downs are answered from the cube, not the rows
+    start = period_start(st.session_state.get("dashboard_period", PERIODS[0]))
+    filters = {"month_from": start.strftime("%Y-%m") if start else None}
+    columns = st.columns(3)
+    for column, dimension in zip(columns, ("Category", "Urgency", "Status")):
+        with column:
+            selected = st.multiselect(dimension, cube.values(dimension), key=f"dashboard_filter_{dimension}")
+            filters[dimension] = selected or None
+
+    # Monthly Summary
+    months = {month: count for month, count in cube.breakdown("Month", **filters).items() if month}
+    monthly_summary = pd.DataFrame(sorted(months.items()), columns=["Month", "Requests"])
+    st.line_chart(monthly_summary.set_index("Month"))
+
+    # Breakdown by one dimension, with a drill-down into one of its values
+    by = st.selectbox("Break down by", [d for d in DIMENSIONS if d != "Month"], index=2, key="dashboard_breakdown")
+    breakdown = pd.Series(cube.breakdown(by, **filters), name="Requests")
+    st.bar_chart(breakdown.head(10))
+
+    value = st.selectbox(f"Drill into {by}", ["All"] + list(breakdown.index), key=f"dashboard_drill_{by}")
+    if value != "All":
+        other = "Status" if by != "Status" else "Category"
+        st.dataframe(cube.pivot("Month", other, **{**filters, by: value}), use_container_width=True)
+
+st.title("📊 Purchase Order Dashboard")
+st.selectbox("Period", PERIODS, key="dashboard_period")
 
-# Top Requesters
-top_requesters = df["Requester"].value_counts().head(5)
-st.bar_chart(top_requesters)
+metrics_panel()
+charts_panel()
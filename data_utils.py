@@ -4,6 +4,10 @@ from datetime import datetime
 import pytz
 from pathlib import Path
 from config import Config, logger
+import archive
+from record_store import TimestampIndex, parse_timestamp, MISSING
+from email_templates import render_order_text
+from drive_utils import DriveManager
 
 class PurchaseData:
     def __init__(self):
@@ -33,11 +37,83 @@ class PurchaseData:
             logger.error(f"Error loading data: {str(e)}")
             return pd.DataFrame(columns=self.columns)
     
+    def iter_chunks(self, chunk_size=5000, start=None):
+        """Yield purchase data, archives first and then the CSV file, in DataFrames of at most chunk_size rows
+
+        Archives compacted before start are skipped; rows are not filtered by timestamp here.
+        """
+        for path in self.archive_files():
+            if start is not None and self._compacted_at(path) <= pd.Timestamp(start):
+                continue
+            for records in archive.iter_archive(path, chunk_size):
+                yield pd.DataFrame(records, columns=self.columns, dtype=str)
+        if not self.csv_file.exists():
+            return
+        yield from pd.read_csv(self.csv_file, dtype=str, keep_default_na=False, chunksize=chunk_size)
+    
+    def archive_files(self):
+        """Parquet archives written by compact(), oldest first"""
+        return sorted(archive.ARCHIVE_DIR.glob(f"{archive.archive_path(self.csv_file.stem).stem}-*.parquet"))
+    
+    def _compacted_at(self, path):
+        # compact() names archives after the time it ran, and only moves rows older than that
+        return pd.to_datetime(path.stem.rsplit('-', 1)[-1], format='%Y%m%d%H%M%S', errors='coerce')
+    
+    def _timestamps(self, df):
+        # Stored timestamps end with a timezone abbreviation, e.g. "PST"
+        return pd.to_datetime(df['Request_DateTime'].astype(str).str.slice(0, 19), errors='coerce')
+    
+    def compact(self, cutoff):
+        """Move rows older than cutoff from the CSV file into a Parquet archive"""
+        try:
+            if not self.csv_file.exists():
+                return 0
+            df = pd.read_csv(self.csv_file)
+            cold = self._timestamps(df) < pd.Timestamp(cutoff)
+            if not cold.any():
+                return 0
+            
+            path = archive.archive_path(f"{self.csv_file.stem}-{datetime.now().strftime('%Y%m%d%H%M%S')}")
+            archive.write_archive(df[cold].to_dict('records'), path, self.columns)
+            if archive.count_archive(path) != int(cold.sum()):
+                raise IOError(f"Archive is incomplete: {path}")
+            
+            if not self.save_data(df[~cold]):
+                raise IOError("Failed to rewrite the CSV file")
+            PurchaseData.load_data.clear()
+            return int(cold.sum())
+            
+        except Exception as e:
+            logger.error(f"Error compacting data: {str(e)}")
+            return 0
+    
+    def load_range(self, start=None):
+        """Load purchase data from start onwards, reading archives only when start is before the hot data"""
+        try:
+            df = self.load_data()
+            timestamps = self._timestamps(df)
+            
+            if start is None or df.empty or pd.Timestamp(start) < timestamps.min():
+                archived = [pd.DataFrame(archive.read_archive(path)) for path in self.archive_files()]
+                if archived:
+                    df = pd.concat(archived + [df], ignore_index=True)
+                    timestamps = self._timestamps(df)
+            
+            if start is not None:
+                df = df[timestamps >= pd.Timestamp(start)]
+            return df
+            
+        except Exception as e:
+            logger.error(f"Error loading data range: {str(e)}")
+            return pd.DataFrame(columns=self.columns)
+    
     def save_data(self, data):
-        """Save purchase data to CSV file"""
+        """Save purchase data to CSV file and schedule its Drive backup"""
         try:
             df = pd.DataFrame(data)
             df.to_csv(self.csv_file, index=False)
+            # Backups are debounced in the background; sessions without Drive skip them
+            DriveManager().save_purchase_data(self.csv_file)
             return True
             
         except Exception as e:
@@ -47,6 +123,10 @@ class PurchaseData:
     def add_purchase_request(self, form_data):
         """Add new purchase request to the dataset"""
         try:
+            # Load the indexed history before the new row is saved, so
+            # appending it below cannot count it twice
+            history = get_purchase_history()
+            
             # Load existing data
             df = self.load_data()
             
@@ -57,20 +137,62 @@ class PurchaseData:
             df = pd.concat([df, new_entry], ignore_index=True)
             
             # Save updated data
-            return self.save_data(df)
+            if not self.save_data(df):
+                return False
+            history.append(form_data)
+            return True
             
         except Exception as e:
             logger.error(f"Error adding purchase request: {str(e)}")
             return False
 
+class PurchaseHistory:
+    """Local purchase data (archives and CSV) with a timestamp index
+    
+    Loaded once per process; new requests are appended instead of reloading,
+    and date-range lookups cost O(log n + k).
+    """
+    def __init__(self, df, columns):
+        self.columns = list(df.columns) or columns
+        self.records = df.to_dict('records')
+        self.index = TimestampIndex()
+        self.untimed = []
+        for position, record in enumerate(self.records):
+            self._index(record, position)
+    
+    def _index(self, record, position):
+        timestamp = parse_timestamp(record.get('Request_DateTime', ''))
+        if timestamp == MISSING:
+            self.untimed.append(position)
+        else:
+            self.index.add(timestamp, position)
+    
+    def append(self, record):
+        self.records.append(record)
+        self._index(record, len(self.records) - 1)
+    
+    def range(self, start=None, end=None):
+        """Rows with start <= Request_DateTime < end as a DataFrame, newest first"""
+        positions = list(reversed(self.index.range(start, end)))
+        if start is None and end is None:
+            positions += self.untimed
+        return pd.DataFrame([self.records[i] for i in positions], columns=self.columns)
+
+@st.cache_resource(show_spinner=False)
+def get_purchase_history():
+    """Indexed local purchase history shared by every session"""
+    purchase_data = PurchaseData()
+    return PurchaseHistory(purchase_data.load_range(), purchase_data.columns)
+
 class FormData:
+    required_fields = ['Requester', 'Link', 'Attention_To', 'Description']
+
     def __init__(self):
         self.pst_timezone = pytz.timezone('America/Los_Angeles')
     
     def validate_form(self, form_data):
         """Validate form input data"""
-        required_fields = ['Requester', 'Link', 'Attention_To', 'Description']
-        missing_fields = [field for field in required_fields if not form_data.get(field)]
+        missing_fields = [field for field in self.required_fields if not form_data.get(field)]
         
         if missing_fields:
             return False, f"Missing required fields: {', '.join(missing_fields)}"
@@ -111,27 +233,7 @@ class FormData:
     def generate_email_body(self, form_data):
         """Generate email body from form data"""
         try:
-            email_template = f"""
-            Dear Ordering,
-
-            R&D would like to order the following:
-
-            - Requester: {form_data['Requester']}
-            - Request Date and Time: {form_data['Request_DateTime']}
-            - Link to Item(s): {form_data['Link']}
-            - Quantity of Item(s): {form_data['Quantity']}
-            - Shipment Address: {form_data['Address']}
-            - Attention To: {form_data['Attention_To']}
-            - Department: {form_data['Department']}
-            - Description of Use: {form_data['Description']}
-            - Classification Code: {form_data['Classification']}
-            - Urgency: {form_data['Urgency']}
-
-            Regards,
-            {form_data['Requester']}
-            """
-            
-            return email_template.strip()
+            return render_order_text(form_data)
             
         except Exception as e:
             logger.error(f"Error generating email body: {str(e)}")
@@ -161,11 +263,10 @@ class DataManager:
             logger.error(f"Form submission error: {str(e)}")
             return False, None, str(e)
     
-    def get_purchase_summary(self):
-        """Get purchase summary data"""
+    def get_purchase_summary(self, start=None, end=None):
+        """Get purchase summary data for a date range, newest first"""
         try:
-            df = self.purchase_data.load_data()
-            return df.sort_values('Request_DateTime', ascending=False)
+            return get_purchase_history().range(start, end)
             
         except Exception as e:
             logger.error(f"Error getting purchase summary: {str(e)}")
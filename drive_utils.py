@@ -1,15 +1,36 @@
 import streamlit as st
 import logging
+import gzip
+import hashlib
+import shutil
+import tempfile
+from pathlib import Path
 from google_auth_oauthlib.flow import Flow
 from google.oauth2.credentials import Credentials
+from google.oauth2 import service_account
 from googleapiclient.discovery import build
 from googleapiclient.http import MediaFileUpload
 from config import Config, logger
+from http_pool import authorized_http
+from archive import PARQUET_MIMETYPE
+from backup_uploader import get_backup_uploader
+
+# Files up to this size are sent in a single multipart request; larger ones
+# go through a resumable session, which costs an extra round trip to open
+SIMPLE_UPLOAD_MAX_BYTES = 5 * 1024 * 1024
+# Resumable chunk size, a multiple of 256 KiB: few round trips, bounded memory
+RESUMABLE_CHUNK_SIZE = 10 * 1024 * 1024
+# Optional payload compression for save_file
+COMPRESSIONS = ("gzip", "parquet")
 
 class GoogleDriveService:
     def __init__(self):
         self.credentials = None
         self.service = None
+        # Whose credentials the service uses; backups are coalesced per owner
+        self.owner = None
+        self.simple_upload_max_bytes = SIMPLE_UPLOAD_MAX_BYTES
+        self.resumable_chunk_size = RESUMABLE_CHUNK_SIZE
     
     def init_oauth_flow(self):
         """Initialize OAuth 2.0 flow"""
@@ -65,13 +86,27 @@ class GoogleDriveService:
                 Config.SCOPES
             )
             
-            self.service = build('drive', 'v3', credentials=credentials)
+            self.credentials = credentials
+            # A digest of the grant, so the owner key doesn't keep the token itself
+            self.owner = hashlib.sha256((credentials.refresh_token or credentials.token).encode()).hexdigest()
+            self.service = build('drive', 'v3', http=authorized_http(credentials))
             return self.service
             
         except Exception as e:
             logger.error(f"Service initialization error: {str(e)}")
             return None
     
+    @classmethod
+    def from_service_account(cls, info):
+        """Drive service acting as a service account, for scripts"""
+        drive = cls()
+        drive.credentials = service_account.Credentials.from_service_account_info(
+            info, scopes=['https://www.googleapis.com/auth/drive.file']
+        )
+        drive.owner = info['client_email']
+        drive.service = build('drive', 'v3', http=authorized_http(drive.credentials))
+        return drive
+    
     def check_file_exists(self, filename, folder_id=None):
         """Check if file exists in Google Drive"""
         try:
@@ -93,12 +128,32 @@ class GoogleDriveService:
             logger.error(f"File check error: {str(e)}")
             return None
     
-    def save_file(self, file_path, folder_id=None):
-        """Save or update file in Google Drive"""
+    def upload_media(self, file_path, mimetype):
+        """Single-request upload for small files, chunked resumable upload for large ones"""
+        if file_path.stat().st_size <= self.simple_upload_max_bytes:
+            return MediaFileUpload(str(file_path), mimetype=mimetype, resumable=False)
+        return MediaFileUpload(
+            str(file_path),
+            mimetype=mimetype,
+            chunksize=self.resumable_chunk_size,
+            resumable=True
+        )
+    
+    def save_file(self, file_path, folder_id=None, mimetype='text/csv', compression=None):
+        """Save or update file in Google Drive
+        
+        With compression="gzip" the file is stored as <name>.gz, and with
+        "parquet" a CSV file is stored as <name>.parquet.
+        """
+        payload_dir = None
         try:
             if not self.service:
                 raise ValueError("Drive service not initialized")
             
+            if compression:
+                payload_dir = Path(tempfile.mkdtemp(prefix="drive-upload-"))
+                file_path, mimetype = compress_payload(file_path, compression, payload_dir)
+            
             folder_id = folder_id or Config.DRIVE_FOLDER_ID
             filename = file_path.name
             
@@ -107,11 +162,7 @@ class GoogleDriveService:
                 'parents': [folder_id] if folder_id else []
             }
             
-            media = MediaFileUpload(
-                str(file_path),
-                mimetype='text/csv',
-                resumable=True
-            )
+            media = self.upload_media(file_path, mimetype)
             
             # Check if file exists
             existing_files = self.check_file_exists(filename, folder_id)
@@ -138,6 +189,10 @@ class GoogleDriveService:
         except Exception as e:
             logger.error(f"File save error: {str(e)}")
             return False
+        
+        finally:
+            if payload_dir is not None:
+                shutil.rmtree(payload_dir, ignore_errors=True)
     
     def test_connection(self):
         """Test Google Drive API connection"""
@@ -153,6 +208,23 @@ class GoogleDriveService:
             logger.error(f"Connection test error: {str(e)}")
             return False
 
+def compress_payload(file_path, compression, out_dir):
+    """Write a compressed copy of file_path into out_dir; returns (path, mimetype)."""
+    file_path = Path(file_path)
+    if compression == "gzip":
+        out_path = Path(out_dir) / f"{file_path.name}.gz"
+        with open(file_path, 'rb') as src, gzip.open(out_path, 'wb', compresslevel=6) as dst:
+            shutil.copyfileobj(src, dst)
+        return out_path, 'application/gzip'
+    if compression == "parquet":
+        import pandas as pd
+        
+        out_path = Path(out_dir) / f"{file_path.stem}.parquet"
+        df = pd.read_csv(file_path, dtype=str, keep_default_na=False)
+        df.to_parquet(out_path, compression="zstd", index=False)
+        return out_path, PARQUET_MIMETYPE
+    raise ValueError(f"Unknown compression: {compression}")
+
 class DriveManager:
     def __init__(self):
         self.drive_service = GoogleDriveService()
@@ -196,15 +268,18 @@ class DriveManager:
             return False
     
     def save_purchase_data(self, file_path):
-        """Save purchase data to Google Drive"""
+        """Schedule a backup of purchase data to Google Drive
+        
+        Saves are debounced and coalesced by the shared BackupUploader, so a
+        burst of writes costs one upload of the latest file. Returns False
+        if this session has not connected Google Drive.
+        """
         try:
-            if not self.drive_service.test_connection():
-                raise ValueError("Not connected to Google Drive")
-            
-            if self.drive_service.save_file(file_path):
-                return True
+            if not self.drive_service.service and not self.drive_service.initialize_service():
+                return False
             
-            raise ValueError("Failed to save file to Google Drive")
+            get_backup_uploader().request(file_path, self.drive_service, self.drive_service.owner)
+            return True
             
         except Exception as e:
             logger.error(f"Save purchase data error: {str(e)}")
@@ -0,0 +1,277 @@
+"""Email bodies rendered from precompiled Jinja2 templates.
+
+The templates are compiled once per process, the first time they are used.
+HTML templates escape every value they are given, so a description or item
+URL containing markup shows up as text rather than ending up in the
+approver's inbox as HTML. Plain-text templates are not HTML-escaped;
+instead, line breaks in a field are folded into spaces so a value cannot
+add lines of its own to the message.
+
+render_many() renders one template for many POs, and render_digest()
+turns a list of POs into a single summary email for approvers.
+
+Run this module to compare render throughput against the old f-strings:
+    python email_templates.py [--count 5000]
+"""
+import re
+import threading
+from functools import lru_cache
+from jinja2 import DictLoader, Environment, StrictUndefined, select_autoescape
+
+# Field rows of the confirmation and digest tables: (label, key in the PO dict)
+PO_FIELDS = [
+    ("PO Number", "PO Number"),
+    ("Requester", "Requester"),
+    ("Requester Email", "Email"),
+    ("Request Date", "Timestamp"),
+    ("Item URL", "Item URL"),
+    ("Quantity", "Quantity"),
+    ("Attention To", "Attention"),
+    ("Category", "Category"),
+    ("Urgency", "Urgency"),
+    ("Description", "Description")
+]
+
+CONFIRMATION_HTML = """\
+<html>
+<body style="font-family: Arial, sans-serif;">
+    <h2 style="color: #2a3f5f; border-bottom: 2px solid #4CAF50; padding-bottom: 10px;">
+        New Purchase Request: {{ po['PO Number'] }}
+    </h2>
+
+    <div style="margin: 20px 0;">
+        <p>Dear Approver,</p>
+        <p>A new purchase request has been submitted:</p>
+
+        <table style="border-collapse: collapse; width: 100%; margin: 20px 0;">
+            <tr style="background-color: #f8f9fa;">
+                <th style="padding: 12px; border: 1px solid #ddd; text-align: left;">Field</th>
+                <td style="padding: 12px; border: 1px solid #ddd; text-align: left;">Value</td>
+            </tr>
+{% for label, key in fields %}
+            <tr><th>{{ label }}</th><td>
+{%- if key == 'Item URL' %}<a href="{{ po[key] | safe_url }}">{{ po[key] }}</a>
+{%- else %}{{ po[key] }}{% endif %}</td></tr>
+{% endfor %}
+        </table>
+
+        <p style="margin-top: 20px;">
+            Regards,<br>
+            <strong>{{ po['Requester'] }}</strong><br>
+            <em>R&amp;D Team</em>
+        </p>
+    </div>
+</body>
+</html>
+"""
+
+DIGEST_HTML = """\
+<html>
+<body style="font-family: Arial, sans-serif;">
+    <h2 style="color: #2a3f5f; border-bottom: 2px solid #4CAF50; padding-bottom: 10px;">
+        {{ title }}
+    </h2>
+
+    <div style="margin: 20px 0;">
+        <p>Dear Approver,</p>
+        <p>{{ pos | length }} purchase request{{ 's' if pos | length != 1 }}:</p>
+
+        <table style="border-collapse: collapse; width: 100%; margin: 20px 0;">
+            <tr style="background-color: #f8f9fa;">
+{% for label, key in fields %}
+                <th style="padding: 8px; border: 1px solid #ddd; text-align: left;">{{ label }}</th>
+{% endfor %}
+            </tr>
+{% for po in pos %}
+            <tr>
+{%- for label, key in fields %}
+<td style="padding: 8px; border: 1px solid #ddd;">
+{%- if key == 'Item URL' %}<a href="{{ po.get(key, '') | safe_url }}">{{ po.get(key, '') }}</a>
+{%- else %}{{ po.get(key, '') }}{% endif %}</td>
+{%- endfor %}</tr>
+{% endfor %}
+        </table>
+    </div>
+</body>
+</html>
+"""
+
+ORDER_TXT = """\
+Dear Ordering,
+
+R&D would like to order the following:
+
+- Requester: {{ form['Requester'] | oneline }}
+- Request Date and Time: {{ form['Request_DateTime'] | oneline }}
+- Link to Item(s): {{ form['Link'] | oneline }}
+- Quantity of Item(s): {{ form['Quantity'] | oneline }}
+- Shipment Address: {{ form['Address'] | oneline }}
+- Attention To: {{ form['Attention_To'] | oneline }}
+- Department: {{ form['Department'] | oneline }}
+- Description of Use: {{ form['Description'] | oneline }}
+- Classification Code: {{ form['Classification'] | oneline }}
+- Urgency: {{ form['Urgency'] | oneline }}
+
+Regards,
+{{ form['Requester'] | oneline }}"""
+
+TEMPLATES = {
+    "confirmation.html": CONFIRMATION_HTML,
+    "digest.html": DIGEST_HTML,
+    "order.txt": ORDER_TXT
+}
+
+# A scheme, unless what follows the colon is a port number (vendor.com:8080)
+_SCHEME = re.compile(r"([a-zA-Z][a-zA-Z0-9+.-]*):(?!\d)")
+
+def _safe_url(value):
+    # Escaping keeps a URL inside its attribute, not javascript: out of it
+    url = str(value).strip()
+    scheme = _SCHEME.match(url)
+    if scheme:
+        return url if scheme.group(1).lower() in ("http", "https") else "#"
+    # Bare links as typed into the form, e.g. vendor.com/item
+    host = url.lstrip("/").split("/", 1)[0]
+    if "." not in host or any(c.isspace() for c in url):
+        return "#"
+    return "https://" + url.lstrip("/")
+
+def _oneline(value):
+    return " ".join(str(value).split())
+
+_lock = threading.Lock()
+
+@lru_cache(maxsize=None)
+def _environment():
+    env = Environment(
+        loader=DictLoader(TEMPLATES),
+        autoescape=select_autoescape(enabled_extensions=("html",), default_for_string=False),
+        undefined=StrictUndefined,
+        trim_blocks=True,
+        auto_reload=False
+    )
+    env.filters["safe_url"] = _safe_url
+    env.filters["oneline"] = _oneline
+    return env
+
+def get_template(name):
+    """Compiled template by name; compiled on first use, then reused."""
+    # lru_cache alone could compile twice when two sessions race on first use
+    with _lock:
+        return _environment().get_template(name)
+
+def render_many(name, contexts):
+    """Render one template for each context dict, in order."""
+    render = get_template(name).render
+    return [render(context) for context in contexts]
+
+def render_confirmation(po_data, user_email):
+    """HTML body of the new-request email sent to the approver."""
+    return get_template("confirmation.html").render(po=dict(po_data, Email=user_email), fields=PO_FIELDS)
+
+def render_confirmations(pos):
+    """Confirmation bodies for many POs; each dict carries its own "Email"."""
+    return render_many("confirmation.html", ({"po": po, "fields": PO_FIELDS} for po in pos))
+
+def render_order_text(form_data):
+    """Plain-text body of the order email sent to Ordering."""
+    return get_template("order.txt").render(form=form_data)
+
+def render_digest(pos, title="Purchase requests awaiting approval"):
+    """One HTML email listing every PO in pos."""
+    return get_template("digest.html").render(pos=list(pos), title=title, fields=PO_FIELDS)
+
+def _fstring_confirmation(user_email, po_data):
+    # The inline body send_confirmation used to build, for the benchmark
+    return f"""
+    <html>
+    <body style="font-family: Arial, sans-serif;">
+        <h2 style="color: #2a3f5f; border-bottom: 2px solid #4CAF50; padding-bottom: 10px;">
+            New Purchase Request: {po_data['PO Number']}
+        </h2>
+        
+        <div style="margin: 20px 0;">
+            <p>Dear Approver,</p>
+            <p>A new purchase request has been submitted:</p>
+            
+            <table style="border-collapse: collapse; width: 100%; margin: 20px 0;">
+                <tr style="background-color: #f8f9fa;">
+                    <th style="padding: 12px; border: 1px solid #ddd; text-align: left;">Field</th>
+                    <td style="padding: 12px; border: 1px solid #ddd; text-align: left;">Value</td>
+                </tr>
+                <tr><th>PO Number</th><td>{po_data['PO Number']}</td></tr>
+                <tr><th>Requester</th><td>{po_data['Requester']}</td></tr>
+                <tr><th>Requester Email</th><td>{user_email}</td></tr>
+                <tr><th>Request Date</th><td>{po_data['Timestamp']}</td></tr>
+                <tr><th>Item URL</th><td><a href="{po_data['Item URL']}">{po_data['Item URL']}</a></td></tr>
+                <tr><th>Quantity</th><td>{po_data['Quantity']}</td></tr>
+                <tr><th>Attention To</th><td>{po_data['Attention']}</td></tr>
+                <tr><th>Category</th><td>{po_data['Category']}</td></tr>
+                <tr><th>Urgency</th><td>{po_data['Urgency']}</td></tr>
+                <tr><th>Description</th><td>{po_data['Description']}</td></tr>
+            </table>
+            
+            <p style="margin-top: 20px;">
+                Regards,<br>
+                <strong>{po_data['Requester']}</strong><br>
+                <em>R&D Team</em>
+            </p>
+        </div>
+    </body>
+    </html>
+    """
+
+def _measure(count=5000):
+    """Render throughput of f-strings, per-PO templates and one digest."""
+    import time
+
+    pos = [{
+        "PO Number": f"RD-PO-240101-{i:06d}",
+        "Requester": f"Person {i % 40}",
+        "Email": f"person.{i % 40}@ketos.co",
+        "Timestamp": f"2024-{i % 12 + 1:02d}-{i % 28 + 1:02d} 10:{i % 60:02d}:00",
+        "Item URL": f"https://vendor.example.com/item/{i}?ref=po&qty={i % 9 + 1}",
+        "Quantity": i % 9 + 1,
+        "Attention": f"Person {i % 17}",
+        "Category": "Parts & Tools",
+        "Urgency": "Urgent" if i % 7 == 0 else "Normal",
+        "Description": f"Replacement <part> number {i} for the bench rig",
+        "Status": "Pending"
+    } for i in range(count)]
+
+    started = time.perf_counter()
+    _environment.cache_clear()
+    get_template("confirmation.html")
+    get_template("digest.html")
+    compiled = time.perf_counter() - started
+
+    timings = {}
+    started = time.perf_counter()
+    for po in pos:
+        _fstring_confirmation(po["Email"], po)
+    timings["f-string (no escaping)"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for po in pos:
+        render_confirmation(po, po["Email"])
+    timings["render_confirmation"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    render_confirmations(pos)
+    timings["render_confirmations"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    render_digest(pos)
+    timings["render_digest"] = time.perf_counter() - started
+
+    print(f"compile (once per process): {compiled * 1000:.1f} ms")
+    for name, seconds in timings.items():
+        print(f"{name:<24} {count / seconds:>9.0f} POs/sec")
+    return timings
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Measure email template render throughput.")
+    parser.add_argument("--count", type=int, default=5000, help="POs rendered per run")
+    _measure(parser.parse_args().count)
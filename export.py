@@ -0,0 +1,125 @@
+"""Streaming export of the purchase request history.
+
+Usage:
+    python export.py history.parquet [--start 2024-01-01 --end 2024-02-01]
+                     [--columns "PO Number,Timestamp,Status"] [--source local]
+
+Requests are read and written one chunk at a time, so memory use stays flat
+no matter how long the history is. The format follows the output file's
+extension (.csv, .jsonl or .parquet) unless --format is given.
+"""
+import argparse
+from pathlib import Path
+import pandas as pd
+from google_sheets import iter_request_chunks, READ_CHUNK_SIZE
+
+FORMATS = ("csv", "jsonl", "parquet")
+
+# Timestamp column of each source
+TIMESTAMP_COLUMNS = {
+    "sheet": "Timestamp",
+    "local": "Request_DateTime"
+}
+
+def iter_source_chunks(source, chunk_size=READ_CHUNK_SIZE, start=None, end=None):
+    """Yield the history of a source as DataFrames of string columns.
+
+    start and end skip sheet shards outside the range, and start skips
+    local archives compacted before it; rows still need filter_chunk.
+    """
+    if source == "sheet":
+        for records in iter_request_chunks(chunk_size, start, end):
+            yield pd.DataFrame(records, dtype=str)
+    elif source == "local":
+        from data_utils import PurchaseData
+        yield from PurchaseData().iter_chunks(chunk_size, start)
+    else:
+        raise ValueError(f"Unknown source: {source}")
+
+def filter_chunk(df, timestamp_column, start=None, end=None, columns=None):
+    """Keep rows with start <= timestamp < end, then select columns."""
+    if start is not None or end is not None:
+        # Local timestamps carry a timezone abbreviation after the seconds
+        timestamps = pd.to_datetime(df[timestamp_column].str.slice(0, 19), errors="coerce")
+        keep = timestamps.notna()
+        if start is not None:
+            keep &= timestamps >= start
+        if end is not None:
+            keep &= timestamps < end
+        df = df[keep]
+    if columns:
+        df = df[columns]
+    return df
+
+class ChunkWriter:
+    """Append DataFrame chunks to a CSV, JSONL or Parquet file."""
+
+    def __init__(self, path, fmt):
+        if fmt not in FORMATS:
+            raise ValueError(f"Unsupported format: {fmt}")
+        self.path = Path(path)
+        self.fmt = fmt
+        self.rows = 0
+        self._parquet_writer = None
+        self._started = False
+
+    def write(self, df):
+        if self.fmt == "parquet":
+            self._write_parquet(df)
+        elif self.fmt == "csv":
+            df.to_csv(self.path, mode="a" if self._started else "w", header=not self._started, index=False)
+        else:
+            with open(self.path, "a" if self._started else "w", encoding="utf-8") as f:
+                if len(df):
+                    f.write(df.to_json(orient="records", lines=True, force_ascii=False).rstrip("\n") + "\n")
+        self._started = True
+        self.rows += len(df)
+
+    def _write_parquet(self, df):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("Parquet export requires pyarrow (pip install pyarrow)")
+
+        table = pa.Table.from_pandas(df.astype(str), preserve_index=False)
+        if self._parquet_writer is None:
+            self._parquet_writer = pq.ParquetWriter(str(self.path), table.schema, compression="zstd")
+        self._parquet_writer.write_table(table)
+
+    def close(self):
+        if self._parquet_writer is not None:
+            self._parquet_writer.close()
+            self._parquet_writer = None
+
+def export_requests(path, fmt=None, source="sheet", start=None, end=None, columns=None, chunk_size=READ_CHUNK_SIZE):
+    """Stream the request history of a source into a file; returns the row count."""
+    fmt = fmt or Path(path).suffix.lstrip(".").lower()
+    start = pd.Timestamp(start) if start else None
+    end = pd.Timestamp(end) if end else None
+
+    writer = ChunkWriter(path, fmt)
+    try:
+        for chunk in iter_source_chunks(source, chunk_size, start, end):
+            writer.write(filter_chunk(chunk, TIMESTAMP_COLUMNS[source], start, end, columns))
+    finally:
+        writer.close()
+    return writer.rows
+
+def main():
+    parser = argparse.ArgumentParser(description="Export purchase request history.")
+    parser.add_argument("path", help="output file (.csv, .jsonl or .parquet)")
+    parser.add_argument("--format", choices=FORMATS, help="output format (default: from the file extension)")
+    parser.add_argument("--source", choices=sorted(TIMESTAMP_COLUMNS), default="sheet", help="where to read requests from")
+    parser.add_argument("--start", help="first date to include, e.g. 2024-01-01")
+    parser.add_argument("--end", help="first date to exclude, e.g. 2024-02-01")
+    parser.add_argument("--columns", help="comma-separated columns to export")
+    parser.add_argument("--chunk-size", type=int, default=READ_CHUNK_SIZE, help="rows per read")
+    args = parser.parse_args()
+
+    columns = [column.strip() for column in args.columns.split(",")] if args.columns else None
+    rows = export_requests(args.path, args.format, args.source, args.start, args.end, columns, args.chunk_size)
+    print(f"Exported {rows} rows to {args.path}")
+
+if __name__ == "__main__":
+    main()
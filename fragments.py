@@ -0,0 +1,66 @@
+import time
+import functools
+import streamlit as st
+from profiler import timed_rerun
+
+# Data refresh policies for independently rerunning panels
+MANUAL = "manual"        # reload only when the panel's refresh button is pressed
+INTERVAL = "interval"    # reload once the cached data is older than `interval` seconds
+ON_WRITE = "on_write"    # reload after this session has written new data
+
+def panel(run_every=None):
+    """Turn a render function into a fragment that reruns on its own.
+
+    Widget interaction inside the panel reruns only that panel, so other tabs
+    and panels keep their rendered output and make no API calls. `run_every`
+    (seconds) lets a panel wake up periodically to check its refresh policy.
+    Panel reruns are timed by the rerun profiler under the function's name.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def run(*args, **kwargs):
+            with timed_rerun(func.__name__):
+                return func(*args, **kwargs)
+        return st.fragment(run_every=run_every)(run)
+    return decorator
+
+def mark_written():
+    """Record that this session wrote data, invalidating ON_WRITE panels."""
+    st.session_state.data_version = st.session_state.get("data_version", 0) + 1
+
+def request_refresh(name):
+    """Force the named panel to reload its data on its next run."""
+    st.session_state.setdefault("panel_refresh_requests", set()).add(name)
+
+def refresh_button(name, label="🔄 Refresh"):
+    """Render a button that reloads the named panel's data when pressed."""
+    if st.button(label, key=f"panel_refresh_{name}"):
+        request_refresh(name)
+
+def needs_refresh(name, policy=ON_WRITE, interval=None):
+    """Check whether the named panel has to reload its data."""
+    state = st.session_state.get(f"panel_state_{name}")
+    if state is None:
+        return True
+    if name in st.session_state.get("panel_refresh_requests", set()):
+        return True
+    if policy == ON_WRITE:
+        return state["version"] != st.session_state.get("data_version", 0)
+    if policy == INTERVAL:
+        return interval is not None and time.time() - state["loaded_at"] >= interval
+    return False
+
+def mark_refreshed(name, data=None):
+    """Store freshly loaded data for the named panel."""
+    st.session_state.get("panel_refresh_requests", set()).discard(name)
+    st.session_state[f"panel_state_{name}"] = {
+        "data": data,
+        "version": st.session_state.get("data_version", 0),
+        "loaded_at": time.time()
+    }
+
+def panel_data(name, loader, policy=ON_WRITE, interval=None):
+    """Return the named panel's data, calling `loader` only when its policy says so."""
+    if needs_refresh(name, policy, interval):
+        mark_refreshed(name, loader())
+    return st.session_state[f"panel_state_{name}"]["data"]
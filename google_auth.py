@@ -5,9 +5,12 @@ from google_auth_oauthlib.flow import Flow
 from googleapiclient.discovery import build
 from google.auth.transport.requests import Request
 from urllib.parse import urlencode
-import requests
 from requests.exceptions import ConnectionError, SSLError
 import secrets
+from http_pool import get_session, authorized_http
+
+# Approval emails go here; also the only admin unless admin_emails is set in secrets
+APPROVER_EMAIL = "ermias@ketos.co"
 
 # Configuration
 SCOPES = [
@@ -19,7 +22,7 @@ SCOPES = [
 def check_google_connection():
     """Check if we can connect to Google's services"""
     try:
-        requests.get('https://accounts.google.com', timeout=5)
+        get_session().get('https://accounts.google.com', timeout=5)
         return True
     except (ConnectionError, SSLError) as e:
         st.error("Unable to connect to Google services. Please check your internet connection.")
@@ -29,12 +32,25 @@ def check_google_connection():
         st.error(f"Unexpected error checking connection: {str(e)}")
         return False
 
+def is_admin(user_email):
+    """Check whether a user may see the admin tools"""
+    return user_email in st.secrets.get("admin_emails", [APPROVER_EMAIL])
+
 def generate_state_parameter():
     """Generate a secure state parameter for OAuth"""
     if 'oauth_state' not in st.session_state:
         st.session_state.oauth_state = secrets.token_urlsafe(32)
     return st.session_state.oauth_state
 
+def get_credentials():
+    """This session's OAuth credentials, or None if signed out"""
+    return st.session_state.get('google_auth', {}).get('creds')
+
+def sign_out():
+    """Forget this session's sign-in"""
+    if 'google_auth' in st.session_state:
+        del st.session_state['google_auth']
+
 def authenticate_user():
     """Modernized authentication flow with HTTPS support"""
     if 'google_auth' not in st.session_state:
@@ -43,8 +59,10 @@ def authenticate_user():
             'email': None
         }
 
-    # Return cached credentials if valid
-    if st.session_state.google_auth['creds'] and st.session_state.google_auth['creds'].valid:
+    # Return cached credentials if valid. They stay in session state rather
+    # than the session store, whose eviction would sign users out
+    creds = get_credentials()
+    if creds and creds.valid:
         return st.session_state.google_auth['email']
 
     try:
@@ -75,22 +93,20 @@ def authenticate_user():
                     # Verify state parameter
                     if 'state' not in st.query_params or st.query_params['state'] != st.session_state.oauth_state:
                         st.error("Invalid state parameter. Please try again.")
-                        if 'google_auth' in st.session_state:
-                            del st.session_state['google_auth']
+                        sign_out()
                         st.stop()
                     
                     flow.fetch_token(code=st.query_params['code'])
                     creds = flow.credentials
                     
                     # Get user info
-                    user_info_service = build("oauth2", "v2", credentials=creds)
+                    user_info_service = build("oauth2", "v2", http=authorized_http(creds))
                     user_info = user_info_service.userinfo().get().execute()
                     
                     # Validate email domain
                     if not user_info['email'].endswith('@ketos.co'):
                         st.error("Please use your @ketos.co email address")
-                        if 'google_auth' in st.session_state:
-                            del st.session_state['google_auth']
+                        sign_out()
                         st.stop()
                     
                     # Store in session state
@@ -106,12 +122,11 @@ def authenticate_user():
                 except Exception as e:
                     st.error("Authentication failed. Please try again.")
                     st.error(f"Error details: {str(e)}")
-                    if 'google_auth' in st.session_state:
-                        del st.session_state['google_auth']
+                    sign_out()
                     st.stop()
 
         # Show login button if not authenticated
-        if not st.session_state.google_auth['creds']:
+        if not creds:
             # Generate state parameter
             state = generate_state_parameter()
             
@@ -180,14 +195,15 @@ def authenticate_user():
 def send_email(sender_email, subject, email_body):
     """Improved email sending with better error handling"""
     try:
-        if 'google_auth' not in st.session_state or not st.session_state.google_auth['creds']:
+        creds = get_credentials()
+        if not creds:
             st.error("Authentication required to send emails")
             return False
 
-        service = build('gmail', 'v1', credentials=st.session_state.google_auth['creds'])
+        service = build('gmail', 'v1', http=authorized_http(creds))
         
         message = MIMEText(email_body, 'html')
-        message['to'] = "ermias@ketos.co"
+        message['to'] = APPROVER_EMAIL
         message['from'] = f"Ketos PO System <{sender_email}>"
         message['subject'] = subject
         
@@ -1,21 +1,132 @@
+import logging
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
 import streamlit as st
+from streamlit import runtime
 import gspread
 from google.oauth2.service_account import Credentials
+from record_store import RecordStore, MISSING
+from search_index import SearchIndex
+from approval_queue import ApprovalQueue, PENDING
+import archive
+from sheet_cache import WriteThroughCache, DerivedIndex
+from shared_cache import get_shared_cache
+from backup_uploader import get_backup_uploader
+from http_pool import authorized_session, auth_request
+
+logger = logging.getLogger(__name__)
 
 # Define Google Sheets API scope
 SCOPES = ["https://www.googleapis.com/auth/spreadsheets"]
 
+SHEET_ID = "1Su8RA77O7kixU03jrm6DhDOAUYijW-JBBDZ7DK6ulrY"
+# Legacy worksheet holding every request written before partitioning
+WORKSHEET_NAME = "Sheet1"
+
+# Requests are partitioned into one worksheet per period ("month" or
+# "quarter"); the catalog worksheet lists each shard, the dates it covers and,
+# once it has been moved to cold storage, its archive file.
+PARTITION_PERIOD = "month"
+SHARD_PREFIX = "Requests "
+CATALOG_WORKSHEET = "Shard Catalog"
+CATALOG_COLUMNS = ["Shard", "Start", "End", "Archive"]
+
+# Shards that ended more than HOT_WINDOW_DAYS ago are archived once every
+# request in them is closed, and after MAX_HOT_DAYS whatever their status.
+HOT_WINDOW_DAYS = 90
+MAX_HOT_DAYS = 365
+# Seconds an archived shard's worksheet is kept, so workers still holding
+# the previous catalog can finish reading it
+ARCHIVE_GRACE_SECONDS = 60 * 60
+
+# Column order of the purchase request worksheet (row 1 holds these headers)
+COLUMNS = [
+    "PO Number", "Requester", "Email", "Timestamp", "Item URL", "Quantity",
+    "Attention", "Category", "Description", "Urgency", "Status"
+]
+LAST_COLUMN = chr(ord("A") + len(COLUMNS) - 1)
+
+CATEGORIES = ["Lab Supplies", "Testing", "Parts & Tools", "Prototype", "Other"]
+URGENCY_LEVELS = ["Normal", "Urgent"]
+STATUSES = ["Pending", "Approved", "Rejected"]
+
+# Rows per append_rows call when writing many requests at once
+APPEND_CHUNK_SIZE = 500
+# Rows per range read when streaming the full history
+READ_CHUNK_SIZE = 5000
+# Seconds before the shared catalog, search index and record store are
+# rebuilt regardless of version, which also picks up edits made by hand
+RECORD_STORE_TTL = 300
+# Every write appends to the sync log; its row count is the sheet's version
+SYNC_WORKSHEET = "Sync Log"
+# Seconds between checks of the sheet's version by the shared record store
+VERSION_CHECK_SECONDS = 5
+# Seconds a service account token is shared between workers (tokens last an hour)
+SHEETS_TOKEN_TTL = 3000
+# Independent reads run on a small thread pool, within the per-user Sheets
+# read quota of 60 requests per minute
+MAX_PARALLEL_READS = 4
+READ_REQUESTS_PER_MINUTE = 60
+
+class ReadBudgetExceeded(RuntimeError):
+    """The Sheets read quota for the current minute is used up."""
+
+class _ReadBudget:
+    """Sliding one-minute window of read requests.
+
+    The window is kept in the shared SQLite cache, so every worker process
+    on the host draws from the same budget, as they do from the same quota.
+    """
+
+    def __init__(self, per_minute):
+        self.per_minute = per_minute
+
+    def acquire(self, count=1, wait=None):
+        """Count `count` reads against the budget.
+
+        Over budget, scripts (no Streamlit server) wait for a slot, while in
+        the app ReadBudgetExceeded is raised at once rather than stalling
+        the rerun for up to a minute. `wait` overrides that choice. Call it
+        on the script thread: reads made by fetch_parallel workers are
+        counted before the workers start.
+        """
+        if wait is None:
+            wait = not runtime.exists()
+        cache = get_shared_cache()
+        for _ in range(count):
+            while True:
+                retry_in = cache.take("sheets_reads", self.per_minute, 60)
+                if not retry_in:
+                    break
+                if not wait:
+                    logger.warning(f"Sheets read budget of {self.per_minute}/min used up")
+                    raise ReadBudgetExceeded(f"Google Sheets is busy, try again in {retry_in:.0f}s")
+                time.sleep(retry_in)
+
+_read_budget = _ReadBudget(READ_REQUESTS_PER_MINUTE)
+
 def get_google_sheets_client():
     """Authenticate and return a Google Sheets client."""
     try:
         creds = Credentials.from_service_account_info(
             st.secrets["gcp_service_account"], scopes=SCOPES
         )
-        return gspread.authorize(creds)
+        # One worker fetches the access token; the others reuse it
+        creds.token, creds.expiry = get_shared_cache().get_or_refresh(
+            "sheets_token", lambda: _fetch_token(creds), ttl=SHEETS_TOKEN_TTL
+        )
+        return gspread.authorize(creds, session=authorized_session(creds))
     except Exception as e:
         st.error(f"Error connecting to Google Sheets: {str(e)}")
         return None
 
+def _fetch_token(creds):
+    creds.refresh(auth_request())
+    return creds.token, creds.expiry
+
 def update_google_sheet(form_data):
     """Append a new purchase request to the Google Sheet."""
     client = get_google_sheets_client()
@@ -23,24 +134,14 @@ def update_google_sheet(form_data):
         return False
 
     try:
-        SHEET_ID = "1Su8RA77O7kixU03jrm6DhDOAUYijW-JBBDZ7DK6ulrY"  
-        sheet = client.open_by_key(SHEET_ID)
-        worksheet = sheet.worksheet("Sheet1")
-
-        # Append the new row to the sheet
-        worksheet.append_row([
-            form_data['PO Number'],
-            form_data['Requester'],
-            form_data['Email'],
-            form_data['Timestamp'],
-            form_data['Item URL'],
-            form_data['Quantity'],
-            form_data['Attention'],
-            form_data['Category'],
-            form_data['Description'],
-            form_data['Urgency'],
-            form_data['Status']
-        ])
+        sheet = _open_sheet(client)
+        worksheet = _shard_worksheet(sheet, form_data["Timestamp"])
+
+        # Append the new row to the shard for its timestamp
+        response = worksheet.append_row([form_data[column] for column in COLUMNS])
+        _index_appended_rows(response, worksheet.title, [form_data["PO Number"]])
+        _write_through(sheet, "append", 1, lambda version: _get_store_cache().append([form_data], version))
+        _index_new_requests([form_data])
         
         st.success("✅ Data successfully added to Google Sheets!")
         return True
@@ -48,25 +149,725 @@ def update_google_sheet(form_data):
         st.error(f"Error updating Google Sheet: {str(e)}")
         return False
 
-def get_user_requests(user_email):
-    """Fetch user's past requests from Google Sheets."""
+def append_requests(records, chunk_size=APPEND_CHUNK_SIZE):
+    """Append many purchase requests using chunked append_rows calls.
+
+    Records are grouped by the shard their timestamp falls in. Returns the
+    PO Numbers of the rows written; if a chunk fails, the rows of the earlier
+    chunks stay written and are included, so the caller can tell which
+    records still need writing.
+    """
+    client = get_google_sheets_client()
+    if not client:
+        return []
+
+    # Each shard gets its own chunked appends, in the order records arrive
+    shards = {}
+    for record in records:
+        shards.setdefault(_partition(record["Timestamp"])[0], []).append(record)
+
+    written = []
+    sheet = None
+    try:
+        sheet = _open_sheet(client)
+        for shard_records in shards.values():
+            worksheet = _shard_worksheet(sheet, shard_records[0]["Timestamp"])
+            for start in range(0, len(shard_records), chunk_size):
+                chunk = shard_records[start:start + chunk_size]
+                response = worksheet.append_rows([[record[column] for column in COLUMNS] for record in chunk])
+                _index_appended_rows(response, worksheet.title, [record["PO Number"] for record in chunk])
+                written.extend(chunk)
+    except Exception as e:
+        st.error(f"Error appending requests after {len(written)} rows: {str(e)}")
+
+    if written:
+        _write_through(sheet, "append", len(written), lambda version: _get_store_cache().append(written, version))
+        _index_new_requests(written)
+    return [record["PO Number"] for record in written]
+
+def _open_sheet(client=None):
+    """Open the spreadsheet, raising if Sheets is unreachable.
+
+    gspread reads the spreadsheet's metadata to open it, which counts
+    against the read budget.
+    """
+    client = client or get_google_sheets_client()
+    if not client:
+        raise ConnectionError("Could not connect to Google Sheets")
+    _read_budget.acquire()
+    return client.open_by_key(SHEET_ID)
+
+def _worksheet(sheet, title):
+    """Look up a worksheet by title; gspread reads the metadata to find it."""
+    _read_budget.acquire()
+    return sheet.worksheet(title)
+
+@st.cache_resource(show_spinner=False)
+def _get_store_cache():
+    """Write-through cache of the hot request history, one per process."""
+    def fetch():
+        sheet = _open_sheet()
+        return RecordStore.from_records(_read_shards(sheet, _hot_shards(sheet)), columns=COLUMNS)
+
+    # Snapshots and version checks go through the cross-process cache, so
+    # only one worker at a time reads them from the sheet
+    def load(version):
+        return get_shared_cache().get_or_refresh("record_store", fetch, ttl=RECORD_STORE_TTL, min_version=version)
+
+    return WriteThroughCache(load, _sheet_version, VERSION_CHECK_SECONDS, RECORD_STORE_TTL)
+
+def get_record_store():
+    """Hot request history as a RecordStore shared by every session.
+
+    Writes made by this process are applied in place; the sheet is only
+    re-read after another process has written. Raises on failure.
+    """
+    return _get_store_cache().get()
+
+def _sheet_version(sheet=None):
+    """Sheet version, read from the sync log by one worker at most every VERSION_CHECK_SECONDS."""
+    return get_shared_cache().get_or_refresh(
+        "sheet_version", lambda: _remote_version(sheet or _open_sheet()), ttl=VERSION_CHECK_SECONDS
+    )
+
+def _remote_version(sheet):
+    """Current version of the sheet: the number of entries in the sync log."""
+    _read_budget.acquire()
+    try:
+        values = sheet.values_get(_a1(SYNC_WORKSHEET, "B1")).get("values", [])
+    except gspread.exceptions.APIError:
+        try:
+            _worksheet(sheet, SYNC_WORKSHEET)
+        except gspread.exceptions.WorksheetNotFound:
+            # Nothing has been written since the sync log was introduced
+            return 0
+        raise
+    return int(values[0][0]) if values and values[0] else 0
+
+def _write_through(sheet, kind, rows, apply):
+    """Log a write to the sync log and apply it to this process's cached store."""
+    try:
+        version = _log_write(sheet, kind, rows)
+        get_shared_cache().set("sheet_version", version, VERSION_CHECK_SECONDS)
+        apply(version)
+    except Exception as e:
+        # Without a version stamp the cached store can no longer be trusted
+        _get_store_cache().invalidate()
+        st.warning(f"Sync log not updated: {str(e)}")
+
+def _log_write(sheet, kind, rows):
+    """Append a sync log entry for a write and return the version it created."""
+    try:
+        worksheet = _worksheet(sheet, SYNC_WORKSHEET)
+    except gspread.exceptions.WorksheetNotFound:
+        try:
+            worksheet = sheet.add_worksheet(SYNC_WORKSHEET, rows=1000, cols=3)
+            worksheet.update(range_name="A1:B1", values=[["Version", "=COUNTA(A2:A)"]], value_input_option="USER_ENTERED")
+        except gspread.exceptions.APIError:
+            worksheet = _worksheet(sheet, SYNC_WORKSHEET)
+
+    response = worksheet.append_row([datetime.now().strftime("%Y-%m-%d %H:%M:%S"), kind, rows])
+    updated_range = (response or {}).get("updates", {}).get("updatedRange", "")
+    match = re.search(r"![A-Z]+(\d+)", updated_range)
+    # Row 1 is the header, so the entry on row n is version n - 1
+    return int(match.group(1)) - 1 if match else -1
+
+def _derived_index(key, build):
+    """Index over the shared record store, rebuilt when the store is reloaded.
+
+    Builds go through the cross-process cache with the store's version as
+    min_version, so one worker builds the index per sync log version.
+    """
+    return DerivedIndex(_get_store_cache(), lambda store, version: get_shared_cache().get_or_refresh(
+        key, lambda: build(store.rows()), ttl=RECORD_STORE_TTL, min_version=version
+    ))
+
+@st.cache_resource(show_spinner=False)
+def _get_search_index_cache():
+    return _derived_index("search_index", SearchIndex.from_records)
+
+@st.cache_resource(show_spinner=False)
+def _get_approval_queue_cache():
+    return _derived_index("approval_queue", ApprovalQueue.from_records)
+
+def get_search_index():
+    """Full-text search index shared by every session, current with the record store."""
+    return _get_search_index_cache().get()
+
+def get_approval_queue():
+    """Queue of pending requests shared by every session, current with the record store."""
+    return _get_approval_queue_cache().get()
+
+
+def _index_new_requests(records):
+    """Add freshly written requests to the shared search index and approval queue."""
+    # Scripts such as bulk_import run without a server and share no index
+    if not runtime.exists():
+        return
+    try:
+        index = get_search_index()
+        queue = get_approval_queue()
+        for record in records:
+            index.add(record)
+            queue.add(record)
+    except Exception as e:
+        st.warning(f"Search index not updated: {str(e)}")
+
+@st.cache_resource(ttl=RECORD_STORE_TTL, show_spinner=False)
+def get_shard_catalog():
+    """Shard catalog shared by every session; filled from the sheet on first use."""
+    return []
+
+@st.cache_resource(ttl=RECORD_STORE_TTL, show_spinner=False)
+def _catalog_version():
+    """Sheet version the shared shard catalog was loaded at, in a one-item list."""
+    return [-1]
+
+def _partition(timestamp, period=PARTITION_PERIOD):
+    """Shard name, first day and first day after the partition of a timestamp."""
+    try:
+        day = datetime.strptime(str(timestamp).strip()[:10], "%Y-%m-%d").date()
+    except ValueError:
+        day = date.today()
+
+    if period == "quarter":
+        first_month = (day.month - 1) // 3 * 3 + 1
+        name = f"{day.year}-Q{(day.month - 1) // 3 + 1}"
+        months = 3
+    else:
+        first_month = day.month
+        name = f"{day.year}-{day.month:02d}"
+        months = 1
+
+    next_month = first_month + months
+    start = date(day.year, first_month, 1)
+    end = date(day.year + (next_month - 1) // 12, (next_month - 1) % 12 + 1, 1)
+    return SHARD_PREFIX + name, start.isoformat(), end.isoformat()
+
+def _load_catalog(sheet, catalog, version=None):
+    """Fill the shared catalog in place from the catalog worksheet.
+
+    With a version, the catalog is taken from the cross-process cache unless
+    it was read before that version, so one worker reads the worksheet per
+    change of the sync log; without one, the worksheet is read directly.
+    """
+    if version is None:
+        catalog[:] = _read_catalog(sheet)
+    else:
+        catalog[:] = get_shared_cache().get_or_refresh(
+            "shard_catalog", lambda: _read_catalog(sheet or _open_sheet()), ttl=RECORD_STORE_TTL, min_version=version
+        )
+        _catalog_version()[0] = version
+    return catalog
+
+def _read_catalog(sheet):
+    """Catalog entries from the catalog worksheet, oldest first.
+
+    On first use the catalog worksheet is created with a single entry for the
+    legacy worksheet, which holds everything written up to the end of the
+    current period.
+    """
+    try:
+        worksheet = _worksheet(sheet, CATALOG_WORKSHEET)
+        _read_budget.acquire()
+        rows = worksheet.get_all_values()[1:]
+    except gspread.exceptions.WorksheetNotFound:
+        rows = [[WORKSHEET_NAME, "", _partition(date.today().isoformat())[2]]]
+        try:
+            worksheet = sheet.add_worksheet(CATALOG_WORKSHEET, rows=100, cols=len(CATALOG_COLUMNS))
+            worksheet.append_rows([CATALOG_COLUMNS] + rows)
+        except gspread.exceptions.APIError:
+            # Another worker created it first
+            worksheet = _worksheet(sheet, CATALOG_WORKSHEET)
+            _read_budget.acquire()
+            rows = worksheet.get_all_values()[1:]
+
+    shards = {}
+    for row in rows:
+        row = row + [""] * (len(CATALOG_COLUMNS) - len(row))
+        if row[0]:
+            shard = dict(zip(CATALOG_COLUMNS, row))
+            if shard["Archive"]:
+                shard["Archive"] = str(archive.resolve_archive(shard["Archive"]))
+            shards[row[0]] = shard
+    return sorted(shards.values(), key=lambda shard: (shard["Start"], shard["End"]))
+
+def _catalog(sheet=None):
+    """Shared shard catalog, reloaded once the sync log has moved past it.
+
+    Archiving logs a write, so other workers pick up archived shards within
+    VERSION_CHECK_SECONDS. The sheet is only opened if it has to be read.
+    """
+    catalog = get_shard_catalog()
+    version = _sheet_version(sheet)
+    if not catalog or _catalog_version()[0] < version:
+        _load_catalog(sheet, catalog, version)
+    return catalog
+
+def _hot_shards(sheet):
+    """Catalog entries still stored in the sheet."""
+    return [shard for shard in _catalog(sheet) if not shard["Archive"]]
+
+def shards_for_range(sheet, start=None, end=None):
+    """Catalog entries whose period overlaps [start, end), oldest first.
+
+    Bounds are ISO dates or timestamps; an empty Start or End in the catalog
+    means the shard is unbounded on that side. Archived shards are included
+    only when the range reaches back into their period.
+    """
+    start = str(start) if start is not None else None
+    end = str(end) if end is not None else None
+    return [
+        shard for shard in _catalog(sheet)
+        if (end is None or not shard["Start"] or shard["Start"] < end)
+        and (start is None or not shard["End"] or shard["End"] > start)
+    ]
+
+def _shard_worksheet(sheet, timestamp):
+    """Worksheet of the partition a timestamp falls in, creating it if needed."""
+    name, start, end = _partition(timestamp)
+    catalog = _catalog(sheet)
+    if not any(shard["Shard"] == name for shard in catalog):
+        # Another worker may already have created it
+        _load_catalog(sheet, catalog)
+    base, late = name, 0
+    while any(shard["Shard"] == name and shard["Archive"] for shard in catalog):
+        # Late, back-dated requests for an archived period get a shard of
+        # their own, and a new one each time the previous one is archived
+        late += 1
+        name = f"{base} (late)" if late == 1 else f"{base} (late {late})"
+    if any(shard["Shard"] == name for shard in catalog):
+        return _worksheet(sheet, name)
+
+    try:
+        worksheet = sheet.add_worksheet(name, rows=1000, cols=len(COLUMNS))
+        worksheet.append_row(COLUMNS)
+    except gspread.exceptions.APIError:
+        worksheet = _worksheet(sheet, name)
+    _worksheet(sheet, CATALOG_WORKSHEET).append_row([name, start, end])
+    _load_catalog(sheet, catalog)
+    return worksheet
+
+def _a1(shard, cells):
+    """A1 range qualified with a shard's worksheet name."""
+    return "'" + shard.replace("'", "''") + "'!" + cells
+
+def _column_letter(column):
+    return chr(ord("A") + COLUMNS.index(column))
+
+def _row_counts(sheet):
+    """Row count of every worksheet, from one spreadsheet metadata request."""
+    _read_budget.acquire()
+    metadata = sheet.fetch_sheet_metadata({"fields": "sheets.properties(title,gridProperties.rowCount)"})
+    return {
+        worksheet["properties"]["title"]: worksheet["properties"].get("gridProperties", {}).get("rowCount", 0)
+        for worksheet in metadata.get("sheets", [])
+    }
+
+def _batch_values(sheet, ranges):
+    """Values of many ranges, across worksheets, in a single request."""
+    if not ranges:
+        return []
+    _read_budget.acquire()
+    return _fetch_batch(sheet, ranges)
+
+def _fetch_batch(sheet, ranges):
+    # The caller has already counted this read against the budget
+    response = sheet.values_batch_get(ranges)
+    return [value_range.get("values", []) for value_range in response.get("valueRanges", [])]
+
+def fetch_parallel(fetches, max_workers=MAX_PARALLEL_READS):
+    """Run independent reads concurrently and return their results in order.
+
+    Each fetch is a callable taking no arguments. Wall time is that of the
+    slowest fetch rather than the sum of all of them; the first error is
+    raised once the others have finished. Fetches run outside the script
+    thread, so they must not call Streamlit.
+    """
+    if len(fetches) <= 1:
+        return [fetch() for fetch in fetches]
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(fetches))) as pool:
+        return list(pool.map(lambda fetch: fetch(), fetches))
+
+def _read_shards(sheet, shards):
+    """Records of the given shards, in catalog order.
+
+    Hot shards are dealt round-robin into up to MAX_PARALLEL_READS batch
+    reads, which keeps quota use to a few requests; archived shards come
+    from their Parquet files. All of them are fetched concurrently.
+    """
+    hot = [shard["Shard"] for shard in shards if not shard["Archive"]]
+    groups = [hot[i::MAX_PARALLEL_READS] for i in range(min(MAX_PARALLEL_READS, len(hot)))]
+    # Workers can't use the Streamlit runtime, so their reads are counted here
+    _read_budget.acquire(len(groups))
+    fetches = [
+        lambda group=group: dict(zip(group, _fetch_batch(sheet, [_a1(name, f"A2:{LAST_COLUMN}") for name in group])))
+        for group in groups
+    ] + [
+        lambda shard=shard: {shard["Shard"]: archive.read_archive(shard["Archive"], COLUMNS)}
+        for shard in shards if shard["Archive"]
+    ]
+
+    results = {}
+    for result in fetch_parallel(fetches):
+        results.update(result)
+    for shard in shards:
+        if shard["Archive"]:
+            yield from results[shard["Shard"]]
+        else:
+            for row in results[shard["Shard"]]:
+                yield _row_to_record([row])
+
+def _set_catalog_archive(sheet, name, path):
+    """Record a shard's archive file in the catalog worksheet."""
+    worksheet = _worksheet(sheet, CATALOG_WORKSHEET)
+    _read_budget.acquire(2)
+    names = _flatten_column(worksheet.get("A1:A"))
+    archive_column = chr(ord("A") + CATALOG_COLUMNS.index("Archive"))
+    if names[:1] and len(CATALOG_COLUMNS) > len(worksheet.row_values(1)):
+        # Catalogs created before archiving lack the Archive header
+        worksheet.update(range_name=f"{archive_column}1", values=[["Archive"]])
+    worksheet.update(range_name=f"{archive_column}{names.index(name) + 1}", values=[[str(path)]])
+
+def archive_cold_shards(hot_days=HOT_WINDOW_DAYS, max_days=MAX_HOT_DAYS, drive_service=None, dry_run=False,
+                        grace_seconds=ARCHIVE_GRACE_SECONDS):
+    """Move cold shards out of the sheet into Parquet files.
+
+    A shard is cold when its period ended more than `hot_days` ago and all
+    of its requests are closed, or when it ended more than `max_days` ago.
+    Each archive is written and its row count checked before the catalog
+    points at it, so readers always find the rows in one place or the other.
+    Other workers may read the worksheet until they reload the catalog, so
+    it is only deleted by a later run, once its archive is `grace_seconds`
+    old. With a GoogleDriveService, archives are also copied to Drive by the
+    shared backup uploader; flush it before the process exits.
+    Returns the names of the archived shards.
+    """
     client = get_google_sheets_client()
     if not client:
+        raise ConnectionError("Could not connect to Google Sheets")
+
+    sheet = _open_sheet(client)
+    catalog = _load_catalog(sheet, get_shard_catalog())
+    today = date.today()
+    hot_cutoff = date.fromordinal(today.toordinal() - hot_days).isoformat()
+    max_cutoff = date.fromordinal(today.toordinal() - max_days).isoformat()
+
+    archived = []
+    for shard in [shard for shard in catalog if not shard["Archive"] and shard["End"]]:
+        if shard["End"] > hot_cutoff:
+            continue
+        records = list(_read_shards(sheet, [shard]))
+        if shard["End"] > max_cutoff and any(record["Status"] == STATUSES[0] for record in records):
+            continue
+        archived.append(shard["Shard"])
+        if dry_run:
+            continue
+
+        path = archive.archive_path(shard["Shard"])
+        archive.write_archive(records, path, COLUMNS)
+        if archive.count_archive(path) != len(records):
+            raise IOError(f"Archive of {shard['Shard']} is incomplete: {path}")
+        if drive_service is not None:
+            get_backup_uploader().request(path, drive_service, drive_service.owner, archive.PARQUET_MIMETYPE)
+
+        _set_catalog_archive(sheet, shard["Shard"], path)
+
+    if archived and not dry_run:
+        _log_write(sheet, "archive", len(archived))
+        _load_catalog(sheet, catalog)
+        get_po_row_index().clear()
+        _get_store_cache().invalidate()
+    if not dry_run:
+        _delete_archived_worksheets(sheet, catalog, grace_seconds)
+    return archived
+
+def _delete_archived_worksheets(sheet, catalog, grace_seconds):
+    """Delete the worksheets of shards archived more than grace_seconds ago."""
+    titles = _row_counts(sheet)
+    now = time.time()
+    for shard in catalog:
+        path = shard["Archive"]
+        if not path or shard["Shard"] not in titles or not os.path.exists(path):
+            continue
+        # The archive file is written once, when the shard is archived
+        if now - os.path.getmtime(path) < grace_seconds:
+            continue
+        sheet.del_worksheet(_worksheet(sheet, shard["Shard"]))
+        logger.info(f"Deleted the worksheet of archived shard {shard['Shard']}")
+
+def get_requests_in_range(start=None, end=None):
+    """Requests with start <= Timestamp < end, reading only the overlapping shards."""
+    client = get_google_sheets_client()
+    if not client:
+        return []
+
+    try:
+        return _records_in_range(_open_sheet(client), start, end)
+    except Exception as e:
+        st.error(f"Error fetching requests: {str(e)}")
         return []
 
+def _records_in_range(sheet, start, end):
+    return [
+        record for record in _read_shards(sheet, shards_for_range(sheet, start, end))
+        if (start is None or record["Timestamp"] >= str(start))
+        and (end is None or record["Timestamp"] < str(end))
+    ]
+
+@st.cache_resource(show_spinner=False)
+def get_po_row_index():
+    """Map each PO Number to its (shard, row); one map is shared by every session."""
+    return {}
+
+def _refresh_po_row_index(sheet, row_index):
+    """Rebuild the PO Number to row map in place from every shard's PO Number column."""
+    _load_catalog(sheet, get_shard_catalog())
+    shards = _hot_shards(sheet)
+    po_column = _column_letter("PO Number")
+    columns = _batch_values(sheet, [_a1(shard["Shard"], f"{po_column}2:{po_column}") for shard in shards])
+
+    row_index.clear()
+    for shard, values in zip(shards, columns):
+        for row, po in enumerate(_flatten_column(values), start=2):
+            if po:
+                row_index[po] = (shard["Shard"], row)
+
+def update_request_statuses(updates, from_status=None):
+    """Set the Status of many requests with a single batch update call.
+
+    `updates` maps PO Number to the new status. Target rows come from the
+    shared PO Number to (shard, row) map; the rows are re-read in one batch
+    first, and if any PO Number no longer matches (rows were sorted,
+    inserted or deleted by hand) the map is rebuilt and the rows re-read;
+    POs whose rows still don't match are reported as not found. With
+    `from_status`, requests whose Status in the sheet is something else
+    (decided meanwhile by another approver) are skipped and reported.
+    Returns the list of PO Numbers that were updated, or None if the update
+    failed.
+    """
+    invalid = {status for status in updates.values() if status not in STATUSES}
+    if invalid:
+        st.error(f"Invalid status: {', '.join(sorted(invalid))}")
+        return None
+
+    client = get_google_sheets_client()
+    if not client:
+        return None
+
     try:
-        SHEET_ID = "1Su8RA77O7kixU03jrm6DhDOAUYijW-JBBDZ7DK6ulrY"
-        sheet = client.open_by_key(SHEET_ID)
-        worksheet = sheet.worksheet("Sheet1")
+        sheet = _open_sheet(client)
+        row_index = get_po_row_index()
+        status_column = _column_letter("Status")
+
+        if any(po not in row_index for po in updates):
+            _refresh_po_row_index(sheet, row_index)
 
-        # Get all records
-        records = worksheet.get_all_records()
+        targets, current = _read_target_rows(sheet, row_index, updates)
+        if any(current[po]["PO Number"] != po for po in targets):
+            _refresh_po_row_index(sheet, row_index)
+            targets, current = _read_target_rows(sheet, row_index, updates)
+            # Rows moved again since the map was rebuilt are not written to
+            targets = {po: target for po, target in targets.items() if current[po]["PO Number"] == po}
 
-        # Filter records for the current user
-        user_requests = [record for record in records if record['Email'] == user_email]
+        missing = [po for po in updates if po not in targets]
+        if missing:
+            st.warning(f"PO Numbers not found: {', '.join(missing)}")
+        if from_status is not None:
+            decided = {po: current[po]["Status"] for po in targets if current[po]["Status"] != from_status}
+            if decided:
+                st.warning(f"No longer {from_status}, skipped: {', '.join(f'{po} ({status})' for po, status in decided.items())}")
+                # The shared queue and index still show the old status
+                _index_status_changes(decided)
+                targets = {po: target for po, target in targets.items() if po not in decided}
+        if not targets:
+            return []
 
-        return user_requests
+        sheet.values_batch_update({
+            "valueInputOption": "RAW",
+            "data": [
+                {"range": _a1(shard, f"{status_column}{row}"), "values": [[updates[po]]]}
+                for po, (shard, row) in targets.items()
+            ]
+        })
+
+        applied = {po: updates[po] for po in targets}
+        _write_through(sheet, "status", len(applied), lambda version: _get_store_cache().update_statuses(applied, version))
+        _index_status_changes(applied)
+        return list(targets)
+    except Exception as e:
+        st.error(f"Error updating request statuses: {str(e)}")
+        return None
+
+def _read_target_rows(sheet, row_index, updates):
+    """Rows the map points at for each PO to update, read in one batch."""
+    targets = {po: row_index[po] for po in updates if po in row_index}
+    rows = _batch_values(sheet, [_a1(shard, f"A{row}:{LAST_COLUMN}{row}") for shard, row in targets.values()])
+    return targets, {po: _row_to_record(values) for po, values in zip(targets, rows)}
+
+def _index_status_changes(updates):
+    """Apply status changes to the shared search index and approval queue."""
+    if not runtime.exists():
+        return
+    try:
+        index = get_search_index()
+        queue = get_approval_queue()
+        requeued = {po for po, status in updates.items() if status == PENDING and po not in queue}
+        records = {}
+        if requeued:
+            # Requests sent back to Pending need their fields to be queued again
+            store = get_record_store()
+            records = {record["PO Number"]: record for record in store.rows() if record["PO Number"] in requeued}
+        for po, status in updates.items():
+            index.update_status(po, status)
+            queue.update_status(po, status, records.get(po))
+    except Exception as e:
+        st.warning(f"Search index not updated: {str(e)}")
+
+def _index_appended_rows(response, shard, po_numbers):
+    """Record the rows an append landed on in the PO Number to row map."""
+    updated_range = (response or {}).get("updates", {}).get("updatedRange", "")
+    match = re.search(r"![A-Z]+(\d+)", updated_range)
+    if match:
+        first_row = int(match.group(1))
+        get_po_row_index().update({po: (shard, first_row + i) for i, po in enumerate(po_numbers)})
+
+def get_user_requests_since(user_email, start, status=None, category=None):
+    """A user's requests with Timestamp >= start, newest first.
+
+    Served from the shared record store's timestamp index in O(log n + k)
+    unless an archived shard reaches past start, in which case the
+    overlapping shards are read.
+    """
+    try:
+        catalog = _catalog()
+        if all(not shard["Archive"] or shard["End"] <= str(start) for shard in catalog):
+            store = get_record_store()
+            emails = store.codes("Email")
+            codes = [code for code, email in enumerate(store.categories("Email")) if email == user_email]
+            records = store.to_records(i for i in reversed(store.range(start)) if codes and emails[i] == codes[0])
+        else:
+            records = list(reversed(get_requests_in_range(start)))
+        return [
+            record for record in records
+            if record["Email"] == user_email
+            and (not status or record["Status"] == status)
+            and (not category or record["Category"] == category)
+        ]
     except Exception as e:
         st.error(f"Error fetching user requests: {str(e)}")
         return []
 
+def _flatten_column(values):
+    """Turn a single-column value range into a flat list of strings."""
+    return [row[0] if row else "" for row in values]
+
+def _row_to_record(values):
+    """Map a raw row onto the sheet headers, padding trailing empty cells."""
+    row = values[0] if values else []
+    return {column: row[i] if i < len(row) else "" for i, column in enumerate(COLUMNS)}
+
+def _newest_first(store, before=None):
+    """Row positions of a store by timestamp, newest first, up to a cursor timestamp.
+
+    Rows without a timestamp come last, in reverse sheet order.
+    """
+    if before != MISSING:
+        yield from reversed(store.range(None, None if before is None else before + 1))
+    timestamps = store.timestamps()
+    yield from (i for i in range(len(store) - 1, -1, -1) if timestamps[i] == MISSING)
+
+def get_user_requests_page(user_email, page_size=25, cursor=None, status=None, category=None):
+    """Fetch one page of a user's requests, newest first.
+
+    Hot shards are served from the shared record store, walking its
+    timestamp index from the newest request back, so a page costs no Sheets
+    reads beyond keeping the store current. Once those are exhausted,
+    archived shards are read from their Parquet files, newest first. Pass
+    the returned cursor back in to get the next (older) page; it is None
+    once the oldest matching request has been returned.
+    """
+    if page_size < 1:
+        raise ValueError(f"page_size must be at least 1, got {page_size}")
+    try:
+        store = get_record_store()
+        wanted = {"Email": user_email, "Status": status, "Category": category}
+        conditions = []
+        for column, value in wanted.items():
+            if value:
+                codes = store.categories(column)
+                conditions.append((store.codes(column), codes.index(value) if value in codes else -1))
+
+        # The cursor is ("hot", timestamp, n) after the n-th match handed out
+        # at that timestamp, or ("archive", shard, i) with i the next row
+        # of that archived shard to look at, counting down.
+        records = []
+        next_cursor = None
+        if cursor is None or cursor[0] == "hot":
+            timestamps = store.timestamps()
+            before, skip = (None, 0) if cursor is None else cursor[1:]
+            seen_at, seen = None, 0
+            records_at, records_seen = before, skip
+            for i in _newest_first(store, before):
+                if not all(codes[i] == code for codes, code in conditions):
+                    continue
+                if timestamps[i] != seen_at:
+                    seen_at, seen = timestamps[i], 0
+                seen += 1
+                if seen_at == before and seen <= skip:
+                    continue
+                if len(records) == page_size:
+                    next_cursor = ("hot", records_at, records_seen)
+                    break
+                records.append(store.row(i).to_dict())
+                records_at, records_seen = seen_at, seen
+            if next_cursor is not None:
+                return records, next_cursor
+            cursor = None
+
+        archives = [shard for shard in reversed(_catalog()) if shard["Archive"]]
+        if cursor is not None:
+            names = [shard["Shard"] for shard in archives]
+            archives = archives[names.index(cursor[1]):] if cursor[1] in names else []
+        for shard in archives:
+            rows = archive.read_archive(shard["Archive"], COLUMNS)
+            start = cursor[2] if cursor is not None and shard["Shard"] == cursor[1] else len(rows) - 1
+            for i in range(start, -1, -1):
+                record = rows[i]
+                if any(value and record[column] != value for column, value in wanted.items()):
+                    continue
+                if len(records) == page_size:
+                    return records, ("archive", shard["Shard"], i)
+                records.append(record)
+        return records, None
+    except Exception as e:
+        st.error(f"Error fetching user requests: {str(e)}")
+        return [], None
+
+def iter_request_chunks(chunk_size=READ_CHUNK_SIZE, start=None, end=None):
+    """Yield the request history as lists of records, chunk_size rows at a time.
+
+    Only shards overlapping [start, end) are read, oldest first; rows are
+    not filtered by timestamp here. Each chunk is a separate range read, so
+    only one chunk is held in memory. Errors are raised rather than
+    reported, so a partial read is never mistaken for the full history.
+    """
+    client = get_google_sheets_client()
+    if not client:
+        raise ConnectionError("Could not connect to Google Sheets")
+
+    sheet = _open_sheet(client)
+    shards = shards_for_range(sheet, start, end)
+    row_counts = _row_counts(sheet) if any(not shard["Archive"] for shard in shards) else {}
+    for shard in shards:
+        if shard["Archive"]:
+            yield from archive.iter_archive(shard["Archive"], chunk_size)
+            continue
+        # Blank rows shorten a chunk without ending the data, so read up to
+        # the worksheet's last row rather than stopping at a short chunk
+        for first in range(2, row_counts.get(shard["Shard"], 1) + 1, chunk_size):
+            _read_budget.acquire()
+            values = sheet.values_get(_a1(shard["Shard"], f"A{first}:{LAST_COLUMN}{first + chunk_size - 1}")).get("values", [])
+            records = [_row_to_record([row]) for row in values if any(row)]
+            if records:
+                yield records
@@ -0,0 +1,130 @@
+"""Shared HTTP connection pools for the Google API clients.
+
+gspread, the discovery-based Drive, Gmail and OAuth2 clients and the
+connectivity check each used to open their own transport, so most calls
+paid for a new TLS handshake to googleapis.com. Instead, every module
+sends its requests through this one:
+
+- requests Sessions (gspread, token refreshes, the connectivity check)
+  share one HTTPAdapter, and with it urllib3's keep-alive pools per host.
+- Discovery clients get an AuthorizedHttp backed by a pool of httplib2
+  connections; each request borrows one and hands it back afterwards.
+
+Both are thread-safe. PO_HTTP_POOL_SIZE sets the number of connections
+kept open per host.
+"""
+import atexit
+import logging
+import os
+import queue
+import threading
+from urllib.parse import urlsplit
+import httplib2
+import requests
+from requests.adapters import HTTPAdapter
+from google.auth.transport.requests import AuthorizedSession, Request
+from google_auth_httplib2 import AuthorizedHttp
+
+logger = logging.getLogger(__name__)
+
+POOL_SIZE = int(os.environ.get("PO_HTTP_POOL_SIZE", "10"))
+# Seconds before a request on a pooled httplib2 connection times out
+HTTP_TIMEOUT = 60
+
+class _SharedAdapter(HTTPAdapter):
+    """HTTPAdapter that outlives the Sessions it is mounted on."""
+
+    def close(self):
+        # Session.close() closes its adapters; the pools belong to every session
+        pass
+
+class _PooledHttp:
+    """Stands in for httplib2.Http, lending a keep-alive connection to each request."""
+
+    def __init__(self, size, timeout=HTTP_TIMEOUT):
+        self.timeout = timeout
+        # 308 means "resume incomplete" to the Drive upload API, not a redirect
+        self.redirect_codes = frozenset(httplib2.REDIRECT_CODES) - {308}
+        self.requests = 0
+        self.reused = 0
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+
+    def request(self, uri, method="GET", body=None, headers=None,
+                redirections=httplib2.DEFAULT_MAX_REDIRECTS, connection_type=None, **kwargs):
+        with self._slots:
+            try:
+                http = self._idle.get_nowait()
+            except queue.Empty:
+                http = httplib2.Http(timeout=self.timeout)
+                http.redirect_codes = self.redirect_codes
+
+            parts = urlsplit(uri)
+            with self._lock:
+                self.requests += 1
+                self.reused += f"{parts.scheme}:{parts.netloc.lower()}" in http.connections
+            try:
+                return http.request(uri, method, body=body, headers=headers, redirections=redirections,
+                                    connection_type=connection_type, **kwargs)
+            finally:
+                self._idle.put(http)
+
+    def close(self):
+        # Connections stay open for the next client
+        pass
+
+_adapter = _SharedAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+_http = _PooledHttp(POOL_SIZE)
+_session = None
+_session_lock = threading.Lock()
+
+def _mount(session):
+    session.mount("https://", _adapter)
+    session.mount("http://", _adapter)
+    return session
+
+def get_session():
+    """Process-wide requests Session for calls that need no credentials."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = _mount(requests.Session())
+        return _session
+
+def auth_request():
+    """Transport for refreshing credentials over the shared pools."""
+    return Request(get_session())
+
+def authorized_session(credentials):
+    """requests Session signing its requests with credentials, on the shared pools."""
+    return _mount(AuthorizedSession(credentials, auth_request=auth_request()))
+
+def authorized_http(credentials):
+    """Transport for googleapiclient's build(..., http=...) on the shared pools."""
+    return AuthorizedHttp(credentials, http=_http)
+
+def pool_stats():
+    """Requests sent over the shared pools and how many reused an open connection."""
+    sent = _http.requests
+    opened = sent - _http.reused
+    pools = _adapter.poolmanager.pools
+    for key in list(pools.keys()):
+        pool = pools.get(key)
+        if pool is not None:
+            sent += pool.num_requests
+            opened += pool.num_connections
+    return {
+        "requests": sent,
+        "connections_opened": opened,
+        "reuse_ratio": round(1 - opened / sent, 3) if sent else 0.0
+    }
+
+@atexit.register
+def _log_pool_stats():
+    stats = pool_stats()
+    if stats["requests"]:
+        logger.info(
+            f"HTTP pools: {stats['requests']} requests over {stats['connections_opened']} connections "
+            f"({stats['reuse_ratio']:.0%} reused)"
+        )
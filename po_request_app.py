@@ -1,8 +1,20 @@
 import streamlit as st
 import pandas as pd
 from datetime import datetime
-from google_sheets import update_google_sheet, get_user_requests
-from google_auth import authenticate_user, send_email
+from google_sheets import update_google_sheet, update_request_statuses, get_user_requests_page, get_user_requests_since, get_search_index, get_approval_queue, CATEGORIES, URGENCY_LEVELS, STATUSES
+from record_store import PERIODS, period_start
+from google_auth import authenticate_user, send_email, is_admin
+from fragments import panel, refresh_button, needs_refresh, mark_refreshed, mark_written, ON_WRITE
+from profiler import timed_rerun, phase, profiler_panel
+from email_templates import render_confirmation
+from session_store import session_get, session_put, session_pop, session_active, touch_session, memory_panel
+
+PAGE_SIZE = 25
+# Pending requests listed in the approval queue
+QUEUE_SIZE = 20
+# How often the My Requests panel wakes up to check for new writes; a wake-up
+# without a pending write makes no API calls.
+MY_REQUESTS_POLL_SECONDS = 10
 
 # Modern UI Configuration
 st.set_page_config(
@@ -13,7 +25,7 @@ st.set_page_config(
 )
 
 # Custom CSS Styling
-st.markdown("""
+CUSTOM_CSS = """
     <style>
         .main {background-color: #f8f9fa;}
         h1, h2, h3 {color: #2a3f5f; font-family: 'Helvetica Neue', Arial, sans-serif;}
@@ -38,34 +50,57 @@ st.markdown("""
             color: white;
         }
     </style>
-""", unsafe_allow_html=True)
+"""
 
 # Authentication
 def main():
-    user_email = authenticate_user()
-    
-    if not user_email or not user_email.endswith("@ketos.co"):
-        st.error("🔒 Please login with your @ketos.co email")
-        st.stop()
+    with timed_rerun("po_request_app"):
+        with phase("css"):
+            st.markdown(CUSTOM_CSS, unsafe_allow_html=True)
+
+        with phase("auth"):
+            user_email = authenticate_user()
+        
+        if not user_email or not user_email.endswith("@ketos.co"):
+            st.error("🔒 Please login with your @ketos.co email")
+            st.stop()
 
-    st.sidebar.success(f"Logged in as: {user_email}")
-    app_interface(user_email)
+        # Full reruns are user activity; panel polls are not
+        touch_session()
+        st.sidebar.success(f"Logged in as: {user_email}")
+        if is_admin(user_email):
+            profiler_panel()
+            memory_panel()
+        app_interface(user_email)
 
 # Main Application Interface
 def app_interface(user_email):
     st.title("📦 R&D Purchase Request System")
     
-    tabs = st.tabs(["New Request", "My Requests", "Help"])
+    names = ["New Request", "My Requests", "Help"]
+    if is_admin(user_email):
+        # Search covers every requester's POs, so only approvers get it
+        names[2:2] = ["Search", "Approvals"]
+    tabs = dict(zip(names, st.tabs(names)))
     
-    with tabs[0]:
+    with tabs["New Request"]:
         new_purchase_request(user_email)
     
-    with tabs[1]:
+    with tabs["My Requests"]:
         my_requests(user_email)
     
-    with tabs[2]:
+    if "Search" in tabs:
+        with tabs["Search"]:
+            search_requests()
+    
+    if "Approvals" in tabs:
+        with tabs["Approvals"]:
+            approval_queue()
+    
+    with tabs["Help"]:
         show_help()
 
+@panel()
 def new_purchase_request(user_email):
     st.header("New Purchase Request")
     with st.form("po_form"):
@@ -79,8 +114,8 @@ def new_purchase_request(user_email):
             
         with col2:
             attention = st.text_input("👤 Attention To", placeholder="Recipient Name")
-            urgency = st.selectbox("🚨 Urgency Level", ["Normal", "Urgent"], index=0)
-            category = st.selectbox("📦 Category", ["Lab Supplies", "Testing", "Parts & Tools", "Prototype", "Other"])
+            urgency = st.selectbox("🚨 Urgency Level", URGENCY_LEVELS, index=0)
+            category = st.selectbox("📦 Category", CATEGORIES)
         
         description = st.text_area("📝 Purpose Description", placeholder="Explain why this purchase is needed...", height=100)
         submitted = st.form_submit_button("🚀 Submit Request", use_container_width=True)
@@ -88,18 +123,160 @@ def new_purchase_request(user_email):
     if submitted:
         handle_submission(user_email, requester, link, quantity, attention, urgency, category, description)
 
+@panel(run_every=MY_REQUESTS_POLL_SECONDS)
 def my_requests(user_email):
     st.header("My Purchase Requests")
-    requests = get_user_requests(user_email)
-    
-    if not requests:
+    refresh_button("my_requests")
+
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        status = st.selectbox("Status", ["All"] + STATUSES, key="my_requests_status")
+    with col2:
+        category = st.selectbox("Category", ["All"] + CATEGORIES, key="my_requests_category")
+    with col3:
+        period = st.selectbox("Period", PERIODS, key="my_requests_period")
+    start = period_start(period)
+
+    # Pages are kept in the session store so "Load older" only fetches the
+    # next page; changing a filter, a new submission, a manual refresh or
+    # eviction of an idle session's pages starts over from the newest request.
+    # Both paths read the write-through record store, so starting over costs
+    # no Sheets reads once the store is current.
+    # This panel polls, so only user actions (a filter change, a new
+    # submission, a refresh, "Load older") count as session activity. Once
+    # an idle session has been evicted, polls leave it evicted and wait for
+    # the user to refresh.
+    filters = (status, category, period)
+    pages = session_get("my_requests_pages", touch=False)
+    user_action = st.session_state.get("my_requests_filters") != filters or needs_refresh("my_requests", ON_WRITE)
+    if pages is None and not user_action and not session_active():
+        st.info("This list was cleared after a period of inactivity. Press 🔄 Refresh to load it again.")
+        return
+    if pages is None or user_action:
+        st.session_state.my_requests_filters = filters
+        st.session_state.my_requests_cursor = None
+        pages = []
+        mark_refreshed("my_requests")
+
+    if not pages:
+        with phase("get_user_requests"):
+            if start is None:
+                records, cursor = get_user_requests_page(
+                    user_email,
+                    page_size=PAGE_SIZE,
+                    status=None if status == "All" else status,
+                    category=None if category == "All" else category
+                )
+            else:
+                # A date range comes from the timestamp index in one go
+                records, cursor = get_user_requests_since(
+                    user_email,
+                    start,
+                    status=None if status == "All" else status,
+                    category=None if category == "All" else category
+                ), None
+        pages.append(records)
+        st.session_state.my_requests_cursor = cursor
+        session_put("my_requests_pages", pages, touch=user_action)
+        session_pop("my_requests_frame")
+
+    if not any(pages):
         st.info("You haven't made any purchase requests yet.")
     else:
-        df = pd.DataFrame(requests)
-        df = df[['PO Number', 'Timestamp', 'Item URL', 'Quantity', 'Category', 'Urgency', 'Status']]
-        df = df.sort_values('Timestamp', ascending=False)
-        
-        st.dataframe(df, use_container_width=True)
+        # Polling reruns reuse the frame built for the same pages
+        df = session_get("my_requests_frame", touch=False)
+        if df is None:
+            with phase("dataframe"):
+                df = pd.DataFrame([record for page in pages for record in page])
+                df = df[['PO Number', 'Timestamp', 'Item URL', 'Quantity', 'Category', 'Urgency', 'Status']]
+            session_put("my_requests_frame", df, touch=user_action)
+
+        with phase("render"):
+            st.dataframe(df, use_container_width=True)
+
+    if st.session_state.my_requests_cursor is not None:
+        if st.button("Load older requests", key="my_requests_more"):
+            with phase("get_user_requests"):
+                records, cursor = get_user_requests_page(
+                    user_email,
+                    page_size=PAGE_SIZE,
+                    cursor=st.session_state.my_requests_cursor,
+                    status=None if status == "All" else status,
+                    category=None if category == "All" else category
+                )
+            pages.append(records)
+            st.session_state.my_requests_cursor = cursor
+            session_put("my_requests_pages", pages)
+            session_pop("my_requests_frame")
+            st.rerun(scope="fragment")
+
+@panel()
+def search_requests():
+    st.header("Search Purchase Requests")
+    query = st.text_input("🔍 Search", placeholder="Item name, description, requester or paste a URL", key="search_query")
+
+    if query:
+        try:
+            results = get_search_index().search(query, limit=20)
+        except Exception as e:
+            st.error(f"Search unavailable: {str(e)}")
+            return
+
+        if not results:
+            st.info("No matching purchase requests found.")
+        else:
+            st.dataframe(pd.DataFrame(results), use_container_width=True)
+
+@panel()
+def approval_queue():
+    st.header("Approval Queue")
+    try:
+        with phase("get_approval_queue"):
+            queue = get_approval_queue()
+            counts = queue.counts()
+            pending = queue.top(st.session_state.get("approval_queue_size", QUEUE_SIZE))
+    except Exception as e:
+        st.error(f"Approval queue unavailable: {str(e)}")
+        return
+
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Pending", len(queue))
+    col2.metric("Urgent", counts.get("Urgent", 0))
+    with col3:
+        st.number_input("Show", min_value=1, max_value=500, value=QUEUE_SIZE, step=10, key="approval_queue_size")
+
+    if not pending:
+        st.info("No requests are waiting for approval.")
+        return
+
+    # Urgent requests first, oldest first within each urgency level
+    df = pd.DataFrame(pending)
+    df.insert(0, "Select", False)
+    edited = st.data_editor(
+        df,
+        column_config={"Item URL": st.column_config.LinkColumn("Item URL")},
+        disabled=[column for column in df.columns if column != "Select"],
+        hide_index=True,
+        use_container_width=True,
+        key="approval_queue_editor"
+    )
+    selected = edited.loc[edited["Select"], "PO Number"].tolist()
+
+    col1, col2 = st.columns(2)
+    for column, (label, status) in zip((col1, col2), (("✅ Approve", "Approved"), ("❌ Reject", "Rejected"))):
+        if column.button(f"{label} ({len(selected)})", disabled=not selected, key=f"approval_queue_{status}"):
+            # Requests another approver decided meanwhile are skipped, not overwritten
+            updated = update_request_statuses({po: status for po in selected}, from_status="Pending")
+            if updated is not None:
+                if updated:
+                    mark_written()
+                    st.toast(f"{status}: {', '.join(updated)}")
+                skipped = [po for po in selected if po not in updated]
+                if skipped:
+                    st.toast(f"Not updated, no longer pending: {', '.join(skipped)}", icon="⚠️")
+                # The queue changed under the editor; start from fresh checkboxes
+                st.session_state.pop("approval_queue_editor", None)
+                st.rerun(scope="fragment")
 
 def show_help():
     st.header("Help & Guidelines")
@@ -109,6 +286,7 @@ def show_help():
     2. Provide a clear description of why the purchase is needed.
     3. Submit your request and wait for approval.
     4. Check the 'My Requests' tab to track your past submissions.
+    5. Submitting a link that was already requested shows the earlier PO numbers.
 
     For any issues, please contact the IT department.
     """)
@@ -127,6 +305,15 @@ def handle_submission(user_email, requester, link, quantity, attention, urgency,
         st.error(f"❌ Missing required fields: {', '.join(missing)}")
         return
 
+    # Warn about earlier requests for the same item
+    try:
+        duplicates = get_search_index().find_duplicates(link)
+    except Exception:
+        duplicates = []
+    if duplicates:
+        previous = ", ".join(f"{doc['PO Number']} ({doc['Timestamp']}, {doc['Status']})" for doc in duplicates[-5:])
+        st.warning(f"⚠️ This item was already requested: {previous}")
+
     # Generate PO Data
     po_data = {
         "PO Number": f"RD-PO-{datetime.now().strftime('%y%m%d-%H%M%S')}",
@@ -146,6 +333,7 @@ def handle_submission(user_email, requester, link, quantity, attention, urgency,
     with st.spinner("🚀 Submitting your request..."):
         try:
             if update_google_sheet(po_data):
+                mark_written()
                 send_confirmation(user_email, po_data)
                 st.balloons()
                 st.markdown(f"""
@@ -162,46 +350,8 @@ def handle_submission(user_email, requester, link, quantity, attention, urgency,
             st.error(f"❌ Submission failed: {str(e)}")
 
 def send_confirmation(user_email, po_data):
-    """Recreate the original email body with modern styling"""
-    email_html = f"""
-    <html>
-    <body style="font-family: Arial, sans-serif;">
-        <h2 style="color: #2a3f5f; border-bottom: 2px solid #4CAF50; padding-bottom: 10px;">
-            New Purchase Request: {po_data['PO Number']}
-        </h2>
-        
-        <div style="margin: 20px 0;">
-            <p>Dear Approver,</p>
-            <p>A new purchase request has been submitted:</p>
-            
-            <table style="border-collapse: collapse; width: 100%; margin: 20px 0;">
-                <tr style="background-color: #f8f9fa;">
-                    <th style="padding: 12px; border: 1px solid #ddd; text-align: left;">Field</th>
-                    <td style="padding: 12px; border: 1px solid #ddd; text-align: left;">Value</td>
-                </tr>
-                <tr><th>PO Number</th><td>{po_data['PO Number']}</td></tr>
-                <tr><th>Requester</th><td>{po_data['Requester']}</td></tr>
-                <tr><th>Requester Email</th><td>{user_email}</td></tr>
-                <tr><th>Request Date</th><td>{po_data['Timestamp']}</td></tr>
-                <tr><th>Item URL</th><td><a href="{po_data['Item URL']}">{po_data['Item URL']}</a></td></tr>
-                <tr><th>Quantity</th><td>{po_data['Quantity']}</td></tr>
-                <tr><th>Attention To</th><td>{po_data['Attention']}</td></tr>
-                <tr><th>Category</th><td>{po_data['Category']}</td></tr>
-                <tr><th>Urgency</th><td>{po_data['Urgency']}</td></tr>
-                <tr><th>Description</th><td>{po_data['Description']}</td></tr>
-            </table>
-            
-            <p style="margin-top: 20px;">
-                Regards,<br>
-                <strong>{po_data['Requester']}</strong><br>
-                <em>R&D Team</em>
-            </p>
-        </div>
-    </body>
-    </html>
-    """
-    
-    # Send using the original email logic
+    """Email the approver about a new request"""
+    email_html = render_confirmation(po_data, user_email)
     send_email(user_email, f"Purchase Request: {po_data['PO Number']}", email_html)
 
 if __name__ == "__main__":
@@ -0,0 +1,142 @@
+"""Per-rerun phase timings for the Streamlit pages.
+
+Wrap a page's script run in timed_rerun() and the interesting steps in phase():
+
+    with timed_rerun("po_request_app"):
+        with phase("auth"):
+            user_email = authenticate_user()
+
+Each finished rerun adds its phase timings to a rolling window per page,
+shared by every session of the process. Panels rerunning on their own
+(see fragments.panel) are recorded as pages of their own; during a full
+rerun they show up as phases of the page. An admin can also capture a
+cProfile dump of their own session's reruns, which snakeviz, gprof2dot or
+flameprof turn into call graphs and flame graphs.
+"""
+import cProfile
+import os
+import pstats
+import tempfile
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from pathlib import Path
+import pandas as pd
+import streamlit as st
+
+# Reruns kept per page in the rolling window
+WINDOW_SIZE = 200
+PROFILE_DIR = Path(os.environ.get("PO_PROFILE_DIR", os.path.join(tempfile.gettempdir(), "ketos_po_profiles")))
+
+class RerunStats:
+    """Rolling window of phase timings (seconds) per page."""
+
+    def __init__(self, window=WINDOW_SIZE):
+        self.window = window
+        self._runs = {}
+        self._lock = threading.Lock()
+
+    def record(self, page, timings):
+        with self._lock:
+            self._runs.setdefault(page, deque(maxlen=self.window)).append(dict(timings))
+
+    def pages(self):
+        with self._lock:
+            return sorted(self._runs)
+
+    def summary(self, page):
+        """Count, mean, p50, p95 and max of each phase in milliseconds."""
+        with self._lock:
+            runs = list(self._runs.get(page, ()))
+        if not runs:
+            return pd.DataFrame()
+        df = pd.DataFrame(runs) * 1000
+        summary = pd.DataFrame({
+            "runs": df.count(),
+            "mean": df.mean(),
+            "p50": df.quantile(0.5),
+            "p95": df.quantile(0.95),
+            "max": df.max()
+        }).round(1)
+        return summary.sort_values("mean", ascending=False)
+
+@st.cache_resource(show_spinner=False)
+def get_rerun_stats():
+    """Rerun timings shared by every session of this process."""
+    return RerunStats()
+
+@contextmanager
+def phase(name):
+    """Add the time spent in the block to the current rerun's `name` phase."""
+    timings = st.session_state.get("profile_timings")
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        if timings is not None:
+            timings[name] = timings.get(name, 0.0) + time.perf_counter() - started
+
+@contextmanager
+def timed_rerun(page):
+    """Time one rerun of a page; inside another rerun it is just a phase."""
+    if st.session_state.get("profile_timings") is not None:
+        with phase(page):
+            yield
+        return
+
+    timings = {}
+    st.session_state.profile_timings = timings
+    profile = _start_capture()
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        # st.stop() and st.rerun() end a rerun with an exception; still record it
+        timings["total"] = time.perf_counter() - started
+        st.session_state.profile_timings = None
+        if profile is not None:
+            profile.disable()
+            _save_capture(profile)
+        get_rerun_stats().record(page, timings)
+
+def _start_capture():
+    if not st.session_state.get("profile_capture"):
+        return None
+    profile = cProfile.Profile()
+    try:
+        profile.enable()
+    except ValueError:
+        # Another profiler is already running in this thread
+        return None
+    return profile
+
+def capture_path():
+    """cProfile dump collecting this session's reruns while capture is on."""
+    if "profile_session" not in st.session_state:
+        st.session_state.profile_session = uuid.uuid4().hex[:12]
+    return PROFILE_DIR / f"reruns-{st.session_state.profile_session}.prof"
+
+def _save_capture(profile):
+    path = capture_path()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    stats = pstats.Stats(profile)
+    if path.exists():
+        stats.add(str(path))
+    stats.dump_stats(str(path))
+
+def profiler_panel():
+    """Sidebar tools for admins: rerun timings and cProfile capture."""
+    with st.sidebar.expander("⏱️ Rerun profiler"):
+        st.toggle("Capture cProfile of my reruns", key="profile_capture")
+        path = capture_path()
+        if path.exists():
+            st.caption(f"Dump: {path}")
+            st.download_button("Download .prof", path.read_bytes(), file_name=path.name, key="profile_download")
+
+        stats = get_rerun_stats()
+        pages = stats.pages()
+        if pages:
+            page = st.selectbox("Page", pages, key="profile_page")
+            st.dataframe(stats.summary(page), use_container_width=True)
@@ -0,0 +1,429 @@
+"""Compact columnar storage for purchase records.
+
+`get_all_records` returns one dict per row, each repeating every header.
+RecordStore keeps one array per column instead: low-cardinality columns are
+dictionary-encoded into small integer codes, timestamps are int64 epoch
+seconds and quantities are int64. Rows are exposed through a `__slots__`
+view that reads from the columns on access, and a TimestampIndex keeps row
+positions in time order for date-range queries.
+
+Run `python record_store.py` to compare memory per 10k rows against the
+list-of-dicts representation.
+"""
+import calendar
+import logging
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import Counter
+from datetime import date, datetime, timedelta, timezone
+
+logger = logging.getLogger(__name__)
+
+# Columns dictionary-encoded by default (few distinct values, many repeats)
+CATEGORICAL_COLUMNS = ("Requester", "Email", "Category", "Urgency", "Status")
+INTEGER_COLUMNS = ("Quantity",)
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# Stored for timestamps and integers that are empty or fail to parse; the
+# text of a value that failed to parse is kept alongside (see RecordStore)
+MISSING = -(2 ** 63)
+
+# Named date ranges offered by the dashboard and My Requests
+PERIODS = ["All time", "Last 30 days", "This quarter", "This year"]
+
+def parse_timestamp(value):
+    """Convert a sheet timestamp into epoch seconds, or MISSING.
+
+    The sheet's own format is tried first; anything else (ISO 8601, US
+    dates such as "1/5/2024 3:15 PM", trailing time zone names) goes
+    through dateutil. Time zones are ignored, as in the sheet.
+    """
+    if isinstance(value, datetime):
+        return calendar.timegm(value.timetuple())
+    text = str(value).strip()
+    if not text:
+        return MISSING
+    try:
+        return calendar.timegm(datetime.strptime(text[:19], TIMESTAMP_FORMAT).timetuple())
+    except ValueError:
+        pass
+    try:
+        return calendar.timegm(datetime.fromisoformat(text).timetuple())
+    except ValueError:
+        pass
+    # Short strings such as "3" would parse as a day of the current month
+    if len(text) < 6:
+        return MISSING
+    from dateutil import parser
+
+    try:
+        return calendar.timegm(parser.parse(text, ignoretz=True).timetuple())
+    except (ValueError, OverflowError):
+        return MISSING
+
+def format_timestamp(seconds):
+    """Convert epoch seconds back into the sheet's timestamp format."""
+    if seconds == MISSING:
+        return ""
+    return datetime.fromtimestamp(seconds, timezone.utc).strftime(TIMESTAMP_FORMAT)
+
+def period_start(period, today=None):
+    """First day of a named period from PERIODS, or None for all time."""
+    today = today or date.today()
+    if period == "Last 30 days":
+        return today - timedelta(days=30)
+    if period == "This quarter":
+        return date(today.year, (today.month - 1) // 3 * 3 + 1, 1)
+    if period == "This year":
+        return date(today.year, 1, 1)
+    return None
+
+def _parse_integer(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        pass
+    try:
+        # "2.0" and "1,000" are integers too; "2.5" and "3 boxes" are not
+        number = float(str(value).replace(",", ""))
+    except (TypeError, ValueError):
+        return MISSING
+    return int(number) if number.is_integer() else MISSING
+
+def _bound(value):
+    """Range bound as epoch seconds; accepts seconds, datetimes, dates and strings."""
+    if value is None or isinstance(value, int):
+        return value
+    return parse_timestamp(str(value) if not isinstance(value, datetime) else value)
+
+class TimestampIndex:
+    """Row positions sorted by timestamp, for O(log n + k) range lookups.
+
+    Requests arrive in time order, so adding one is an append; a back-dated
+    timestamp falls back to an insort. Rows without a timestamp are not
+    indexed.
+    """
+
+    def __init__(self):
+        self.keys = array("q")
+        self.positions = array("I")
+
+    def __len__(self):
+        return len(self.keys)
+
+    def add(self, timestamp, position):
+        if timestamp == MISSING:
+            return
+        if not self.keys or timestamp >= self.keys[-1]:
+            self.keys.append(timestamp)
+            self.positions.append(position)
+        else:
+            i = bisect_right(self.keys, timestamp)
+            self.keys.insert(i, timestamp)
+            self.positions.insert(i, position)
+
+    def remove(self, timestamp, position):
+        if timestamp == MISSING:
+            return
+        for i in range(bisect_left(self.keys, timestamp), bisect_right(self.keys, timestamp)):
+            if self.positions[i] == position:
+                del self.keys[i]
+                del self.positions[i]
+                return
+
+    def range(self, start=None, end=None):
+        """Positions of rows with start <= timestamp < end, oldest first.
+
+        Bounds are epoch seconds, datetimes, dates or timestamp strings.
+        """
+        start, end = _bound(start), _bound(end)
+        lo = 0 if start is None else bisect_left(self.keys, start)
+        hi = len(self.keys) if end is None else bisect_left(self.keys, end)
+        return self.positions[lo:hi]
+
+class Row:
+    """Read-only view of one stored record; behaves like a small mapping."""
+    __slots__ = ("_store", "_index")
+
+    def __init__(self, store, index):
+        self._store = store
+        self._index = index
+
+    def __getitem__(self, column):
+        return self._store.value(self._index, column)
+
+    def get(self, column, default=None):
+        if column not in self._store.columns:
+            return default
+        return self[column]
+
+    def keys(self):
+        return list(self._store.columns)
+
+    def to_dict(self):
+        return {column: self[column] for column in self._store.columns}
+
+    def __repr__(self):
+        return f"Row({self.to_dict()!r})"
+
+class RecordStore:
+    """Column-oriented, dictionary-encoded store of purchase records."""
+
+    def __init__(self, columns, timestamp_column="Timestamp", categorical=CATEGORICAL_COLUMNS, integers=INTEGER_COLUMNS):
+        self.columns = list(columns)
+        self.timestamp_column = timestamp_column if timestamp_column in self.columns else None
+        self._kinds = {}
+        self._data = {}
+        self._dictionaries = {}
+        self._codes = {}
+        for column in self.columns:
+            if column == self.timestamp_column or column in integers:
+                self._kinds[column] = "int"
+                self._data[column] = array("q")
+            elif column in categorical:
+                self._kinds[column] = "category"
+                self._data[column] = array("I")
+                self._dictionaries[column] = []
+                self._codes[column] = {}
+            else:
+                self._kinds[column] = "text"
+                self._data[column] = []
+        self._length = 0
+        self._time_index = TimestampIndex() if self.timestamp_column else None
+        # Text of timestamp and integer cells that failed to parse, by row
+        self._unparsed = {column: {} for column, kind in self._kinds.items() if kind == "int"}
+
+    @classmethod
+    def from_records(cls, records, columns=None, **kwargs):
+        """Build a store from an iterable of dicts such as get_all_records()."""
+        records = iter(records)
+        first = next(records, None)
+        if columns is None:
+            columns = list(first) if first is not None else []
+        store = cls(columns, **kwargs)
+        if first is not None:
+            store.append(first)
+            store.extend(records)
+        for column, count in store.unparsed_counts().items():
+            logger.warning(f"{count} {column} values could not be parsed; kept as text")
+        return store
+
+    def __len__(self):
+        return self._length
+
+    def _encode(self, column, value):
+        kind = self._kinds[column]
+        if kind == "category":
+            value = "" if value is None else str(value)
+            code = self._codes[column].get(value)
+            if code is None:
+                code = len(self._dictionaries[column])
+                self._codes[column][value] = code
+                self._dictionaries[column].append(value)
+            return code
+        if kind == "int":
+            if column == self.timestamp_column:
+                return parse_timestamp(value)
+            return _parse_integer(value)
+        return "" if value is None else str(value)
+
+    def _keep_unparsed(self, index, column, value, encoded):
+        unparsed = self._unparsed.get(column)
+        if unparsed is None:
+            return
+        text = "" if value is None else str(value).strip()
+        if encoded == MISSING and text:
+            unparsed[index] = text
+        else:
+            unparsed.pop(index, None)
+
+    def append(self, record):
+        """Add one record (a dict keyed by column) and return its index."""
+        for column in self.columns:
+            value = record.get(column, "")
+            encoded = self._encode(column, value)
+            self._data[column].append(encoded)
+            self._keep_unparsed(self._length, column, value, encoded)
+        self._length += 1
+        if self._time_index is not None:
+            self._time_index.add(self._data[self.timestamp_column][-1], self._length - 1)
+        return self._length - 1
+
+    def extend(self, records):
+        for record in records:
+            self.append(record)
+
+    def set_value(self, index, column, value):
+        """Overwrite one cell, e.g. when a request's status changes."""
+        encoded = self._encode(column, value)
+        if column == self.timestamp_column:
+            self._time_index.remove(self._data[column][index], index)
+            self._time_index.add(encoded, index)
+        self._data[column][index] = encoded
+        self._keep_unparsed(index, column, value, encoded)
+
+    def value(self, index, column):
+        """Decoded value of one cell."""
+        kind = self._kinds[column]
+        raw = self._data[column][index]
+        if kind == "category":
+            return self._dictionaries[column][raw]
+        if kind == "int":
+            if raw == MISSING:
+                return self._unparsed[column].get(index, "")
+            if column == self.timestamp_column:
+                return format_timestamp(raw)
+            return raw
+        return raw
+
+    def unparsed_counts(self):
+        """Number of timestamp and integer cells per column kept as text."""
+        return {column: len(unparsed) for column, unparsed in self._unparsed.items() if unparsed}
+
+    def row(self, index):
+        return Row(self, index)
+
+    def rows(self, indices=None):
+        return [Row(self, i) for i in (range(self._length) if indices is None else indices)]
+
+    def to_records(self, indices=None):
+        """Materialize rows as plain dicts, e.g. for st.dataframe."""
+        return [row.to_dict() for row in self.rows(indices)]
+
+    def column(self, column):
+        """Decoded values of one column, one per row."""
+        return [self.value(i, column) for i in range(self._length)]
+
+    def timestamps(self):
+        """Raw int64 epoch-second timestamps, one per row."""
+        return self._data[self.timestamp_column]
+
+    def range(self, start=None, end=None):
+        """Indices of rows with start <= timestamp < end, oldest first.
+
+        Uses the timestamp index, so the cost is O(log n + k) for k rows.
+        Rows without a timestamp are never returned.
+        """
+        return self._time_index.range(start, end)
+
+    def codes(self, column):
+        """Raw integer codes of a categorical column."""
+        return self._data[column]
+
+    def categories(self, column):
+        """Distinct values of a categorical column, indexed by code."""
+        return self._dictionaries[column]
+
+    def filter(self, **equals):
+        """Indices of rows whose columns equal the given values.
+
+        Keyword names use underscores for spaces, e.g. PO_Number="RD-PO-...".
+        """
+        conditions = []
+        for name, value in equals.items():
+            column = name.replace("_", " ")
+            if self._kinds[column] == "category":
+                code = self._codes[column].get(value)
+                if code is None:
+                    return []
+                conditions.append((self._data[column], code))
+            else:
+                conditions.append((self._data[column], self._encode(column, value)))
+        return [i for i in range(self._length) if all(data[i] == target for data, target in conditions)]
+
+    def value_counts(self, column, indices=None):
+        """Count rows (or the given rows) per value of a categorical column."""
+        data = self._data[column]
+        counts = Counter(data if indices is None else (data[i] for i in indices))
+        dictionary = self._dictionaries[column]
+        return {dictionary[code]: count for code, count in counts.most_common()}
+
+    def to_frame(self, indices=None, columns=None):
+        """Build a pandas DataFrame, keeping categorical columns as Categoricals."""
+        import pandas as pd
+
+        columns = columns or self.columns
+        positions = list(range(self._length)) if indices is None else list(indices)
+        frame = {}
+        for column in columns:
+            data = self._data[column]
+            kind = self._kinds[column]
+            if kind == "category":
+                frame[column] = pd.Categorical.from_codes([data[i] for i in positions], self._dictionaries[column])
+            elif kind == "int" and column == self.timestamp_column:
+                seconds = pd.Series([data[i] for i in positions], dtype="int64")
+                frame[column] = pd.to_datetime(seconds.where(seconds != MISSING), unit="s")
+            elif kind == "int" and self._unparsed[column]:
+                # Keep cells that are not integers as they were written
+                frame[column] = [self.value(i, column) for i in positions]
+            elif kind == "int":
+                values = pd.Series([data[i] for i in positions], dtype="int64")
+                frame[column] = values.where(values != MISSING).astype("Int64")
+            else:
+                frame[column] = [data[i] for i in positions]
+        return pd.DataFrame(frame, columns=columns)
+
+    def memory_usage(self):
+        """Approximate bytes held by the store, including string payloads."""
+        import sys
+
+        total = 0
+        for column in self.columns:
+            data = self._data[column]
+            total += sys.getsizeof(data)
+            if self._kinds[column] == "text":
+                total += sum(sys.getsizeof(value) for value in data)
+            elif self._kinds[column] == "category":
+                total += sum(sys.getsizeof(value) for value in self._dictionaries[column])
+                total += sys.getsizeof(self._dictionaries[column]) + sys.getsizeof(self._codes[column])
+        return total
+
+def _measure(rows=10000):
+    """Compare traced memory of list-of-dicts and RecordStore for `rows` rows."""
+    import json
+    import random
+    import tracemalloc
+
+    columns = [
+        "PO Number", "Requester", "Email", "Timestamp", "Item URL", "Quantity",
+        "Attention", "Category", "Description", "Urgency", "Status"
+    ]
+    people = [f"Person {i}" for i in range(40)]
+    payload = json.dumps([[
+        f"RD-PO-240101-{i:06d}",
+        random.choice(people),
+        random.choice(people).lower().replace(" ", ".") + "@ketos.co",
+        f"2024-{i % 12 + 1:02d}-{i % 28 + 1:02d} 10:{i % 60:02d}:00",
+        f"https://vendor.example.com/item/{i}",
+        str(random.randint(1, 20)),
+        random.choice(people),
+        random.choice(["Lab Supplies", "Testing", "Parts & Tools", "Prototype", "Other"]),
+        f"Replacement part number {i} for the bench rig",
+        random.choice(["Normal", "Urgent"]),
+        random.choice(["Pending", "Approved", "Rejected"])
+    ] for i in range(rows)])
+
+    # Both representations start from a freshly parsed response, as with Sheets
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    parsed = json.loads(payload)
+    records = [dict(zip(columns, row)) for row in parsed]
+    del parsed
+    dict_bytes = tracemalloc.get_traced_memory()[0] - before
+    del records
+
+    before = tracemalloc.get_traced_memory()[0]
+    parsed = json.loads(payload)
+    store = RecordStore.from_records(dict(zip(columns, row)) for row in parsed)
+    del parsed
+    store_bytes = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+
+    scale = 10000 / rows
+    print(f"list of dicts: {dict_bytes * scale / 1024:.0f} KiB per 10k rows")
+    print(f"RecordStore:   {store_bytes * scale / 1024:.0f} KiB per 10k rows")
+    print(f"saving:        {(1 - store_bytes / dict_bytes) * 100:.0f}%")
+    return dict_bytes, store_bytes
+
+if __name__ == "__main__":
+    _measure()
@@ -0,0 +1,192 @@
+"""Incremental full-text search over purchase requests.
+
+Answers "did anyone already order this?" without scanning the sheet. The
+index keeps postings for Description, Item URL (normalized host and path
+tokens), Requester and Category, plus an exact map from normalized URL to
+the requests that used it for duplicate detection at submission time.
+"""
+import heapq
+import math
+import re
+import threading
+from collections import defaultdict
+from urllib.parse import urlsplit, parse_qsl, urlencode
+
+# Per-field weights applied to term frequencies
+FIELD_WEIGHTS = {
+    "Description": 1.0,
+    "Item URL": 2.0,
+    "Requester": 1.5,
+    "Category": 1.0
+}
+
+# Fields kept per request so results can be shown without another lookup
+DISPLAY_FIELDS = ("PO Number", "Timestamp", "Requester", "Category", "Item URL", "Status")
+
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "in", "is",
+    "it", "of", "on", "or", "the", "this", "to", "with", "we", "our", "need",
+    "http", "https", "www", "com", "html", "htm"
+}
+
+# Query parameters that never identify a product: exact names, and the
+# prefixes of campaign parameter families (utm_source, mc_cid, ...)
+TRACKING_PARAMS = {"ref", "ref_", "gclid", "fbclid", "msclkid", "spm"}
+TRACKING_PREFIXES = ("utm_", "mc_")
+
+def _is_tracking_param(key):
+    key = key.lower()
+    return key in TRACKING_PARAMS or key.startswith(TRACKING_PREFIXES)
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+def tokenize(text):
+    """Lowercase word tokens of a piece of text, without stopwords."""
+    return [token for token in _TOKEN.findall(str(text).lower()) if token not in STOPWORDS]
+
+def normalize_url(url):
+    """Canonical host/path form of an item URL used to spot duplicates.
+
+    Drops the scheme, a leading "www.", fragments, trailing slashes and
+    tracking query parameters, so links copied from different places match.
+    """
+    url = str(url).strip()
+    if not url:
+        return ""
+    if "://" not in url:
+        url = "//" + url
+    parts = urlsplit(url)
+    host = parts.netloc.lower()
+    if host.startswith("www."):
+        host = host[4:]
+    path = parts.path.rstrip("/")
+    query = [
+        (key, value) for key, value in parse_qsl(parts.query)
+        if not _is_tracking_param(key)
+    ]
+    normalized = f"{host}{path}"
+    if query:
+        normalized += "?" + urlencode(sorted(query))
+    return normalized
+
+def url_tokens(url):
+    """Host labels and path segment tokens of an item URL."""
+    normalized = normalize_url(url)
+    return tokenize(normalized.replace(".", " ").replace("/", " "))
+
+class SearchIndex:
+    """Inverted index keyed by PO number, updated one request at a time."""
+
+    def __init__(self):
+        self._postings = defaultdict(dict)
+        self._doc_terms = {}
+        self._urls = defaultdict(set)
+        self._doc_urls = {}
+        self._docs = {}
+        # One index is shared by every session's thread
+        self._lock = threading.RLock()
+
+    def __getstate__(self):
+        # Indexes are pickled into the cross-process cache; locks are not picklable
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.RLock()
+
+    @classmethod
+    def from_records(cls, records):
+        index = cls()
+        for record in records:
+            index.add(record)
+        return index
+
+    def __len__(self):
+        return len(self._docs)
+
+    def _terms(self, record):
+        weights = defaultdict(float)
+        for field, weight in FIELD_WEIGHTS.items():
+            value = record.get(field, "")
+            tokens = url_tokens(value) if field == "Item URL" else tokenize(value)
+            for token in tokens:
+                weights[token] += weight
+        return weights
+
+    def add(self, record):
+        """Index one request; re-adding a PO number replaces its entry."""
+        po_number = record.get("PO Number", "")
+        if not po_number:
+            return
+        terms = self._terms(record)
+        url = normalize_url(record.get("Item URL", ""))
+
+        with self._lock:
+            self.remove(po_number)
+            for token, weight in terms.items():
+                self._postings[token][po_number] = weight
+            self._doc_terms[po_number] = tuple(terms)
+            if url:
+                self._urls[url].add(po_number)
+                self._doc_urls[po_number] = url
+            self._docs[po_number] = {field: record.get(field, "") for field in DISPLAY_FIELDS}
+
+    def remove(self, po_number):
+        with self._lock:
+            for token in self._doc_terms.pop(po_number, ()):
+                postings = self._postings[token]
+                postings.pop(po_number, None)
+                if not postings:
+                    del self._postings[token]
+            url = self._doc_urls.pop(po_number, None)
+            if url:
+                self._urls[url].discard(po_number)
+                if not self._urls[url]:
+                    del self._urls[url]
+            self._docs.pop(po_number, None)
+
+    def update_status(self, po_number, status):
+        with self._lock:
+            if po_number in self._docs:
+                self._docs[po_number] = dict(self._docs[po_number], Status=status)
+
+    def search(self, query, limit=10):
+        """Ranked requests matching a free-text query or pasted URL.
+
+        Scores sum field-weighted term frequency times inverse document
+        frequency over the query terms; requests sharing the query's exact
+        normalized URL rank first.
+        """
+        tokens = set(tokenize(query)) | set(url_tokens(query) if "/" in query else ())
+        scores = defaultdict(float)
+        with self._lock:
+            total = len(self._docs) or 1
+            matched = sorted(
+                (self._postings[token] for token in tokens if token in self._postings),
+                key=len
+            )
+            # Terms found in most requests add little to the ranking but cost
+            # the most to score; skip them when rarer terms are available.
+            if matched and len(matched[0]) <= total // 2:
+                matched = [postings for postings in matched if len(postings) <= total // 2]
+            for postings in matched:
+                idf = math.log(1 + total / len(postings))
+                for po_number, weight in postings.items():
+                    scores[po_number] += weight * idf
+
+            for po_number in self._urls.get(normalize_url(query), ()):
+                scores[po_number] += 1000.0
+
+            ranked = heapq.nsmallest(limit, scores.items(), key=lambda item: (-item[1], item[0]))
+            return [dict(self._docs[po_number], Score=round(score, 3)) for po_number, score in ranked]
+
+    def find_duplicates(self, url):
+        """Earlier requests for the same item URL, oldest first."""
+        normalized = normalize_url(url)
+        if not normalized:
+            return []
+        with self._lock:
+            docs = [self._docs[po_number] for po_number in self._urls.get(normalized, ())]
+        return sorted(docs, key=lambda doc: doc["Timestamp"])
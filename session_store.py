@@ -0,0 +1,234 @@
+"""Process-level store for heavy per-session objects.
+
+Streamlit keeps st.session_state alive as long as its session, including
+tabs that were closed or left open overnight. Large objects that can be
+recreated (pages of request records, frames built from them) are therefore
+kept here instead, and session_state only holds the key of the session's
+slot:
+
+    session_put("my_requests_pages", pages)
+    pages = session_get("my_requests_pages")
+
+The store enforces two budgets, in bytes as estimated by estimate_size():
+
+- per session: putting a value evicts that session's least recently used
+  entries until the session fits its budget again;
+- per process: sessions are evicted whole, least recently active first,
+  until the store fits. Sessions idle for longer than SESSION_IDLE_SECONDS
+  are dropped on the next write whatever the totals.
+
+An evicted entry reads back as missing, so callers must be able to
+recreate it; credentials and other state that cannot be recreated stay in
+session_state. A session counts as active when the app reruns for it
+(touch_session) or when it reads or writes with touch=True; panels that
+poll pass touch=False, so a tab left open is still dropped once idle. A
+write with touch=False never brings an evicted session back, and polling
+panels check session_active() before reloading what was evicted.
+"""
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import OrderedDict
+import pandas as pd
+import streamlit as st
+
+SESSION_BUDGET_BYTES = int(float(os.environ.get("PO_SESSION_BUDGET_MB", "16")) * 1024 * 1024)
+STORE_BUDGET_BYTES = int(float(os.environ.get("PO_SESSION_STORE_BUDGET_MB", "256")) * 1024 * 1024)
+# Sessions untouched for this long are treated as abandoned
+SESSION_IDLE_SECONDS = 30 * 60
+
+def estimate_size(value, _seen=None):
+    """Approximate bytes held by value and the objects it references."""
+    if _seen is None:
+        _seen = set()
+    if id(value) in _seen:
+        return 0
+    _seen.add(id(value))
+
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(deep=True))
+    if hasattr(value, "memory_usage") and callable(value.memory_usage):
+        # RecordStore and friends know their own footprint
+        return int(value.memory_usage())
+
+    size = sys.getsizeof(value)
+    if isinstance(value, (str, bytes, int, float, bool, type(None))):
+        return size
+    if isinstance(value, dict):
+        size += sum(estimate_size(k, _seen) + estimate_size(v, _seen) for k, v in value.items())
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(estimate_size(item, _seen) for item in value)
+    elif hasattr(value, "__dict__"):
+        size += estimate_size(vars(value), _seen)
+    return size
+
+class SessionStore:
+    """Per-session key-value slots with LRU eviction under byte budgets."""
+
+    def __init__(self, session_budget=SESSION_BUDGET_BYTES, total_budget=STORE_BUDGET_BYTES, idle_seconds=SESSION_IDLE_SECONDS):
+        self.session_budget = session_budget
+        self.total_budget = total_budget
+        self.idle_seconds = idle_seconds
+        # session -> OrderedDict(key -> (value, size)), least recently used first
+        self._sessions = OrderedDict()
+        self._sizes = {}
+        self._last_access = {}
+        self.total = 0
+        self.evicted_entries = 0
+        self.evicted_sessions = 0
+        self._lock = threading.RLock()
+
+    def _touch(self, session):
+        entries = self._sessions.get(session)
+        if entries is None:
+            entries = self._sessions[session] = OrderedDict()
+            self._sizes[session] = 0
+        self._sessions.move_to_end(session)
+        self._last_access[session] = time.monotonic()
+        return entries
+
+    def _remove(self, session, key):
+        _, size = self._sessions[session].pop(key)
+        self._sizes[session] -= size
+        self.total -= size
+
+    def touch(self, session):
+        """Mark a session as active now."""
+        with self._lock:
+            self._touch(session)
+
+    def __contains__(self, session):
+        with self._lock:
+            return session in self._sessions
+
+    def get(self, session, key, default=None, touch=True):
+        with self._lock:
+            entries = self._sessions.get(session)
+            if entries is None or key not in entries:
+                return default
+            if touch:
+                self._touch(session)
+            entries.move_to_end(key)
+            return entries[key][0]
+
+    def put(self, session, key, value, size=None, touch=True):
+        """Store value under key; returns False if it was not stored.
+
+        A value is not stored if it alone exceeds the session budget. With
+        touch=False an existing session keeps its last access time, and an
+        evicted one is not recreated.
+        """
+        size = estimate_size(value) if size is None else size
+        with self._lock:
+            if touch:
+                entries = self._touch(session)
+            else:
+                entries = self._sessions.get(session)
+                if entries is None:
+                    return False
+            if key in entries:
+                self._remove(session, key)
+            if size > self.session_budget:
+                return False
+            entries[key] = (value, size)
+            self._sizes[session] += size
+            self.total += size
+
+            while self._sizes[session] > self.session_budget:
+                oldest = next(iter(entries))
+                self._remove(session, oldest)
+                self.evicted_entries += 1
+            self._evict_sessions(keep=session)
+            return True
+
+    def pop(self, session, key, default=None):
+        with self._lock:
+            entries = self._sessions.get(session)
+            if entries is None or key not in entries:
+                return default
+            value = entries[key][0]
+            self._remove(session, key)
+            return value
+
+    def drop(self, session):
+        """Forget everything stored for a session."""
+        with self._lock:
+            self._sessions.pop(session, None)
+            self.total -= self._sizes.pop(session, 0)
+            self._last_access.pop(session, None)
+
+    def _evict_sessions(self, keep):
+        now = time.monotonic()
+        for session in list(self._sessions):
+            if session == keep:
+                continue
+            idle = now - self._last_access[session] >= self.idle_seconds
+            if not idle and self.total <= self.total_budget:
+                # Sessions are ordered by last access; the rest are busier
+                break
+            self.drop(session)
+            self.evicted_sessions += 1
+
+    def stats(self):
+        """Entries, bytes and idle seconds per session, largest first."""
+        now = time.monotonic()
+        with self._lock:
+            rows = [{
+                "session": session[:8],
+                "entries": len(entries),
+                "kib": round(self._sizes[session] / 1024, 1),
+                "idle_s": round(now - self._last_access[session])
+            } for session, entries in self._sessions.items()]
+        if not rows:
+            return pd.DataFrame(columns=["session", "entries", "kib", "idle_s"])
+        return pd.DataFrame(rows).sort_values("kib", ascending=False).reset_index(drop=True)
+
+@st.cache_resource(show_spinner=False)
+def get_session_store():
+    """Store shared by every session of this process."""
+    return SessionStore()
+
+def session_key():
+    """Key of the current session's slot in the store."""
+    if "session_store_key" not in st.session_state:
+        st.session_state.session_store_key = uuid.uuid4().hex
+    return st.session_state.session_store_key
+
+def touch_session():
+    """Mark the current session as active; call once per full app rerun."""
+    get_session_store().touch(session_key())
+
+def session_active():
+    """Whether the current session still has a slot, i.e. was not evicted as idle."""
+    return session_key() in get_session_store()
+
+def session_get(key, default=None, touch=True):
+    """Value stored for the current session, or default if missing or evicted.
+
+    Pass touch=False from polling panels so polls do not keep the session alive.
+    """
+    return get_session_store().get(session_key(), key, default, touch)
+
+def session_put(key, value, size=None, touch=True):
+    """Store a value for the current session; returns False if it was not stored."""
+    return get_session_store().put(session_key(), key, value, size, touch)
+
+def session_pop(key, default=None):
+    """Remove and return a value stored for the current session."""
+    return get_session_store().pop(session_key(), key, default)
+
+def memory_panel():
+    """Sidebar metrics for admins: session store footprint per session."""
+    store = get_session_store()
+    with st.sidebar.expander("🧠 Session memory"):
+        stats = store.stats()
+        col1, col2 = st.columns(2)
+        col1.metric("Sessions", len(stats))
+        col2.metric("Total MiB", f"{store.total / 1024 / 1024:.1f}", help=f"Budget {store.total_budget / 1024 / 1024:.0f} MiB")
+        col1.metric("Mean KiB/session", f"{stats['kib'].mean():.0f}" if len(stats) else "0")
+        col2.metric("Evicted sessions", store.evicted_sessions)
+        st.dataframe(stats, use_container_width=True, hide_index=True)
@@ -0,0 +1,180 @@
+"""Cache shared by every Streamlit server process on the host.
+
+Each worker otherwise pulls the sheet, builds indexes and fetches tokens on
+its own, multiplying API quota use by the number of workers. SharedCache
+keeps pickled values in a SQLite database in WAL mode, so readers never
+block the writer, and coordinates refreshes with a lease per key: one
+worker fetches while the others wait for its result (or keep serving the
+previous value if it takes too long). take() keeps sliding-window counts,
+so the workers also share rate limits such as the Sheets read quota.
+
+Values are unpickled on read and include the Sheets access token, so the
+database must be private to the user running the app: it is created 0600,
+by default in a 0700 directory of its own, and SharedCache refuses a file
+or directory that other users could read or replace.
+"""
+import os
+import pickle
+import sqlite3
+import stat
+import tempfile
+import threading
+import time
+import uuid
+import streamlit as st
+
+SHARED_CACHE_PATH = os.environ.get("PO_SHARED_CACHE") or os.path.join(
+    tempfile.gettempdir(), f"ketos_po_cache-{os.getuid()}", "cache.sqlite3"
+)
+# Seconds a worker may hold a refresh lease before others take over
+LEASE_SECONDS = 60
+# Seconds a worker waits for another worker's refresh before giving up
+WAIT_SECONDS = 30
+
+def _ensure_private(path):
+    """Create the database file readable by this user only, or refuse an unsafe one."""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+    info = os.stat(directory)
+    # Others must not be able to swap the file (or its -wal/-shm companions)
+    if info.st_uid not in (os.getuid(), 0) or (info.st_mode & 0o022 and not info.st_mode & stat.S_ISVTX):
+        raise PermissionError(f"Shared cache directory {directory} is writable by other users")
+
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+    try:
+        info = os.fstat(fd)
+    finally:
+        os.close(fd)
+    if info.st_uid != os.getuid() or info.st_mode & 0o077:
+        raise PermissionError(f"Shared cache {path} must belong to this user and be private to it (chmod 600)")
+
+class SharedCache:
+    def __init__(self, path=SHARED_CACHE_PATH):
+        self.path = path
+        _ensure_private(path)
+        self._id = uuid.uuid4().hex[:8]
+        self._local = threading.local()
+        with self._connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "key TEXT PRIMARY KEY, value BLOB, version INTEGER, expires_at REAL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS leases ("
+                "key TEXT PRIMARY KEY, owner TEXT, expires_at REAL)"
+            )
+            conn.execute("CREATE TABLE IF NOT EXISTS events (key TEXT, at REAL)")
+            conn.execute("CREATE INDEX IF NOT EXISTS events_key_at ON events (key, at)")
+
+    def _connection(self):
+        # sqlite3 connections cannot be shared between threads
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key, min_version=None):
+        """Return (value, version) if a fresh entry exists, else None."""
+        row = self._connection().execute(
+            "SELECT value, version, expires_at FROM entries WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None or row[2] < time.time():
+            return None
+        if min_version is not None and (row[1] is None or row[1] < min_version):
+            return None
+        return pickle.loads(row[0]), row[1]
+
+    def _get_stale(self, key):
+        row = self._connection().execute("SELECT value FROM entries WHERE key = ?", (key,)).fetchone()
+        return pickle.loads(row[0]) if row else None
+
+    def set(self, key, value, ttl, version=None):
+        with self._connection() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO entries (key, value, version, expires_at) VALUES (?, ?, ?, ?)",
+                (key, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), version, time.time() + ttl)
+            )
+
+    def delete(self, key):
+        with self._connection() as conn:
+            conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+
+    def take(self, key, limit, window):
+        """Count an event under key unless `limit` already happened in the last `window` seconds.
+
+        Returns 0 if the event was counted, else the seconds until the
+        oldest one leaves the window. Every process sharing the database
+        draws from the same window.
+        """
+        now = time.time()
+        conn = self._connection()
+        with conn:
+            # Take the write lock up front so the count and insert are atomic
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("DELETE FROM events WHERE key = ? AND at <= ?", (key, now - window))
+            count, oldest = conn.execute("SELECT COUNT(*), MIN(at) FROM events WHERE key = ?", (key,)).fetchone()
+            if count < limit:
+                conn.execute("INSERT INTO events (key, at) VALUES (?, ?)", (key, now))
+                return 0
+            return max(oldest + window - now, 0.001)
+
+    def _owner(self):
+        # Threads of one process must not share a lease
+        return f"{os.getpid()}-{self._id}-{threading.get_ident()}"
+
+    def _acquire(self, key):
+        now = time.time()
+        with self._connection() as conn:
+            cursor = conn.execute(
+                "INSERT INTO leases (key, owner, expires_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at "
+                "WHERE leases.expires_at < ? OR leases.owner = excluded.owner",
+                (key, self._owner(), now + LEASE_SECONDS, now)
+            )
+            return cursor.rowcount == 1
+
+    def _release(self, key):
+        with self._connection() as conn:
+            conn.execute("DELETE FROM leases WHERE key = ? AND owner = ?", (key, self._owner()))
+
+    def get_or_refresh(self, key, loader, ttl, min_version=None, version=None):
+        """Return the cached value for key, refreshing it in one worker only.
+
+        A worker that finds no fresh entry takes the key's lease and calls
+        loader(); the others poll for its result for up to WAIT_SECONDS and
+        then fall back to the previous value, or load it themselves if there
+        is none. `version` is stored with the new value and `min_version`
+        rejects entries older than a version the caller already knows of.
+        """
+        deadline = time.time() + WAIT_SECONDS
+        delay = 0.05
+        while True:
+            cached = self.get(key, min_version)
+            if cached is not None:
+                return cached[0]
+
+            if self._acquire(key):
+                try:
+                    # Another worker may have finished between our check and the lease
+                    cached = self.get(key, min_version)
+                    if cached is not None:
+                        return cached[0]
+                    value = loader()
+                    self.set(key, value, ttl, version if version is not None else min_version)
+                    return value
+                finally:
+                    self._release(key)
+
+            if time.time() >= deadline:
+                stale = self._get_stale(key)
+                return stale if stale is not None else loader()
+            time.sleep(delay)
+            delay = min(delay * 2, 1.0)
+
+@st.cache_resource(show_spinner=False)
+def get_shared_cache():
+    """The shared cache handle of this process."""
+    return SharedCache()
@@ -0,0 +1,109 @@
+"""Write-through cache of the request history.
+
+Every write to the sheet appends a row to a sync log worksheet, and the
+log's row count is the sheet's version. A process keeps one RecordStore
+together with the version it reflects: its own writes are applied to the
+store straight away, and the store is only reloaded from Sheets when the
+remote version has moved past it, i.e. when another process wrote, or
+once it is older than max_age (edits made by hand in the sheet are not
+logged).
+"""
+import threading
+import time
+
+class WriteThroughCache:
+    """A RecordStore stamped with the remote version it reflects."""
+
+    def __init__(self, load, remote_version, check_interval=5, max_age=300):
+        # load(version) -> RecordStore and remote_version() -> int hit the sheet
+        self._load = load
+        self._remote_version = remote_version
+        self.check_interval = check_interval
+        self.max_age = max_age
+        self.store = None
+        self.version = -1
+        self._checked_at = 0.0
+        self._loaded_at = 0.0
+        self._positions = {}
+        self._lock = threading.RLock()
+
+    def _reload(self):
+        # Read the version before the data: any write the data misses will
+        # have moved the version past it
+        version = self._remote_version()
+        store = self._load(version)
+        self.store = store
+        self.version = version
+        self._positions = {po: i for i, po in enumerate(store.column("PO Number"))}
+        self._checked_at = self._loaded_at = time.monotonic()
+
+    def get(self):
+        """Current store, reloading only if another process has written since."""
+        with self._lock:
+            if self.store is None or time.monotonic() - self._loaded_at >= self.max_age:
+                self._reload()
+            elif time.monotonic() - self._checked_at >= self.check_interval:
+                if self._remote_version() > self.version:
+                    self._reload()
+                else:
+                    self._checked_at = time.monotonic()
+            return self.store
+
+    def _advance(self, version):
+        # Our write is the next version only if nobody else wrote in between;
+        # otherwise keep the old stamp so the next check reloads
+        if version == self.version + 1:
+            self.version = version
+
+    def append(self, records, version):
+        """Apply rows this process appended as remote version `version`."""
+        with self._lock:
+            if self.store is None:
+                return
+            for record in records:
+                self._positions[record["PO Number"]] = self.store.append(record)
+            self._advance(version)
+
+    def update_statuses(self, updates, version):
+        """Apply status changes this process wrote as remote version `version`."""
+        with self._lock:
+            if self.store is None:
+                return
+            for po, status in updates.items():
+                if po in self._positions:
+                    self.store.set_value(self._positions[po], "Status", status)
+            self._advance(version)
+
+    def invalidate(self):
+        """Drop the store so the next read reloads it."""
+        with self._lock:
+            self.store = None
+            self.version = -1
+
+class DerivedIndex:
+    """An index built from a WriteThroughCache's store, rebuilt when the store is.
+
+    This process's own writes are applied to the index in place by the
+    caller, as they are to the store. The store is only reloaded once the
+    remote version has moved past it, so a reloaded store means someone else
+    wrote and the index is rebuilt for the store's version.
+    """
+
+    def __init__(self, cache, build):
+        # build(store, version) -> index for that store
+        self._cache = cache
+        self._build = build
+        self.index = None
+        self.version = -1
+        self._store = None
+        self._lock = threading.RLock()
+
+    def get(self):
+        """Current index, rebuilding it if the store was reloaded since it was built."""
+        with self._lock:
+            store = self._cache.get()
+            if self.index is None or store is not self._store:
+                self.index = self._build(store, self._cache.version)
+                self.version = self._cache.version
+                self._store = store
+            return self.index
@@ -0,0 +1,134 @@
+"""In-memory stand-in for the parts of a gspread Spreadsheet that google_sheets uses."""
+import re
+import gspread
+
+_RANGE = re.compile(r"(?:'((?:[^']|'')*)'!)?([A-Z]+)(\d*)(?::([A-Z]+)(\d*))?$")
+
+class APIError(gspread.exceptions.APIError):
+    def __init__(self, message):
+        Exception.__init__(self, message)
+
+    def __str__(self):
+        return self.args[0]
+
+def _column(letters):
+    return ord(letters) - ord("A")
+
+class FakeWorksheet:
+    def __init__(self, spreadsheet, title):
+        self.spreadsheet = spreadsheet
+        self.title = title
+        self.rows = []
+
+    def _cell(self, row, column):
+        value = self.rows[row][column] if column < len(self.rows[row]) else ""
+        if value == "=COUNTA(A2:A)":
+            return str(sum(1 for r in self.rows[1:] if r and r[0]))
+        return value
+
+    def read(self, cells):
+        """Values of an A1 range, trimmed like the Sheets API trims them."""
+        _, first_col, first_row, last_col, last_row = _RANGE.match(cells).groups()
+        last_col = last_col or first_col
+        first_row = int(first_row or 1)
+        last_row = int(last_row) if last_row else (len(self.rows) if cells.count(":") else first_row)
+        values = [
+            [self._cell(row, column) for column in range(_column(first_col), _column(last_col) + 1)]
+            for row in range(first_row - 1, min(last_row, len(self.rows)))
+        ]
+        values = [row[:max([i + 1 for i, value in enumerate(row) if value] or [0])] for row in values]
+        while values and not values[-1]:
+            values.pop()
+        return values
+
+    def write(self, cells, values):
+        _, first_col, first_row, _, _ = _RANGE.match(cells).groups()
+        for i, row_values in enumerate(values):
+            row = int(first_row) - 1 + i
+            while len(self.rows) <= row:
+                self.rows.append([])
+            for j, value in enumerate(row_values):
+                column = _column(first_col) + j
+                self.rows[row].extend([""] * (column + 1 - len(self.rows[row])))
+                self.rows[row][column] = str(value)
+
+    def append_row(self, values, **kwargs):
+        return self.append_rows([values])
+
+    def append_rows(self, values, **kwargs):
+        self.spreadsheet.calls.append(("append", self.title, len(values)))
+        first = len(self.rows) + 1
+        self.rows.extend([[str(value) for value in row] for row in values])
+        return {"updates": {"updatedRange": f"'{self.title}'!A{first}:K{len(self.rows)}"}}
+
+    def get_all_values(self):
+        self.spreadsheet.calls.append(("get_all_values", self.title))
+        return [list(row) for row in self.rows]
+
+    def get(self, cells):
+        self.spreadsheet.calls.append(("get", self.title, cells))
+        return self.read(cells)
+
+    def row_values(self, row):
+        self.spreadsheet.calls.append(("row_values", self.title, row))
+        return [value for value in self.rows[row - 1] if value]
+
+    def update(self, range_name=None, values=None, **kwargs):
+        self.write(range_name, values)
+
+class FakeSpreadsheet:
+    """Also stands in for the gspread client: open_by_key returns itself."""
+
+    def __init__(self):
+        self.worksheets = {}
+        self.calls = []
+        self.messages = []
+
+    def open_by_key(self, key):
+        self.calls.append(("open_by_key",))
+        return self
+
+    def worksheet(self, title):
+        self.calls.append(("worksheet", title))
+        if title not in self.worksheets:
+            raise gspread.exceptions.WorksheetNotFound(title)
+        return self.worksheets[title]
+
+    def add_worksheet(self, title, rows, cols):
+        self.calls.append(("add_worksheet", title))
+        if title in self.worksheets:
+            raise APIError(f"A sheet with the name {title} already exists")
+        self.worksheets[title] = FakeWorksheet(self, title)
+        return self.worksheets[title]
+
+    def del_worksheet(self, worksheet):
+        self.calls.append(("del_worksheet", worksheet.title))
+        del self.worksheets[worksheet.title]
+
+    def _split(self, a1):
+        title = _RANGE.match(a1).group(1).replace("''", "'")
+        if title not in self.worksheets:
+            raise APIError(f"Unable to parse range: {a1}")
+        return self.worksheets[title], a1.split("!", 1)[1]
+
+    def values_get(self, a1):
+        self.calls.append(("values_get", a1))
+        worksheet, cells = self._split(a1)
+        return {"values": worksheet.read(cells)}
+
+    def values_batch_get(self, ranges):
+        self.calls.append(("values_batch_get", len(ranges)))
+        return {"valueRanges": [{"values": self._split(a1)[0].read(self._split(a1)[1])} for a1 in ranges]}
+
+    def values_batch_update(self, body):
+        self.calls.append(("values_batch_update", len(body["data"])))
+        for data in body["data"]:
+            worksheet, cells = self._split(data["range"])
+            worksheet.write(cells, data["values"])
+
+    def fetch_sheet_metadata(self, params=None):
+        self.calls.append(("fetch_sheet_metadata",))
+        return {"sheets": [
+            {"properties": {"title": title, "gridProperties": {"rowCount": len(worksheet.rows) + 10}}}
+            for title, worksheet in self.worksheets.items()
+        ]}
@@ -0,0 +1,51 @@
+import pickle
+from approval_queue import ApprovalQueue
+
+def request(po, timestamp, urgency="Normal", status="Pending"):
+    return {"PO Number": po, "Timestamp": timestamp, "Urgency": urgency, "Status": status}
+
+def top_numbers(queue, k=20):
+    return [doc["PO Number"] for doc in queue.top(k)]
+
+def test_urgent_first_then_oldest_and_missing_timestamps_first():
+    queue = ApprovalQueue.from_records([
+        request("N2", "2024-01-02 00:00:00"),
+        request("U1", "2024-01-03 00:00:00", urgency="Urgent"),
+        request("N1", "2024-01-01 00:00:00"),
+        request("NX", ""),
+        request("DONE", "2023-01-01 00:00:00", status="Approved"),
+    ])
+    assert top_numbers(queue) == ["U1", "NX", "N1", "N2"]
+    assert len(queue) == 4 and "DONE" not in queue
+
+def test_removed_entries_are_skipped_and_top_does_not_consume():
+    queue = ApprovalQueue.from_records([request(f"P{i}", f"2024-01-0{i + 1} 00:00:00") for i in range(5)])
+    queue.update_status("P0", "Approved")
+    queue.remove("P2")
+    assert top_numbers(queue, 2) == ["P1", "P3"]
+    assert top_numbers(queue, 2) == ["P1", "P3"]
+    assert len(queue) == 3
+
+def test_heap_is_compacted_once_stale_entries_dominate():
+    queue = ApprovalQueue.from_records([request(f"P{i}", "2024-01-01 00:00:00") for i in range(10)])
+    for i in range(6):
+        queue.remove(f"P{i}")
+    assert len(queue._heap) <= 2 * len(queue)
+
+def test_readding_replaces_entry_and_pending_requeues():
+    queue = ApprovalQueue()
+    queue.add(request("P1", "2024-01-05 00:00:00"))
+    queue.add(request("P1", "2024-01-05 00:00:00", urgency="Urgent"))
+    assert len(queue) == 1 and queue.counts() == {"Urgent": 1}
+
+    queue.update_status("P1", "Rejected")
+    queue.update_status("P1", "Pending")
+    assert "P1" not in queue
+    queue.update_status("P1", "Pending", request("P1", "2024-01-05 00:00:00", status="Rejected"))
+    assert top_numbers(queue) == ["P1"]
+
+def test_pickle_round_trip():
+    queue = ApprovalQueue.from_records([request("P1", "2024-01-01 00:00:00")])
+    restored = pickle.loads(pickle.dumps(queue))
+    restored.add(request("P2", "2023-12-31 00:00:00"))
+    assert top_numbers(restored) == ["P2", "P1"]
@@ -0,0 +1,62 @@
+import threading
+import time
+from backup_uploader import BackupUploader
+
+class FakeDrive:
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.uploads = []
+        self.uploaded = threading.Event()
+
+    def save_file(self, file_path, mimetype="text/csv"):
+        self.uploads.append((str(file_path), time.monotonic()))
+        self.uploaded.set()
+        return not self.fail
+
+def test_burst_of_saves_is_coalesced_into_one_upload():
+    drive = FakeDrive()
+    uploader = BackupUploader(debounce=0.1, max_staleness=10)
+    for _ in range(20):
+        uploader.request("a.csv", drive, "alice")
+    assert uploader.flush(2)
+    assert [path for path, _ in drive.uploads] == ["a.csv"]
+    assert uploader.stats()["skip_ratio"] == 0.95
+
+def test_saves_by_different_owners_upload_with_their_own_service():
+    alice, bob = FakeDrive(), FakeDrive()
+    uploader = BackupUploader(debounce=0.1, max_staleness=10)
+    uploader.request("a.csv", alice, "alice")
+    uploader.request("a.csv", bob, "bob")
+    uploader.request("a.csv", alice, "alice")
+    assert uploader.flush(2)
+    assert len(alice.uploads) == 1 and len(bob.uploads) == 1
+
+def test_debounce_waits_for_saves_to_stop():
+    drive = FakeDrive()
+    uploader = BackupUploader(debounce=0.2, max_staleness=10)
+    uploader.request("a.csv", drive, "alice")
+    time.sleep(0.1)
+    uploader.request("a.csv", drive, "alice")
+    assert not drive.uploaded.wait(0.15)
+    assert drive.uploaded.wait(1)
+
+def test_max_staleness_bounds_the_wait_under_constant_saves():
+    drive = FakeDrive()
+    uploader = BackupUploader(debounce=0.2, max_staleness=0.3)
+    started = time.monotonic()
+    while not drive.uploads and time.monotonic() - started < 2:
+        uploader.request("a.csv", drive, "alice")
+        time.sleep(0.02)
+    assert drive.uploads and drive.uploads[0][1] - started < 0.6
+
+def test_failures_back_off_and_are_dropped_after_max_attempts():
+    drive = FakeDrive(fail=True)
+    uploader = BackupUploader(debounce=0.05, max_staleness=10, max_attempts=3)
+    uploader.request("a.csv", drive, "alice")
+    deadline = time.monotonic() + 3
+    while uploader.stats()["dropped"] == 0 and time.monotonic() < deadline:
+        time.sleep(0.02)
+    stats = uploader.stats()
+    assert stats["failures"] == 3 and stats["dropped"] == 1 and stats["pending"] == 0
+    gaps = [b[1] - a[1] for a, b in zip(drive.uploads, drive.uploads[1:])]
+    assert gaps[1] > gaps[0] * 1.5
@@ -0,0 +1,54 @@
+from datetime import datetime
+import pandas as pd
+from bulk_import import generate_po_numbers, prepare_rows, read_rows
+
+NOW = datetime(2024, 2, 1, 9, 30)
+
+def rows(**overrides):
+    row = {
+        "Requester": "R", "Email": "a@ketos.co", "Item URL": "https://vendor.com/item", "Quantity": "2",
+        "Attention": "A", "Description": "D", "Category": "Testing", "Urgency": "Normal"
+    }
+    return pd.DataFrame([row | overrides], dtype=str)
+
+def test_po_numbers_are_unique_across_imports_in_the_same_second():
+    first, second = generate_po_numbers(3, NOW), generate_po_numbers(3, NOW)
+    assert len(set(first + second)) == 6
+    assert all(po.startswith("RD-PO-240201-093000-") for po in first + second)
+    assert [po[-4:] for po in first] == ["0001", "0002", "0003"]
+
+def test_valid_rows_get_defaults_and_po_numbers():
+    records, errors = prepare_rows(rows(Category="", Urgency="", Email=""), default_email="b@ketos.co", now=NOW)
+    assert errors.empty
+    record = records.iloc[0]
+    assert (record["Category"], record["Urgency"], record["Status"]) == ("Other", "Normal", "Pending")
+    assert record["Email"] == "b@ketos.co" and record["Timestamp"] == "2024-02-01 09:30:00"
+    assert record["Quantity"] == 2 and record["PO Number"].startswith("RD-PO-240201-093000-")
+
+def test_invalid_rows_are_reported_and_skipped():
+    df = pd.concat([
+        rows(),
+        rows(Requester=" ", Description=""),
+        rows(Quantity="1.5"),
+        rows(Category="Snacks"),
+        rows(Timestamp="yesterday-ish")
+    ], ignore_index=True).fillna("")
+    records, errors = prepare_rows(df, now=NOW)
+    assert len(records) == 1
+    assert errors.to_dict() == {
+        1: "Missing required fields: Requester, Description",
+        2: "Invalid quantity",
+        3: "Unknown category",
+        4: "Invalid timestamp"
+    }
+
+def test_back_dated_rows_keep_their_timestamp():
+    records, _ = prepare_rows(rows(Timestamp="2023-12-24"), now=NOW)
+    assert records.iloc[0]["Timestamp"] == "2023-12-24 00:00:00"
+
+def test_read_rows_maps_form_field_names(tmp_path):
+    path = tmp_path / "requests.jsonl"
+    path.write_text('{"requester": "R", "link": "https://vendor.com/item", "quantity": 3}\n')
+    df = read_rows(path)
+    assert list(df.columns) == ["Requester", "Item URL", "Quantity"]
+    assert df.iloc[0].tolist() == ["R", "https://vendor.com/item", "3"]
@@ -0,0 +1,37 @@
+from count_cube import CountCube
+from record_store import RecordStore
+
+COLUMNS = ["PO Number", "Timestamp", "Category", "Urgency", "Requester", "Status"]
+
+def record(po, timestamp, category="Testing", status="Pending"):
+    return {"PO Number": po, "Timestamp": timestamp, "Category": category, "Urgency": "Normal", "Requester": "r", "Status": status}
+
+def test_refresh_folds_in_only_new_rows():
+    store = RecordStore.from_records([record("P1", "2024-01-05 00:00:00"), record("P2", "2024-02-05 00:00:00")], columns=COLUMNS)
+    cube = CountCube()
+    assert cube.refresh(store) == 2
+    store.append(record("P3", "2024-02-06 00:00:00", category="Other"))
+    assert cube.refresh(store) == 1
+    assert cube.refresh(store) == 0
+    assert cube.breakdown("Month") == {"2024-02": 2, "2024-01": 1}
+    assert cube.total(Category="Other") == 1
+
+def test_refresh_rebuilds_when_earlier_rows_change():
+    store = RecordStore.from_records([record("P1", "2024-01-05 00:00:00"), record("P2", "2024-01-06 00:00:00")], columns=COLUMNS)
+    cube = CountCube()
+    cube.refresh(store)
+    store.set_value(0, "Status", "Approved")
+    assert cube.refresh(store) == 2
+    assert cube.breakdown("Status") == {"Pending": 1, "Approved": 1}
+
+def test_refresh_rebuilds_for_a_shorter_store():
+    cube = CountCube()
+    cube.refresh(RecordStore.from_records([record(f"P{i}", "2024-01-05 00:00:00") for i in range(3)], columns=COLUMNS))
+    assert cube.refresh(RecordStore.from_records([record("P0", "2024-01-05 00:00:00")], columns=COLUMNS)) == 1
+    assert cube.total() == 1
+
+def test_missing_timestamp_counts_under_empty_month():
+    cube = CountCube()
+    cube.refresh(RecordStore.from_records([record("P1", "garbage")], columns=COLUMNS))
+    assert cube.breakdown("Month") == {"": 1}
+    assert cube.total(month_from="2024-01") == 0
@@ -0,0 +1,34 @@
+from datetime import date
+import pandas as pd
+import pytest
+import archive
+from data_utils import PurchaseData
+
+pytest.importorskip("pyarrow")
+
+@pytest.fixture
+def purchase_data(tmp_path, monkeypatch):
+    monkeypatch.setattr(archive, "ARCHIVE_DIR", tmp_path / "archive")
+    data = PurchaseData()
+    data.csv_file = tmp_path / "purchase_requests.csv"
+    rows = [
+        {column: "" for column in data.columns} | {"Requester": f"R{month}", "Request_DateTime": f"2024-{month:02d}-01 10:00:00 PST"}
+        for month in range(1, 7)
+    ]
+    pd.DataFrame(rows).to_csv(data.csv_file, index=False)
+    return data
+
+def requesters(chunks):
+    return [requester for chunk in chunks for requester in chunk["Requester"]]
+
+def test_compact_moves_old_rows_to_an_archive(purchase_data):
+    assert purchase_data.compact(date(2024, 4, 1)) == 3
+    assert list(pd.read_csv(purchase_data.csv_file)["Requester"]) == ["R4", "R5", "R6"]
+    [path] = purchase_data.archive_files()
+    assert [record["Requester"] for record in archive.read_archive(path)] == ["R1", "R2", "R3"]
+
+def test_iter_chunks_reads_archives_before_the_csv_file(purchase_data):
+    purchase_data.compact(date(2024, 4, 1))
+    assert requesters(purchase_data.iter_chunks(chunk_size=2)) == ["R1", "R2", "R3", "R4", "R5", "R6"]
+    # Archives compacted before start hold only older rows
+    assert requesters(purchase_data.iter_chunks(start="2099-01-01")) == ["R4", "R5", "R6"]
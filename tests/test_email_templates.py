@@ -0,0 +1,42 @@
+import pytest
+from email_templates import _safe_url, render_confirmation, render_digest, render_order_text
+
+@pytest.mark.parametrize("url, expected", [
+    ("https://vendor.com/item?a=1&b=2", "https://vendor.com/item?a=1&b=2"),
+    ("  HTTP://vendor.com  ", "HTTP://vendor.com"),
+    ("javascript:alert(1)", "#"),
+    ("JavaScript:alert(1)", "#"),
+    ("data:text/html,<script>", "#"),
+    ("mailto:ann@ketos.co", "#"),
+    ("vendor.com/item", "https://vendor.com/item"),
+    ("www.vendor.com", "https://www.vendor.com"),
+    ("vendor.com:8080/item", "https://vendor.com:8080/item"),
+    ("//vendor.com/item", "https://vendor.com/item"),
+    ("item 42", "#"),
+    ("/item", "#"),
+    ("", "#"),
+])
+def test_safe_url_allows_only_http_links(url, expected):
+    assert _safe_url(url) == expected
+
+PO = {
+    "PO Number": "RD-PO-1", "Requester": "Ann", "Timestamp": "2024-01-01 00:00:00",
+    "Item URL": 'https://vendor.com/x?a=1&b="><script>', "Quantity": 1, "Attention": "Bob",
+    "Category": "Testing", "Urgency": "Normal", "Description": "<b>bold</b> & more"
+}
+
+def test_confirmation_escapes_values_and_href():
+    body = render_confirmation(PO, "ann@ketos.co")
+    assert "<b>bold</b>" not in body and "&lt;b&gt;bold&lt;/b&gt; &amp; more" in body
+    assert '<script>' not in body
+    assert 'href="https://vendor.com/x?a=1&amp;b=&#34;&gt;&lt;script&gt;"' in body
+
+def test_digest_neutralizes_script_urls():
+    body = render_digest([dict(PO, **{"Item URL": "javascript:alert(1)", "Email": "ann@ketos.co"})])
+    assert 'href="#"' in body and "1 purchase request:" in body
+
+def test_order_text_is_not_html_escaped_but_single_line():
+    form = {key: "x" for key in ("Request_DateTime", "Link", "Quantity", "Address", "Attention_To", "Department", "Classification", "Urgency")}
+    text = render_order_text(dict(form, Requester="Ann & Co", Description="line one\nInjected: yes"))
+    assert "Ann & Co" in text
+    assert "- Description of Use: line one Injected: yes" in text
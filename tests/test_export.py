@@ -0,0 +1,42 @@
+import pandas as pd
+import archive
+from export import filter_chunk, export_requests
+
+def chunk():
+    return pd.DataFrame({
+        "PO Number": ["A", "B", "C", "D"],
+        "Timestamp": ["2024-01-31 23:59:59", "2024-02-01 00:00:00", "2024-02-15 12:00:00", "not a date"],
+        "Status": ["Pending", "Approved", "Rejected", "Pending"]
+    }, dtype=str)
+
+def test_filter_chunk_keeps_rows_in_the_half_open_range():
+    df = filter_chunk(chunk(), "Timestamp", pd.Timestamp("2024-02-01"), pd.Timestamp("2024-02-15 12:00:00"))
+    assert list(df["PO Number"]) == ["B"]
+
+def test_filter_chunk_drops_unparseable_timestamps_only_when_filtering():
+    assert list(filter_chunk(chunk(), "Timestamp", start=pd.Timestamp("2000-01-01"))["PO Number"]) == ["A", "B", "C"]
+    assert len(filter_chunk(chunk(), "Timestamp")) == 4
+
+def test_filter_chunk_reads_local_timestamps_with_a_timezone_suffix():
+    df = pd.DataFrame({"Request_DateTime": ["2024-02-01 10:00:00 PST", "2024-03-01 10:00:00 PST"]})
+    assert len(filter_chunk(df, "Request_DateTime", end=pd.Timestamp("2024-02-02"))) == 1
+
+def test_filter_chunk_selects_columns():
+    assert list(filter_chunk(chunk(), "Timestamp", columns=["Status", "PO Number"]).columns) == ["Status", "PO Number"]
+
+def test_local_source_streams_the_csv_store(tmp_path, monkeypatch):
+    from config import Config
+    from data_utils import PurchaseData
+
+    monkeypatch.setattr(Config, "CSV_FILE", tmp_path / "requests.csv")
+    monkeypatch.setattr(archive, "ARCHIVE_DIR", tmp_path / "archive")
+    columns = PurchaseData().columns
+    pd.DataFrame([
+        {column: "" for column in columns} | {"Requester": f"R{day}", "Request_DateTime": f"2024-02-{day:02d} 10:00:00 PST"}
+        for day in range(1, 6)
+    ]).to_csv(Config.CSV_FILE, index=False)
+
+    out = tmp_path / "out.jsonl"
+    rows = export_requests(out, source="local", start="2024-02-02", end="2024-02-04", columns=["Requester"], chunk_size=2)
+    assert rows == 2
+    assert pd.read_json(out, lines=True)["Requester"].tolist() == ["R2", "R3"]
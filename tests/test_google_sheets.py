@@ -0,0 +1,223 @@
+import os
+import threading
+import time
+import pytest
+import archive
+import google_sheets as gs
+from shared_cache import SharedCache
+from fake_sheets import FakeSpreadsheet, FakeWorksheet
+
+@pytest.fixture
+def sheet(tmp_path, monkeypatch):
+    fake = FakeSpreadsheet()
+    # The legacy worksheet every spreadsheet starts with
+    fake.add_worksheet(gs.WORKSHEET_NAME, rows=1000, cols=len(gs.COLUMNS)).append_row(gs.COLUMNS)
+    # Streamlit errors and warnings are collected on the fake sheet
+    monkeypatch.setattr(gs.st, "error", fake.messages.append)
+    monkeypatch.setattr(gs.st, "warning", fake.messages.append)
+    cache = SharedCache(str(tmp_path / "cache.sqlite3"))
+    monkeypatch.setattr(gs, "get_google_sheets_client", lambda: fake)
+    monkeypatch.setattr(gs, "get_shared_cache", lambda: cache)
+    monkeypatch.setattr(archive, "ARCHIVE_DIR", tmp_path / "archive")
+    for getter in (gs._get_store_cache, gs._get_search_index_cache, gs._get_approval_queue_cache,
+                   gs.get_shard_catalog, gs._catalog_version, gs.get_po_row_index):
+        getter.clear()
+    return fake
+
+def request(po, timestamp, email="a@ketos.co", status="Pending"):
+    return {
+        "PO Number": po, "Requester": "R", "Email": email, "Timestamp": timestamp,
+        "Item URL": "https://vendor.com/item", "Quantity": 1, "Attention": "A", "Category": "Testing",
+        "Description": "D", "Urgency": "Normal", "Status": status
+    }
+
+def po_numbers(worksheet):
+    return [row[0] for row in worksheet.rows[1:]]
+
+def test_requests_are_routed_to_the_shard_of_their_month(sheet):
+    written = gs.append_requests([
+        request("PO-1", "2024-02-02 09:00:00"),
+        request("PO-2", "2024-03-05 09:00:00"),
+        request("PO-3", "2024-02-20 09:00:00")
+    ])
+    assert sorted(written) == ["PO-1", "PO-2", "PO-3"]
+    assert po_numbers(sheet.worksheet("Requests 2024-02")) == ["PO-1", "PO-3"]
+    assert po_numbers(sheet.worksheet("Requests 2024-03")) == ["PO-2"]
+    catalog = {shard["Shard"]: (shard["Start"], shard["End"]) for shard in gs.get_shard_catalog()}
+    assert catalog["Requests 2024-02"] == ("2024-02-01", "2024-03-01")
+    assert gs.get_po_row_index()["PO-3"] == ("Requests 2024-02", 3)
+
+def archive_february(sheet):
+    gs.append_requests([request("PO-1", "2024-02-02 09:00:00", status="Approved")])
+    assert gs.archive_cold_shards() == ["Requests 2024-02"]
+
+def test_closed_cold_shard_is_archived_and_still_readable(sheet):
+    pytest.importorskip("pyarrow")
+    gs.append_requests([
+        request("PO-1", "2024-02-02 09:00:00", status="Approved"),
+        request("PO-2", "2024-03-05 09:00:00")
+    ])
+    # A shard with a pending request stays hot until max_days
+    assert gs.archive_cold_shards(max_days=100000) == ["Requests 2024-02"]
+
+    shard = next(shard for shard in gs.get_shard_catalog() if shard["Shard"] == "Requests 2024-02")
+    assert os.path.isabs(shard["Archive"]) and os.path.exists(shard["Archive"])
+    assert [r["PO Number"] for r in gs.get_requests_in_range("2024-01-01", "2024-04-01")] == ["PO-1", "PO-2"]
+
+    # The worksheet outlives the grace period only
+    assert "Requests 2024-02" in sheet.worksheets
+    old = time.time() - gs.ARCHIVE_GRACE_SECONDS - 1
+    os.utime(shard["Archive"], (old, old))
+    gs.archive_cold_shards(max_days=100000)
+    assert "Requests 2024-02" not in sheet.worksheets
+
+def test_late_requests_for_archived_periods_get_a_new_shard_each_time(sheet):
+    pytest.importorskip("pyarrow")
+    archive_february(sheet)
+
+    gs.append_requests([request("LATE-1", "2024-02-10 09:00:00", status="Approved")])
+    assert po_numbers(sheet.worksheet("Requests 2024-02 (late)")) == ["LATE-1"]
+    assert gs.archive_cold_shards() == ["Requests 2024-02 (late)"]
+
+    gs.append_requests([request("LATE-2", "2024-02-11 09:00:00")])
+    assert po_numbers(sheet.worksheet("Requests 2024-02 (late 2)")) == ["LATE-2"]
+    records = gs.get_requests_in_range("2024-02-01", "2024-03-01")
+    assert sorted(r["PO Number"] for r in records) == ["LATE-1", "LATE-2", "PO-1"]
+
+def test_relative_archive_paths_resolve_against_archive_dir(sheet):
+    pytest.importorskip("pyarrow")
+    archive_february(sheet)
+    catalog = sheet.worksheet(gs.CATALOG_WORKSHEET)
+    row = next(row for row in catalog.rows if row[0] == "Requests 2024-02")
+    row[3] = os.path.join("archive", os.path.basename(row[3]))
+    gs.get_shard_catalog().clear()
+
+    shard = next(shard for shard in gs._read_catalog(sheet) if shard["Shard"] == "Requests 2024-02")
+    assert shard["Archive"] == str(archive.ARCHIVE_DIR / "requests-2024-02.parquet")
+
+def statuses(worksheet):
+    return {row[0]: row[10] for row in worksheet.rows[1:]}
+
+def test_status_updates_are_written_in_one_batch(sheet):
+    gs.append_requests([request(f"PO-{i}", f"2024-02-0{i + 1} 09:00:00") for i in range(3)])
+    sheet.calls.clear()
+    assert gs.update_request_statuses({"PO-0": "Approved", "PO-2": "Rejected"}) == ["PO-0", "PO-2"]
+    assert statuses(sheet.worksheet("Requests 2024-02")) == {"PO-0": "Approved", "PO-1": "Pending", "PO-2": "Rejected"}
+    assert [call for call in sheet.calls if call[0] == "values_batch_update"] == [("values_batch_update", 2)]
+
+def test_rows_moved_by_hand_are_found_again(sheet):
+    gs.append_requests([request(f"PO-{i}", f"2024-02-0{i + 1} 09:00:00") for i in range(3)])
+    worksheet = sheet.worksheet("Requests 2024-02")
+    # Sorted newest first by hand; the cached row index is now wrong
+    worksheet.rows[1:] = worksheet.rows[:0:-1]
+    assert gs.update_request_statuses({"PO-0": "Approved"}) == ["PO-0"]
+    assert statuses(worksheet) == {"PO-2": "Pending", "PO-1": "Pending", "PO-0": "Approved"}
+    assert gs.get_po_row_index()["PO-0"] == ("Requests 2024-02", 4)
+
+def test_rows_that_keep_moving_are_not_written(sheet, monkeypatch):
+    gs.append_requests([request(f"PO-{i}", f"2024-02-0{i + 1} 09:00:00") for i in range(3)])
+    worksheet = sheet.worksheet("Requests 2024-02")
+    refresh = gs._refresh_po_row_index
+
+    def refresh_then_move(*args):
+        refresh(*args)
+        worksheet.rows[1:] = worksheet.rows[:0:-1]
+
+    monkeypatch.setattr(gs, "_refresh_po_row_index", refresh_then_move)
+    worksheet.rows[1:] = worksheet.rows[:0:-1]
+    assert gs.update_request_statuses({"PO-0": "Approved", "PO-1": "Rejected"}) == ["PO-1"]
+    assert statuses(worksheet) == {"PO-0": "Pending", "PO-1": "Rejected", "PO-2": "Pending"}
+    assert "PO Numbers not found: PO-0" in sheet.messages
+
+def test_requests_decided_meanwhile_are_skipped(sheet):
+    gs.append_requests([request(f"PO-{i}", f"2024-02-0{i + 1} 09:00:00") for i in range(2)])
+    worksheet = sheet.worksheet("Requests 2024-02")
+    worksheet.rows[1][10] = "Rejected"
+    assert gs.update_request_statuses({"PO-0": "Approved", "PO-1": "Approved"}, from_status="Pending") == ["PO-1"]
+    assert statuses(worksheet) == {"PO-0": "Rejected", "PO-1": "Approved"}
+    assert any("PO-0 (Rejected)" in message for message in sheet.messages)
+
+def test_append_requests_writes_in_chunks_and_indexes_rows(sheet):
+    written = gs.append_requests([request(f"PO-{i}", f"2024-02-{i + 1:02d} 09:00:00") for i in range(5)], chunk_size=2)
+    assert written == [f"PO-{i}" for i in range(5)]
+    # The header row of the new shard, then three chunks
+    assert [call[2] for call in sheet.calls if call[:2] == ("append", "Requests 2024-02")] == [1, 2, 2, 1]
+    assert gs.get_po_row_index()["PO-4"] == ("Requests 2024-02", 6)
+    assert [record["PO Number"] for record in gs.get_record_store().rows()] == written
+
+def test_append_requests_reports_the_rows_written_before_a_failure(sheet, monkeypatch):
+    gs.append_requests([request("PO-0", "2024-01-05 09:00:00")])
+    append_rows = FakeWorksheet.append_rows
+    chunks = []
+
+    def append_rows_failing_third_chunk(self, values, **kwargs):
+        if self.title == "Requests 2024-01":
+            chunks.append(values)
+            if len(chunks) == 3:
+                raise ConnectionError("quota exceeded")
+        return append_rows(self, values, **kwargs)
+
+    monkeypatch.setattr(FakeWorksheet, "append_rows", append_rows_failing_third_chunk)
+    written = gs.append_requests([request(f"PO-{i}", f"2024-01-{i + 1:02d} 10:00:00") for i in range(1, 6)], chunk_size=2)
+    assert written == ["PO-1", "PO-2", "PO-3", "PO-4"]
+    assert any("after 4 rows" in message for message in sheet.messages)
+
+def all_pages(page_size, **filters):
+    pages, cursor = [], None
+    while True:
+        page, cursor = gs.get_user_requests_page("a@ketos.co", page_size=page_size, cursor=cursor, **filters)
+        pages.append([record["PO Number"] for record in page])
+        if cursor is None:
+            return pages
+
+def test_pages_walk_newest_first_through_requests_sharing_a_timestamp(sheet):
+    gs.append_requests([
+        request("PO-1", "2024-02-01 09:00:00"),
+        request("PO-2", "2024-02-02 09:00:00"),
+        request("PO-3", "2024-02-02 09:00:00"),
+        request("PO-4", "2024-02-02 09:00:00"),
+        request("OTHER", "2024-02-02 09:00:00", email="b@ketos.co"),
+        request("PO-5", "2024-03-01 09:00:00", status="Approved")
+    ])
+    pages = all_pages(2)
+    assert [len(page) for page in pages] == [2, 2, 1]
+    assert sorted(po for page in pages for po in page) == ["PO-1", "PO-2", "PO-3", "PO-4", "PO-5"]
+    assert pages[0][0] == "PO-5" and pages[-1] == ["PO-1"]
+    assert all_pages(10, status="Approved") == [["PO-5"]]
+
+def test_pages_continue_into_archived_shards(sheet):
+    pytest.importorskip("pyarrow")
+    gs.append_requests([request(f"OLD-{i}", f"2024-02-0{i} 09:00:00", status="Approved") for i in range(1, 4)])
+    gs.archive_cold_shards()
+    gs.append_requests([request("NEW", "2026-10-01 09:00:00")])
+    assert all_pages(2) == [["NEW", "OLD-3"], ["OLD-2", "OLD-1"]]
+
+def test_page_size_must_be_positive(sheet):
+    with pytest.raises(ValueError):
+        gs.get_user_requests_page("a@ketos.co", page_size=0)
+
+# Spreadsheet calls that cost a request against the Sheets read quota
+READS = {"open_by_key", "worksheet", "get_all_values", "get", "row_values", "values_get", "values_batch_get", "fetch_sheet_metadata"}
+
+def test_every_read_is_counted_on_the_calling_thread(sheet, monkeypatch):
+    pytest.importorskip("pyarrow")
+    cache = gs.get_shared_cache()
+    take = cache.take
+    takers = []
+
+    def counting_take(key, limit, window):
+        takers.append(threading.current_thread())
+        return take(key, limit, window)
+
+    monkeypatch.setattr(cache, "take", counting_take)
+    # Every take is then granted at once, so each one counts a single read
+    monkeypatch.setattr(gs._read_budget, "per_minute", 10000)
+    gs.append_requests([request(f"PO-{i}", f"2024-0{i}-02 09:00:00", status="Approved") for i in range(1, 6)])
+    gs.get_requests_in_range("2024-01-01", "2024-07-01")
+    gs.update_request_statuses({"PO-1": "Rejected"})
+    gs.archive_cold_shards()
+    list(gs.iter_request_chunks(2))
+
+    assert not sheet.messages
+    assert len(takers) == sum(call[0] in READS for call in sheet.calls)
+    assert set(takers) == {threading.main_thread()}
@@ -0,0 +1,63 @@
+from record_store import RecordStore, TimestampIndex, MISSING, parse_timestamp
+
+COLUMNS = ["PO Number", "Email", "Timestamp", "Quantity", "Status"]
+
+def record(po, timestamp, quantity="1", status="Pending", email="a@ketos.co"):
+    return {"PO Number": po, "Email": email, "Timestamp": timestamp, "Quantity": quantity, "Status": status}
+
+def test_parse_timestamp_formats():
+    assert parse_timestamp("2024-01-05 03:15:00") == parse_timestamp("2024-01-05T03:15:00")
+    assert parse_timestamp("2024-01-05 03:15:00 PST") == parse_timestamp("2024-01-05 03:15:00")
+    assert parse_timestamp("1/5/2024 3:15 AM") == parse_timestamp("2024-01-05 03:15:00")
+    assert parse_timestamp("") == MISSING
+    assert parse_timestamp("3") == MISSING
+    assert parse_timestamp("not a date at all") == MISSING
+
+def test_timestamp_index_range_and_backdated_insert():
+    index = TimestampIndex()
+    for position, timestamp in enumerate([10, 20, 20, 30]):
+        index.add(timestamp, position)
+    index.add(15, 4)
+    index.add(MISSING, 5)
+    assert len(index) == 5
+    assert list(index.range(15, 30)) == [4, 1, 2]
+    assert list(index.range(None, 20)) == [0, 4]
+    assert list(index.range(31)) == []
+
+def test_timestamp_index_remove_duplicate_keys():
+    index = TimestampIndex()
+    for position in range(3):
+        index.add(20, position)
+    index.remove(20, 1)
+    index.remove(99, 0)
+    assert list(index.range()) == [0, 2]
+
+def test_store_range_uses_timestamps_and_skips_missing():
+    store = RecordStore.from_records([
+        record("P1", "2024-03-01 10:00:00"),
+        record("P2", "garbage"),
+        record("P3", "2024-01-01 10:00:00"),
+        record("P4", "2024-02-01 10:00:00"),
+    ], columns=COLUMNS)
+    assert [store.value(i, "PO Number") for i in store.range("2024-01-15")] == ["P4", "P1"]
+    assert [store.value(i, "PO Number") for i in store.range()] == ["P3", "P4", "P1"]
+
+def test_unparsed_cells_keep_their_text():
+    store = RecordStore.from_records([
+        record("P1", "someday", quantity="3 boxes"),
+        record("P2", "2024-01-01 00:00:00", quantity="1,000"),
+        record("P3", "2024-01-01 00:00:00", quantity="2.0"),
+    ], columns=COLUMNS)
+    assert store.value(0, "Timestamp") == "someday"
+    assert store.value(0, "Quantity") == "3 boxes"
+    assert store.value(1, "Quantity") == 1000
+    assert store.value(2, "Quantity") == 2
+    assert store.unparsed_counts() == {"Timestamp": 1, "Quantity": 1}
+
+def test_set_value_moves_row_in_timestamp_index():
+    store = RecordStore.from_records([record("P1", "2024-01-01 00:00:00"), record("P2", "2024-02-01 00:00:00")], columns=COLUMNS)
+    store.set_value(0, "Timestamp", "2024-03-01 00:00:00")
+    store.set_value(1, "Status", "Approved")
+    assert [store.value(i, "PO Number") for i in store.range()] == ["P2", "P1"]
+    assert store.row(1)["Status"] == "Approved"
+    assert list(store.filter(Status="Approved")) == [1]
@@ -0,0 +1,34 @@
+import pickle
+from search_index import SearchIndex, normalize_url
+
+def test_normalize_url_drops_scheme_www_fragment_and_trailing_slash():
+    assert normalize_url("https://www.Vendor.com/item/42/#specs") == "vendor.com/item/42"
+    assert normalize_url("vendor.com/item/42") == "vendor.com/item/42"
+    assert normalize_url("  ") == ""
+
+def test_normalize_url_drops_tracking_params_by_exact_name_or_prefix():
+    url = "https://vendor.com/item?utm_source=x&gclid=1&ref=po&mc_cid=2&id=7"
+    assert normalize_url(url) == "vendor.com/item?id=7"
+
+def test_normalize_url_keeps_params_that_only_look_like_tracking():
+    assert normalize_url("https://vendor.com/p?reference=7&spmode=1") == "vendor.com/p?reference=7&spmode=1"
+
+def test_normalize_url_sorts_query():
+    assert normalize_url("vendor.com/p?b=2&a=1") == normalize_url("vendor.com/p?a=1&b=2")
+
+def doc(po, url, description="", timestamp="2024-01-01 00:00:00"):
+    return {"PO Number": po, "Item URL": url, "Description": description, "Timestamp": timestamp, "Status": "Pending"}
+
+def test_find_duplicates_and_replace():
+    index = SearchIndex.from_records([
+        doc("P2", "https://vendor.com/item/1?utm_source=mail", timestamp="2024-02-01 00:00:00"),
+        doc("P1", "http://www.vendor.com/item/1/", timestamp="2024-01-01 00:00:00"),
+    ])
+    assert [d["PO Number"] for d in index.find_duplicates("vendor.com/item/1")] == ["P1", "P2"]
+    index.add(doc("P1", "https://vendor.com/item/2"))
+    assert [d["PO Number"] for d in index.find_duplicates("vendor.com/item/1")] == ["P2"]
+
+def test_search_survives_pickling():
+    index = SearchIndex.from_records([doc("P1", "https://vendor.com/pipette", "pipette tips")])
+    restored = pickle.loads(pickle.dumps(index))
+    assert [d["PO Number"] for d in restored.search("pipette")] == ["P1"]
@@ -0,0 +1,46 @@
+import time
+import pandas as pd
+from session_store import SessionStore, estimate_size
+
+def test_session_budget_evicts_least_recently_used_entries():
+    store = SessionStore(session_budget=100, total_budget=1000)
+    store.put("s", "a", "x", size=40)
+    store.put("s", "b", "x", size=40)
+    store.get("s", "a")
+    store.put("s", "c", "x", size=40)
+    assert store.get("s", "b") is None and store.get("s", "a") == "x"
+    assert not store.put("s", "big", "x", size=101)
+
+def test_total_budget_evicts_least_recently_active_sessions():
+    store = SessionStore(session_budget=100, total_budget=150)
+    store.put("old", "k", "x", size=80)
+    store.put("new", "k", "x", size=80)
+    assert "old" not in store and store.get("new", "k") == "x"
+    assert store.total == 80 and store.evicted_sessions == 1
+
+def test_polls_do_not_keep_an_idle_session_alive():
+    store = SessionStore(idle_seconds=0.05)
+    store.put("tab", "pages", [1])
+    time.sleep(0.06)
+    assert store.get("tab", "pages", touch=False) == [1]
+    # Another session's write drops the idle one
+    store.put("other", "pages", [2])
+    assert "tab" not in store
+
+def test_untouched_put_does_not_recreate_an_evicted_session():
+    store = SessionStore()
+    assert not store.put("gone", "pages", [1], touch=False)
+    assert "gone" not in store and store.total == 0
+
+def test_untouched_put_keeps_the_last_access_time():
+    store = SessionStore(idle_seconds=0.05)
+    store.put("tab", "pages", [1])
+    time.sleep(0.06)
+    assert store.put("tab", "frame", [2], touch=False)
+    store.put("other", "pages", [3])
+    assert "tab" not in store
+
+def test_estimate_size_counts_frames_and_containers():
+    df = pd.DataFrame({"a": ["x" * 100] * 10})
+    assert estimate_size(df) > 1000
+    assert estimate_size([df, df]) < 2 * estimate_size(df) + 200
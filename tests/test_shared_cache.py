@@ -0,0 +1,72 @@
+import os
+import stat
+import threading
+import time
+import pytest
+import shared_cache
+from shared_cache import SharedCache
+
+@pytest.fixture
+def cache(tmp_path):
+    return SharedCache(str(tmp_path / "cache.sqlite3"))
+
+def test_expired_entries_are_not_returned(cache):
+    cache.set("k", "v", ttl=-1)
+    assert cache.get("k") is None
+
+def test_min_version_rejects_older_entries(cache):
+    cache.set("k", "old", ttl=60, version=3)
+    assert cache.get("k", min_version=3) == ("old", 3)
+    assert cache.get("k", min_version=4) is None
+    assert cache.get_or_refresh("k", lambda: "new", ttl=60, min_version=4) == "new"
+    assert cache.get("k") == ("new", 4)
+
+def test_unversioned_entries_fail_any_min_version(cache):
+    cache.set("k", "v", ttl=60)
+    assert cache.get("k", min_version=0) is None
+
+def test_refresh_is_single_flight(cache):
+    calls = []
+
+    def loader():
+        calls.append(1)
+        time.sleep(0.3)
+        return "value"
+
+    # Each thread gets its own connection and lease owner, like separate workers
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_refresh("k", loader, ttl=60))) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == ["value"] * 4
+    assert len(calls) == 1
+
+def test_waiters_fall_back_to_stale_value(cache, monkeypatch):
+    monkeypatch.setattr(shared_cache, "WAIT_SECONDS", 0.2)
+    cache.set("k", "stale", ttl=-1)
+    # Another worker holds the lease and never finishes
+    other = SharedCache(cache.path)
+    assert other._acquire("k")
+    assert cache.get_or_refresh("k", lambda: "fresh", ttl=60) == "stale"
+
+def test_take_enforces_a_sliding_window(cache):
+    assert [cache.take("reads", 2, 0.2) for _ in range(2)] == [0, 0]
+    assert cache.take("reads", 2, 0.2) > 0
+    assert cache.take("writes", 2, 0.2) == 0
+    time.sleep(0.25)
+    assert cache.take("reads", 2, 0.2) == 0
+
+def test_database_is_private_to_the_user(tmp_path):
+    path = tmp_path / "private" / "cache.sqlite3"
+    SharedCache(str(path)).set("k", "v", ttl=60)
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o600
+    assert stat.S_IMODE(os.stat(path.parent).st_mode) == 0o700
+
+def test_readable_database_is_refused(tmp_path):
+    path = tmp_path / "cache.sqlite3"
+    path.touch()
+    path.chmod(0o644)
+    with pytest.raises(PermissionError):
+        SharedCache(str(path))
@@ -0,0 +1,94 @@
+from record_store import RecordStore
+from sheet_cache import WriteThroughCache, DerivedIndex
+
+COLUMNS = ["PO Number", "Timestamp", "Status"]
+
+class FakeSheet:
+    """Remote rows and version, counting reads."""
+
+    def __init__(self):
+        self.rows = [{"PO Number": "P1", "Timestamp": "2024-01-01 00:00:00", "Status": "Pending"}]
+        self.version = 1
+        self.loads = 0
+
+    def load(self, version):
+        self.loads += 1
+        return RecordStore.from_records(list(self.rows), columns=COLUMNS)
+
+    def remote_version(self):
+        return self.version
+
+    def write(self, row):
+        # Another process writes and logs it
+        self.rows.append(row)
+        self.version += 1
+
+def make_cache(sheet):
+    return WriteThroughCache(sheet.load, sheet.remote_version, check_interval=0, max_age=300)
+
+def row(po):
+    return {"PO Number": po, "Timestamp": "2024-01-02 00:00:00", "Status": "Pending"}
+
+def test_reloads_only_when_remote_version_moves():
+    sheet = FakeSheet()
+    cache = make_cache(sheet)
+    store = cache.get()
+    assert cache.get() is store and sheet.loads == 1
+
+    sheet.write(row("P2"))
+    assert len(cache.get()) == 2 and sheet.loads == 2
+
+def test_own_writes_are_applied_in_place():
+    sheet = FakeSheet()
+    cache = make_cache(sheet)
+    store = cache.get()
+    sheet.rows.append(row("P2"))
+    sheet.version += 1
+    cache.append([row("P2")], sheet.version)
+    sheet.version += 1
+    cache.update_statuses({"P1": "Approved"}, sheet.version)
+
+    assert cache.get() is store and sheet.loads == 1
+    assert store.column("Status") == ["Approved", "Pending"]
+
+def test_interleaved_foreign_write_forces_a_reload():
+    sheet = FakeSheet()
+    cache = make_cache(sheet)
+    cache.get()
+    sheet.write(row("F1"))
+    sheet.rows.append(row("P2"))
+    sheet.version += 1
+    # Our write landed as version 3, but version 2 came from someone else
+    cache.append([row("P2")], sheet.version)
+    assert cache.version == 1
+    assert [r["PO Number"] for r in cache.get().to_records()] == ["P1", "F1", "P2"]
+    assert sheet.loads == 2
+
+def test_invalidate_and_max_age_reload():
+    sheet = FakeSheet()
+    cache = make_cache(sheet)
+    cache.get()
+    cache.invalidate()
+    cache.get()
+    cache.max_age = 0
+    cache.get()
+    assert sheet.loads == 3
+
+def test_derived_index_rebuilds_only_with_the_store():
+    sheet = FakeSheet()
+    cache = make_cache(sheet)
+    builds = []
+
+    def build(store, version):
+        builds.append(version)
+        return set(store.column("PO Number"))
+
+    derived = DerivedIndex(cache, build)
+    index = derived.get()
+    cache.append([row("P2")], 2)
+    index.add("P2")
+    assert derived.get() is index and builds == [1]
+
+    sheet.version = 2
+    sheet.write(row("F1"))
+    assert derived.get() == {"P1", "F1"} and builds == [1, 3]
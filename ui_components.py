@@ -1,5 +1,6 @@
 import streamlit as st
 from config import Config, CUSTOM_STYLES
+from backup_uploader import backup_panel
 
 class UIComponents:
     @staticmethod
@@ -163,4 +164,6 @@ class UIComponents:
         </div>
         """, unsafe_allow_html=True)
         
-        return st.sidebar.checkbox("Show Purchase Summary")
+        show_summary = st.sidebar.checkbox("Show Purchase Summary")
+        backup_panel()
+        return show_summary
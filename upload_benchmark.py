@@ -0,0 +1,214 @@
+"""Benchmark Drive upload strategies against a local stand-in endpoint.
+
+Usage:
+    python upload_benchmark.py [--sizes 0.05,1,4,20] [--latency-ms 40] [--mbps 20]
+
+A small HTTP server speaks enough of the Drive v3 upload protocol
+(multipart, media and resumable uploads) for GoogleDriveService.save_file,
+adding a fixed delay per request and throttling request bodies to the
+given bandwidth. For each CSV size it compares the old always-resumable
+upload with the size-adaptive one, with and without compression.
+"""
+import argparse
+import itertools
+import json
+import re
+import shutil
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import urlsplit, parse_qs
+import httplib2
+from google.auth.credentials import AnonymousCredentials
+from google_auth_httplib2 import AuthorizedHttp
+from googleapiclient.discovery import build
+from googleapiclient.http import DEFAULT_CHUNK_SIZE
+from drive_utils import GoogleDriveService, SIMPLE_UPLOAD_MAX_BYTES, RESUMABLE_CHUNK_SIZE
+
+class StandInDrive(ThreadingHTTPServer):
+    """Local Drive endpoint with simulated round-trip time and bandwidth."""
+
+    daemon_threads = True
+
+    def __init__(self, latency, bytes_per_second):
+        super().__init__(("127.0.0.1", 0), _DriveHandler)
+        self.latency = latency
+        self.bytes_per_second = bytes_per_second
+        self.files = {}
+        self.sessions = {}
+        self.requests = 0
+        self.bytes_received = 0
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_port}/"
+
+    def reset_counters(self):
+        with self._lock:
+            self.requests = self.bytes_received = 0
+
+    def new_id(self):
+        return f"file{next(self._ids)}"
+
+class _DriveHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def _body(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        server = self.server
+        with server._lock:
+            server.requests += 1
+            server.bytes_received += len(body)
+        time.sleep(server.latency + len(body) / server.bytes_per_second)
+        return body
+
+    def _reply(self, status, payload=None, headers=None):
+        data = json.dumps(payload or {}).encode()
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        # files().list(q="name='...'") from check_file_exists
+        self._body()
+        query = parse_qs(urlsplit(self.path).query).get("q", [""])[0]
+        match = re.search(r"name='([^']*)'", query)
+        name = match.group(1) if match else None
+        files = [{"id": file_id, "name": name} for file_id, stored in self.server.files.items() if stored == name]
+        self._reply(200, {"files": files})
+
+    def _start_upload(self, file_id):
+        body = self._body()
+        upload_type = parse_qs(urlsplit(self.path).query).get("uploadType", [""])[0]
+        name = self.server.files.get(file_id)
+        if upload_type in ("resumable", "multipart") and body and name is None:
+            if upload_type == "resumable":
+                name = json.loads(body).get("name")
+            else:
+                match = re.search(rb'"name":\s*"([^"]*)"', body)
+                name = match.group(1).decode() if match else None
+        file_id = file_id or self.server.new_id()
+        self.server.files[file_id] = name
+
+        if upload_type == "resumable":
+            session = f"{self.server.url}upload/session/{file_id}"
+            self.server.sessions[session] = file_id
+            self._reply(200, headers={"Location": session})
+        else:
+            self._reply(200, {"id": file_id})
+
+    def do_POST(self):
+        self._start_upload(None)
+
+    def do_PATCH(self):
+        self._start_upload(urlsplit(self.path).path.rsplit("/", 1)[-1])
+
+    def do_PUT(self):
+        # One chunk of a resumable session: "bytes first-last/total"
+        self._body()
+        file_id = self.server.sessions.get(self.server.url + self.path.lstrip("/"))
+        match = re.match(r"bytes (\d+)-(\d+)/(\d+)", self.headers.get("Content-Range", ""))
+        if match and int(match.group(2)) + 1 < int(match.group(3)):
+            self._reply(308, headers={"Range": f"bytes=0-{match.group(2)}"})
+        else:
+            self._reply(200, {"id": file_id})
+
+class _PlainHttp(httplib2.Http):
+    """The stand-in speaks plain HTTP, but media upload URLs keep https."""
+
+    def __init__(self):
+        super().__init__()
+        self.redirect_codes = self.redirect_codes - {308}
+
+    def request(self, uri, *args, **kwargs):
+        return super().request(uri.replace("https://", "http://", 1), *args, **kwargs)
+
+def write_csv(path, size):
+    """Synthetic purchase request CSV of about `size` bytes."""
+    header = "PO Number,Requester,Email,Timestamp,Item URL,Quantity,Category,Description,Urgency,Status\n"
+    with open(path, "w") as f:
+        f.write(header)
+        written = len(header)
+        for i in itertools.count():
+            row = (
+                f"RD-PO-240101-1200{i % 60:02d}-{i:04d},Requester {i % 37},user{i % 37}@ketos.co,"
+                f"2024-{i % 12 + 1:02d}-{i % 28 + 1:02d} 12:{i % 60:02d}:00,https://vendor.example.com/item/{i % 911},"
+                f"{i % 9 + 1},Lab Supplies,Pipette tips box {i % 13},{'Urgent' if i % 7 == 0 else 'Normal'},Pending\n"
+            )
+            if written + len(row) > size:
+                break
+            f.write(row)
+            written += len(row)
+
+STRATEGIES = {
+    # name: (simple upload threshold, resumable chunk size, compression)
+    "resumable (old)": (-1, DEFAULT_CHUNK_SIZE, None),
+    "adaptive": (SIMPLE_UPLOAD_MAX_BYTES, RESUMABLE_CHUNK_SIZE, None),
+    "adaptive+gzip": (SIMPLE_UPLOAD_MAX_BYTES, RESUMABLE_CHUNK_SIZE, "gzip"),
+    "adaptive+parquet": (SIMPLE_UPLOAD_MAX_BYTES, RESUMABLE_CHUNK_SIZE, "parquet")
+}
+
+def run_benchmark(sizes_mb, latency_ms, mbps, repeat=3):
+    """Upload each size with each strategy; returns result rows."""
+    server = StandInDrive(latency_ms / 1000, mbps * 1_000_000 / 8)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    drive = GoogleDriveService()
+    drive.service = build(
+        "drive", "v3",
+        http=AuthorizedHttp(AnonymousCredentials(), http=_PlainHttp()),
+        client_options={"api_endpoint": server.url}
+    )
+
+    work_dir = Path(tempfile.mkdtemp(prefix="upload-benchmark-"))
+    results = []
+    try:
+        for size_mb in sizes_mb:
+            path = work_dir / f"requests-{size_mb}mb.csv"
+            write_csv(path, int(size_mb * 1024 * 1024))
+            for name, (threshold, chunk_size, compression) in STRATEGIES.items():
+                drive.simple_upload_max_bytes = threshold
+                drive.resumable_chunk_size = chunk_size
+                server.reset_counters()
+                started = time.perf_counter()
+                for _ in range(repeat):
+                    if not drive.save_file(path, folder_id="benchmark", compression=compression):
+                        raise RuntimeError(f"Upload failed: {name}, {size_mb} MB")
+                elapsed = (time.perf_counter() - started) / repeat
+                results.append({
+                    "size_mb": size_mb,
+                    "strategy": name,
+                    "seconds": round(elapsed, 3),
+                    "requests": server.requests / repeat,
+                    "sent_mb": round(server.bytes_received / repeat / 1024 / 1024, 2)
+                })
+    finally:
+        server.shutdown()
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Drive upload strategies against a local endpoint.")
+    parser.add_argument("--sizes", default="0.05,1,4,20", help="comma-separated CSV sizes in MB")
+    parser.add_argument("--latency-ms", type=float, default=40, help="simulated delay per request")
+    parser.add_argument("--mbps", type=float, default=20, help="simulated upload bandwidth in Mbit/s")
+    parser.add_argument("--repeat", type=int, default=3, help="uploads per size and strategy")
+    args = parser.parse_args()
+
+    sizes = [float(size) for size in args.sizes.split(",")]
+    print(f"{'Size MB':>8}  {'Strategy':<18} {'Seconds':>8} {'Requests':>9} {'Sent MB':>8}")
+    for row in run_benchmark(sizes, args.latency_ms, args.mbps, args.repeat):
+        print(f"{row['size_mb']:>8}  {row['strategy']:<18} {row['seconds']:>8} {row['requests']:>9.1f} {row['sent_mb']:>8}")
+
+if __name__ == "__main__":
+    main()